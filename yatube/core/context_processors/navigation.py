@@ -0,0 +1,9 @@
+from core.navigation import navigation_urls
+
+
+def navigation(request):
+    match = getattr(request, 'resolver_match', None)
+    return {
+        'nav': navigation_urls(),
+        'view_name': match.view_name if match else '',
+    }
@@ -0,0 +1,152 @@
+"""Уменьшенные копии загруженных картинок по запросу.
+
+``/media/resize/<w>x<h>/<путь>`` отдаёт картинку из MEDIA_ROOT,
+обрезанную по центру до w×h (h = 0 — только по ширине). Размеры
+проверяются по списку RESIZE_SIZES, чтобы нельзя было заставить
+сервер делать копии любого размера. JPEG открывается в draft-режиме:
+декодер сразу уменьшает картинку в 2–8 раз, и в память не попадает
+полный растр.
+
+Готовые копии лежат на диске в RESIZE_CACHE_DIR по путям
+``ab/cd/<sha1>.jpg``. Чтение копии обновляет её mtime, и при
+превышении RESIZE_CACHE_MAX_SIZE удаляются копии, которые дольше всех
+не читались, пока кеш не уменьшится до EVICT_TO от предела.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.utils._os import safe_join
+from PIL import Image, ImageOps
+
+JPEG_QUALITY = 85
+EVICT_TO = 0.9
+
+
+def allowed_size(width, height):
+    return f'{width}x{height}' in settings.RESIZE_SIZES
+
+
+def resize(source, target, width, height):
+    with Image.open(source) as image:
+        if not height:
+            height = max(1, round(image.height * width / image.width))
+        image.draft('RGB', (width, height))
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        image.save(target, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+
+
+class DiskCache:
+    """Копии картинок на диске с вытеснением давно не читанных."""
+
+    def __init__(self, root, max_size):
+        self.root = root
+        self.max_size = max_size
+        self.size = None
+        self.lock = threading.Lock()
+
+    def path(self, key):
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(
+            self.root, digest[:2], digest[2:4], f'{digest}.jpg'
+        )
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, write):
+        """Записывает копию через ``write(file)`` атомарно; путь к ней."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), suffix='.tmp'
+        )
+        try:
+            with os.fdopen(descriptor, 'wb') as temp:
+                write(temp)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self.added(os.path.getsize(path))
+        return path
+
+    def files(self):
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith('.jpg'):
+                    yield os.path.join(directory, name)
+
+    def added(self, size):
+        with self.lock:
+            if self.size is None:
+                self.size = sum(
+                    os.path.getsize(path) for path in self.files()
+                )
+            else:
+                self.size += size
+            if self.size > self.max_size:
+                self.size = self.evict(int(self.max_size * EVICT_TO))
+
+    def evict(self, limit):
+        """Удаляет самые старые по mtime копии; возвращает новый размер."""
+        entries = []
+        for path in self.files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        return total
+
+
+_caches = {}
+
+
+def get_cache():
+    key = (settings.RESIZE_CACHE_DIR, settings.RESIZE_CACHE_MAX_SIZE)
+    if key not in _caches:
+        _caches[key] = DiskCache(*key)
+    return _caches[key]
+
+
+def open_resized(name, width, height):
+    """Открытая копия картинки; при промахе оригинал уменьшается.
+
+    Путь вне MEDIA_ROOT даёт SuspiciousFileOperation, отсутствующий
+    оригинал, не картинка или обрезанный файл — OSError, слишком
+    большая картинка — Image.DecompressionBombError.
+    """
+    source = safe_join(settings.MEDIA_ROOT, name)
+    key = f'{width}x{height}/{name}@{os.stat(source).st_mtime_ns}'
+    cache = get_cache()
+    path = cache.get(key)
+    if path is not None:
+        try:
+            return open(path, 'rb')
+        except FileNotFoundError:
+            pass
+    path = cache.put(
+        key, lambda target: resize(source, target, width, height)
+    )
+    return open(path, 'rb')
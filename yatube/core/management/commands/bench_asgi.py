@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import AsgiHandler, build_environ
+
+
+class Counter:
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def open(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def close(self):
+        with self.lock:
+            self.current -= 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает, сколько одновременных соединений обслуживают '
+        'синхронные WSGI-воркеры и ASGI-обёртка с тем же числом потоков. '
+        'Каждый клиент отправляет запрос с задержкой --client-delay, '
+        'как медленное мобильное соединение.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/')
+        parser.add_argument('--connections', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--client-delay', type=float, default=0.2)
+
+    def handle(self, *args, **options):
+        wsgi_application = get_wsgi_application()
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': options['path'],
+            'query_string': b'',
+            'headers': [(b'host', b'localhost')],
+            'server': ('localhost', 80),
+        }
+        benches = (('WSGI', self.bench_wsgi), ('ASGI', self.bench_asgi))
+        for name, bench in benches:
+            elapsed, peak = bench(wsgi_application, scope, options)
+            self.stdout.write(
+                f'{name}: {options["connections"]} запросов за '
+                f'{elapsed:.2f} с ({options["connections"] / elapsed:.0f} '
+                f'запросов/с), одновременно открыто соединений: {peak}'
+            )
+
+    def bench_wsgi(self, wsgi_application, scope, options):
+        counter = Counter()
+
+        def request():
+            counter.open()
+            time.sleep(options['client_delay'])
+            environ = build_environ(scope, BytesIO())
+            result = wsgi_application(environ, lambda *args: None)
+            b''.join(result)
+            result.close()
+            counter.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['workers']) as executor:
+            for _ in range(options['connections']):
+                executor.submit(request)
+        return time.perf_counter() - started, counter.peak
+
+    def bench_asgi(self, wsgi_application, scope, options):
+        counter = Counter()
+        handler = AsgiHandler(wsgi_application, options['workers'])
+
+        async def request():
+            counter.open()
+
+            async def receive():
+                await asyncio.sleep(options['client_delay'])
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                if message['type'] == 'http.response.body' and not (
+                    message.get('more_body')
+                ):
+                    counter.close()
+
+            await handler(scope, receive, send)
+
+        async def run():
+            await asyncio.gather(
+                *(request() for _ in range(options['connections']))
+            )
+
+        started = time.perf_counter()
+        asyncio.run(run())
+        handler.executor.shutdown()
+        return time.perf_counter() - started, counter.peak
@@ -0,0 +1,71 @@
+import timeit
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+
+from core.navigation import NAVIGATION, navigation_urls
+
+HEADER_LINKS = (
+    'posts:index', 'posts:trending', 'about:author', 'about:tech',
+    'posts:post_create', 'users:password_change', 'users:logout',
+)
+CARD_LINKS = (
+    ('posts:profile', 'post.author.username'),
+    ('posts:group_list', 'post.group.slug'),
+    ('posts:post_detail', 'post.pk'),
+    ('posts:post_edit', 'post.pk'),
+)
+
+
+def page_template(tag):
+    header = ''.join(f"{{% url '{name}' %}}" for name in HEADER_LINKS)
+    if tag == 'cached_url':
+        header = ''.join(
+            f'{{{{ nav.{name} }}}}'
+            for name, viewname in NAVIGATION.items()
+            if viewname in HEADER_LINKS
+        )
+    card = ''.join(
+        f"{{% {tag} '{name}' {arg} %}}" for name, arg in CARD_LINKS
+    )
+    return Template(
+        '{% load navigation %}' + header
+        + '{% for post in posts %}' + card + '{% endfor %}'
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время построения ссылок шапки и карточек на странице '
+        'из 10 постов через {% url %} и через предвычисленные шаблоны.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        posts = [
+            SimpleNamespace(
+                pk=pk,
+                author=SimpleNamespace(username=f'user{pk}'),
+                group=SimpleNamespace(slug=f'group-{pk}'),
+            )
+            for pk in range(1, options['posts'] + 1)
+        ]
+        context = Context({'posts': posts, 'nav': navigation_urls()})
+        results = {}
+        for tag in ('url', 'cached_url'):
+            template = page_template(tag)
+            template.render(context)
+            results[tag] = timeit.timeit(
+                lambda: template.render(context), number=options['repeat']
+            ) / options['repeat']
+            self.stdout.write(
+                f'{{% {tag} %}}: {results[tag] * 1e6:.0f} мкс на страницу'
+            )
+        self.stdout.write(
+            f'Экономия: {(results["url"] - results["cached_url"]) * 1e6:.0f} '
+            f'мкс ({1 - results["cached_url"] / results["url"]:.0%})'
+        )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core import model_cache
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания и промахи кеша моделей по всем процессам.'
+
+    def handle(self, *args, **options):
+        for model_label, counters in model_cache.stats().items():
+            total = counters['hits'] + counters['misses']
+            ratio = counters['hits'] / total if total else 0
+            self.stdout.write(
+                f'{model_label}: попаданий {counters["hits"]}, '
+                f'промахов {counters["misses"]}, доля попаданий {ratio:.0%}'
+            )
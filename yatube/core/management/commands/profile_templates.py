@@ -0,0 +1,65 @@
+import inspect
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.urls import Resolver404, resolve
+
+from core.template_profiler import TemplateProfiler
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает, сколько времени уходит на каждый шаблон и каждый '
+        '{% include %} при рендеринге страницы. Кеш страниц, лимиты и '
+        'проверка авторизации пропускаются, чтобы шаблоны рендерились.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url')
+        parser.add_argument(
+            '--user', help='Имя пользователя, от лица которого запрос.'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=1,
+            help='Сколько раз отрендерить страницу; время суммируется.',
+        )
+        parser.add_argument(
+            '--folded',
+            action='store_true',
+            help='Вывести свёрнутые стеки для flamegraph.pl/speedscope.',
+        )
+
+    def get_view(self, path):
+        try:
+            match = resolve(path)
+        except Resolver404:
+            raise CommandError(f'Адрес {path} не найден')
+        view = inspect.unwrap(
+            match.func, stop=lambda func: hasattr(func, 'view_class')
+        )
+        return view, match.args, match.kwargs
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get(options['url'])
+        request.user = AnonymousUser()
+        if options['user']:
+            try:
+                request.user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь {options["user"]} не найден')
+        view, view_args, view_kwargs = self.get_view(request.path_info)
+        with TemplateProfiler() as profiler:
+            for _ in range(options['repeat']):
+                response = view(request, *view_args, **view_kwargs)
+                if hasattr(response, 'render'):
+                    response.render()
+        if options['folded']:
+            self.stdout.write(profiler.folded())
+        else:
+            self.stdout.write(profiler.flame())
@@ -0,0 +1,42 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Удаляет истёкшие сессии из базы пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько сессий удалять одним запросом.',
+        )
+
+    def handle(self, *args, **options):
+        store_class = import_module(settings.SESSION_ENGINE).SessionStore
+        if not hasattr(store_class, 'get_model_class'):
+            store_class.clear_expired()
+            self.stdout.write(
+                'Сессии не хранятся в базе, очищать нечего.'
+            )
+            return
+        model = store_class.get_model_class()
+        batch_size = options['batch_size']
+        now = timezone.now()
+        deleted = 0
+        while True:
+            keys = list(
+                model.objects.filter(expire_date__lt=now)
+                .values_list('session_key', flat=True)[:batch_size]
+            )
+            if not keys:
+                break
+            model.objects.filter(session_key__in=keys).delete()
+            deleted += len(keys)
+        self.stdout.write(f'Удалено истёкших сессий: {deleted}')
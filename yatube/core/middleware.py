@@ -0,0 +1,111 @@
+import codecs
+import re
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+PROTECTED_TAG = re.compile(r'<(pre|textarea|script|style)\b', re.IGNORECASE)
+CLOSING_TAGS = {
+    name: re.compile(rf'</{name}\s*>', re.IGNORECASE)
+    for name in ('pre', 'textarea', 'script', 'style')
+}
+LINE_BREAK = re.compile(r'[ \t\r\f\v]*\n\s*')
+SPACES = re.compile(r'[ \t\r\f\v]{2,}')
+
+
+def collapse(text):
+    return SPACES.sub(' ', LINE_BREAK.sub('\n', text))
+
+
+class WhitespaceCollapser:
+    """Схлопывает отступы в HTML, который приходит кусками.
+
+    Серия пробелов становится одним пробелом, серия с переводом строки —
+    одним переводом строки. Содержимое pre, textarea, script и style не
+    трогается. Хвост куска из пробелов или незакрытого тега
+    придерживается до следующего куска.
+    """
+
+    def __init__(self):
+        self.tail = ''
+        self.closing = None
+
+    def feed(self, text):
+        text = self.tail + text
+        self.tail = ''
+        out = []
+        pos = 0
+        while pos < len(text):
+            if self.closing:
+                match = self.closing.search(text, pos)
+                if match is None:
+                    end = text.rfind('<', pos)
+                    end = len(text) if end == -1 else end
+                    out.append(text[pos:end])
+                    self.tail = text[end:]
+                    break
+                out.append(text[pos:match.end()])
+                pos = match.end()
+                self.closing = None
+                continue
+            match = PROTECTED_TAG.search(text, pos)
+            if match is None:
+                end = self.hold_back(text, pos)
+                out.append(collapse(text[pos:end]))
+                self.tail = text[end:]
+                break
+            out.append(collapse(text[pos:match.start()]))
+            out.append(match.group())
+            pos = match.end()
+            self.closing = CLOSING_TAGS[match.group(1).lower()]
+        return ''.join(out)
+
+    def hold_back(self, text, pos):
+        tag = text.rfind('<', pos)
+        if tag > text.rfind('>', pos):
+            return tag
+        return pos + len(text[pos:].rstrip())
+
+    def close(self):
+        text, self.tail = self.tail, ''
+        return text if self.closing else collapse(text)
+
+
+def collapse_stream(chunks, charset):
+    decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+    collapser = WhitespaceCollapser()
+    for chunk in chunks:
+        text = collapser.feed(decoder.decode(chunk))
+        if text:
+            yield text.encode(charset)
+    text = collapser.feed(decoder.decode(b'', final=True)) + collapser.close()
+    if text:
+        yield text.encode(charset)
+
+
+class CollapseWhitespaceMiddleware:
+    """Убирает отступы шаблонов из HTML-ответов, в том числе потоковых."""
+
+    def __init__(self, get_response):
+        if not settings.COLLAPSE_WHITESPACE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            not response.get('Content-Type', '').startswith('text/html')
+            or response.has_header('Content-Encoding')
+        ):
+            return response
+        if response.streaming:
+            response.streaming_content = collapse_stream(
+                response.streaming_content, response.charset
+            )
+            return response
+        collapser = WhitespaceCollapser()
+        content = response.content.decode(response.charset)
+        response.content = collapser.feed(content) + collapser.close()
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = len(response.content)
+        return response
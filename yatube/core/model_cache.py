@@ -0,0 +1,251 @@
+"""Кеш строк моделей с чтением через кеш.
+
+Модели и их уникальные поля перечислены в MODEL_CACHE, например
+``{'posts.Group': ['slug']}``; первичный ключ кешируется всегда.
+``get(Group, slug='cats')`` сначала ищет объект в общем кеше и только
+при промахе идёт в базу через менеджер модели по умолчанию.
+``get_many(Post, ids)`` достаёт пачку одним ``get_many`` из кеша и
+одним ``in_bulk`` из базы.
+
+Ключ содержит VERSION: после изменения полей модели её достаточно
+поднять, и старые объекты из кеша не будут прочитаны. Объекты
+сбрасываются сигналами post_save и post_delete, сразу и ещё раз после
+коммита; массовые ``update()`` должны вызывать ``invalidate_pks()``.
+По уникальному полю в кеше лежит только pk, а объект читается по pk
+и сверяется со значением поля, поэтому после переименования старое имя
+не найдёт объект. В ключ попадает sha1 значения, а не оно само: имена
+пользователей не видны в кеше и не ломают ключи memcached.
+
+Сброс ещё и поднимает версию строки, а объект хранится вместе с
+версией, прочитанной до запроса к базе. Промах, который прочитал строку
+до чужого коммита и записал её в кеш уже после сброса, так и останется
+со старой версией и не будет прочитан. Поля из MODEL_CACHE_DEFER
+(пароли) в кеш не попадают. Объект из кеша годится только для чтения:
+изменяющие view берут строку из базы.
+
+Попадания и промахи считаются в памяти процесса и раз в FLUSH_EVERY
+обращений переносятся в общий кеш, откуда их читает ``stats()``
+и команда model_cache_stats.
+"""
+import hashlib
+import threading
+from collections import Counter
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import Http404
+
+VERSION = 2
+TIMEOUT = 10 * 60
+FLUSH_EVERY = 100
+KEY = 'model_cache:{}:{}:{}:{}'
+ROW_VERSION_KEY = 'model_cache:row_version:{}:{}:{}'
+STATS_KEY = 'model_cache:stats:{}:{}'
+
+_counters = Counter()
+_counters_lock = threading.Lock()
+
+
+def label(model):
+    return model._meta.label
+
+
+def unique_fields(model):
+    return settings.MODEL_CACHE[label(model)]
+
+
+def make_key(model, field, value):
+    if field != 'pk':
+        value = hashlib.sha1(str(value).encode()).hexdigest()
+    return KEY.format(label(model), VERSION, field, value)
+
+
+def version_key(model, pk):
+    return ROW_VERSION_KEY.format(label(model), VERSION, pk)
+
+
+def queryset(model):
+    deferred = settings.MODEL_CACHE_DEFER.get(label(model), ())
+    return model._default_manager.defer(*deferred)
+
+
+def count(model, hits, misses):
+    with _counters_lock:
+        _counters[label(model), 'hits'] += hits
+        _counters[label(model), 'misses'] += misses
+        if sum(_counters.values()) < FLUSH_EVERY:
+            return
+        pending = dict(_counters)
+        _counters.clear()
+    flush(pending)
+
+
+def flush(pending=None):
+    """Переносит счётчики процесса в общий кеш."""
+    if pending is None:
+        with _counters_lock:
+            pending = dict(_counters)
+            _counters.clear()
+    for (model_label, kind), value in pending.items():
+        if not value:
+            continue
+        key = STATS_KEY.format(model_label, kind)
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            if not cache.add(key, value, None):
+                cache.incr(key, value)
+
+
+def stats():
+    """{'posts.Post': {'hits': ..., 'misses': ...}, ...} по всем процессам."""
+    flush()
+    keys = {
+        STATS_KEY.format(model_label, kind): (model_label, kind)
+        for model_label in settings.MODEL_CACHE
+        for kind in ('hits', 'misses')
+    }
+    result = {
+        model_label: {'hits': 0, 'misses': 0}
+        for model_label in settings.MODEL_CACHE
+    }
+    for key, value in cache.get_many(list(keys)).items():
+        model_label, kind = keys[key]
+        result[model_label][kind] = value
+    return result
+
+
+def _pointers(instance):
+    model = type(instance)
+    deferred = instance.get_deferred_fields()
+    return {
+        make_key(model, field, getattr(instance, field)): instance.pk
+        for field in unique_fields(model) if field not in deferred
+    }
+
+
+def _read(model, pks):
+    """Объекты из кеша, чья версия совпадает с текущей, и версии всех."""
+    cached = cache.get_many([
+        key for pk in pks
+        for key in (make_key(model, 'pk', pk), version_key(model, pk))
+    ])
+    versions = {pk: cached.get(version_key(model, pk), 0) for pk in pks}
+    found = {}
+    for pk in pks:
+        entry = cached.get(make_key(model, 'pk', pk))
+        if entry is not None and entry[0] == versions[pk]:
+            found[pk] = entry[1]
+    return found, versions
+
+
+def _fill(instances, versions):
+    entries = {}
+    for instance in instances:
+        model = type(instance)
+        entries[make_key(model, 'pk', instance.pk)] = (
+            versions[instance.pk], instance
+        )
+        entries.update(_pointers(instance))
+    cache.set_many(entries, TIMEOUT)
+
+
+def get(model, **lookup):
+    """Объект по pk или уникальному полю; model.DoesNotExist, если нет."""
+    (field, value), = lookup.items()
+    if field == model._meta.pk.name:
+        field = 'pk'
+    if field != 'pk' and field not in unique_fields(model):
+        raise ValueError(f'{label(model)}.{field} не кешируется')
+    pk = value if field == 'pk' else cache.get(make_key(model, field, value))
+    versions = {}
+    if pk is not None:
+        found, versions = _read(model, [pk])
+        instance = found.get(pk)
+        if instance is not None and (
+            field == 'pk' or getattr(instance, field) == value
+        ):
+            count(model, 1, 0)
+            return instance
+    count(model, 0, 1)
+    if field != 'pk':
+        # Версию строки нужно прочитать до самой строки: сначала pk.
+        pk = model._default_manager.values_list('pk', flat=True).get(
+            **{field: value}
+        )
+        versions = _read(model, [pk])[1]
+    instance = queryset(model).get(pk=pk)
+    _fill([instance], versions)
+    return instance
+
+
+def get_many(model, pks):
+    """Словарь pk -> объект; отсутствующие в базе пропускаются."""
+    pks = list(dict.fromkeys(pks))
+    found, versions = _read(model, pks)
+    missing = [pk for pk in pks if pk not in found]
+    count(model, len(found), len(missing))
+    if missing:
+        loaded = queryset(model).in_bulk(missing)
+        _fill(loaded.values(), versions)
+        found.update(loaded)
+    return found
+
+
+def get_object_or_404(model, **lookup):
+    try:
+        return get(model, **lookup)
+    except model.DoesNotExist:
+        raise Http404(f'{model._meta.verbose_name} не найден')
+
+
+def _delete(keys):
+    cache.delete_many(keys)
+
+
+def _bump(model, pks):
+    for pk in pks:
+        key = version_key(model, pk)
+        try:
+            cache.incr(key)
+        except ValueError:
+            if not cache.add(key, 1, None):
+                cache.incr(key)
+
+
+def _drop(model, pks, keys):
+    keys = keys + [make_key(model, 'pk', pk) for pk in pks]
+    _bump(model, pks)
+    _delete(keys)
+
+    def after_commit():
+        _bump(model, pks)
+        _delete(keys)
+    transaction.on_commit(after_commit)
+
+
+def invalidate(instance):
+    _drop(type(instance), [instance.pk], list(_pointers(instance)))
+
+
+def invalidate_pks(model, pks):
+    """Сбрасывает объекты по pk, например после ``queryset.update()``."""
+    _drop(model, list(pks), [])
+
+
+def drop_instance(sender, instance, **kwargs):
+    invalidate(instance)
+
+
+def connect():
+    for model_label in settings.MODEL_CACHE:
+        model = apps.get_model(model_label)
+        post_save.connect(
+            drop_instance, sender=model, dispatch_uid=f'model_cache:{model}'
+        )
+        post_delete.connect(
+            drop_instance, sender=model, dispatch_uid=f'model_cache:{model}'
+        )
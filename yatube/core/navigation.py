@@ -0,0 +1,80 @@
+"""Построение ссылок без полного reverse() на каждый вызов.
+
+Адреса без параметров вычисляются один раз. Для адресов с параметрами
+один раз строится шаблон: reverse() с числом-заглушкой, которое проходит
+конвертеры int, slug и str, после чего на место заглушек подставляются
+экранированные значения. Значения с символами, которые могут не пройти
+конвертер, отдаются обычному reverse().
+"""
+import re
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import get_script_prefix, get_urlconf, reverse
+from django.utils.http import RFC3986_SUBDELIMS
+
+PLACEHOLDER = '738491625'
+SAFE_VALUE = re.compile(r'[-\w.@+]+')
+
+NAVIGATION = {
+    'index': 'posts:index',
+    'trending': 'posts:trending',
+    'follow_index': 'posts:follow_index',
+    'post_create': 'posts:post_create',
+    'about_author': 'about:author',
+    'about_tech': 'about:tech',
+    'login': 'users:login',
+    'logout': 'users:logout',
+    'signup': 'users:signup',
+    'password_change': 'users:password_change',
+}
+
+
+@lru_cache(maxsize=None)
+def static_url(viewname, urlconf=None, prefix=None):
+    return reverse(viewname, urlconf=urlconf)
+
+
+@lru_cache(maxsize=None)
+def url_template(viewname, argc, urlconf=None, prefix=None):
+    parts = reverse(
+        viewname, args=[PLACEHOLDER] * argc, urlconf=urlconf
+    ).split(PLACEHOLDER)
+    return parts if len(parts) == argc + 1 else None
+
+
+def build_url(viewname, *args):
+    urlconf, prefix = get_urlconf(), get_script_prefix()
+    if not args:
+        return static_url(viewname, urlconf, prefix)
+    parts = url_template(viewname, len(args), urlconf, prefix)
+    values = [str(arg) for arg in args]
+    if parts is None or not all(map(SAFE_VALUE.fullmatch, values)):
+        return reverse(viewname, args=args, urlconf=urlconf)
+    url = [parts[0]]
+    for value, part in zip(values, parts[1:]):
+        url.append(quote(value, safe=RFC3986_SUBDELIMS + '/~:@'))
+        url.append(part)
+    return ''.join(url)
+
+
+@lru_cache(maxsize=None)
+def _navigation_urls(urlconf, prefix):
+    return {
+        name: static_url(viewname, urlconf, prefix)
+        for name, viewname in NAVIGATION.items()
+    }
+
+
+def navigation_urls():
+    return _navigation_urls(get_urlconf(), get_script_prefix())
+
+
+@receiver(setting_changed)
+def clear_url_templates(setting, **kwargs):
+    if setting == 'ROOT_URLCONF':
+        static_url.cache_clear()
+        url_template.cache_clear()
+        _navigation_urls.cache_clear()
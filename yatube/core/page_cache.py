@@ -0,0 +1,139 @@
+"""Общий кеш страниц для анонимов и авторизованных.
+
+Страница рендерится один раз от лица анонима. Части, которые зависят
+от пользователя (шапка, кнопка подписки, ссылки на редактирование),
+шаблоны выводят через ``{% esi %}``: при общем рендеринге на их месте
+остаётся метка ``<!--esi:N-->``, а имя шаблона фрагмента и его
+параметры запоминаются. В кеш кладутся тело с метками, список
+фрагментов и готовая страница для анонимов. Анонимы получают готовую
+страницу, авторизованным в тело с метками подставляются фрагменты,
+отрендеренные для них, — с одним проходом контекст-процессоров.
+
+Ключ страницы включает версию её области (``'posts'``, ``'post:{id}'``).
+Версию поднимает ``bump()`` при изменениях; устаревшие ключи
+вытесняются по таймауту. При STREAMING_RENDER кеш не используется:
+потоковая отдача — другой способ ускорить первый байт.
+"""
+import hashlib
+import re
+from copy import copy
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.template import loader
+from django.template.context import make_context
+from django.utils.cache import patch_vary_headers
+
+TIMEOUT = 60
+VERSION_KEY = 'page_cache:version:{}'
+PAGE_KEY = 'page_cache:page:{}:{}'
+PLACEHOLDER = re.compile(r'<!--esi:(\d+)-->')
+CACHED_PARAMS = {'page'}
+
+
+def version(scope):
+    return cache.get(VERSION_KEY.format(scope), 0)
+
+
+def _bump(scopes):
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, None)
+
+
+def bump(*scopes):
+    """Сбрасывает страницы областей сразу и ещё раз после коммита.
+
+    Второй сброс нужен, чтобы не пережила коммит страница, которую
+    другой запрос успел отрендерить по ещё старым данным.
+    """
+    _bump(scopes)
+    transaction.on_commit(lambda: _bump(scopes))
+
+
+def render_fragments(fragments, request):
+    if not fragments:
+        return []
+    templates = [loader.get_template(name).template for name, _ in fragments]
+    context = make_context({}, request)
+    rendered = []
+    with context.bind_template(templates[0]):
+        for template, (_, values) in zip(templates, fragments):
+            with context.push(values):
+                rendered.append(template.render(context))
+    return rendered
+
+
+def fill(content, fragments, request):
+    rendered = render_fragments(fragments, request)
+    return PLACEHOLDER.sub(lambda match: rendered[int(match[1])], content)
+
+
+def render_shared(view, request, args, kwargs):
+    """Рендерит страницу от лица анонима; None, если её нельзя кешировать."""
+    anonymous_request = copy(request)
+    anonymous_request.user = AnonymousUser()
+    shared_request = copy(anonymous_request)
+    shared_request.esi_fragments = []
+    response = view(shared_request, *args, **kwargs)
+    if (
+        response.status_code != 200
+        or response.streaming
+        or response.cookies
+    ):
+        return None
+    content = response.content.decode(response.charset)
+    fragments = shared_request.esi_fragments
+    return {
+        'content': content,
+        'fragments': fragments,
+        'anonymous': fill(content, fragments, anonymous_request),
+        'content_type': response['Content-Type'],
+    }
+
+
+def shared_page(scope, timeout=TIMEOUT):
+    """Кеширует страницу для всех пользователей сразу.
+
+    ``scope`` — имя области для версии, может ссылаться на параметры
+    URL: ``shared_page('post:{post_id}')``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                settings.STREAMING_RENDER
+                or request.method not in ('GET', 'HEAD')
+                or not CACHED_PARAMS.issuperset(request.GET)
+            ):
+                return view(request, *args, **kwargs)
+            path_hash = hashlib.md5(
+                request.get_full_path().encode()
+            ).hexdigest()
+            key = PAGE_KEY.format(
+                path_hash, version(scope.format(**kwargs))
+            )
+            entry = cache.get(key)
+            if entry is None:
+                entry = render_shared(view, request, args, kwargs)
+                if entry is None:
+                    return view(request, *args, **kwargs)
+                cache.set(key, entry, timeout)
+            if request.user.is_authenticated:
+                content = fill(entry['content'], entry['fragments'], request)
+            else:
+                content = entry['anonymous']
+            response = HttpResponse(
+                content, content_type=entry['content_type']
+            )
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,252 @@
+"""Paginator для больших таблиц.
+
+EstimatedCountPaginator (админка) не считает таблицу целиком, а берёт
+оценку СУБД или считает до COUNT_LIMIT строк.
+
+CachedCountPaginator (ленты) хранит точное число строк в общем кеше под
+подписью запроса — хешем его SQL без сортировки. Сигналы моделей не
+сбрасывают, а правят эти числа через ``adjust_count()`` после коммита,
+так что COUNT(*) выполняется раз в COUNT_TIMEOUT, а не на каждую
+страницу. Массовые ``update()`` должны вызывать ``forget_counts()``.
+
+Правки после коммита считаются в счётчике изменений модели. Если он
+сдвинулся, пока шёл COUNT(*), запрос мог не увидеть чужую запись, чья
+правка уже не нашла числа в кеше; такое число хранится только
+COLD_TIMEOUT.
+
+``elided_page_range()`` — номера страниц вокруг текущей и по краям
+с ELLIPSIS в пропусках, как ``get_elided_page_range()`` из Django 3.2.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import Count, QuerySet
+from django.utils.functional import cached_property
+
+ESTIMATE_THRESHOLD = 100_000
+COUNT_LIMIT = 100_000
+
+VERSION = 1
+COUNT_TIMEOUT = 60 * 60
+COLD_TIMEOUT = 60
+COUNT_KEY = 'paginator_count:{}:{}:{}:{}'
+GENERATION_KEY = 'paginator_count:generation:{}'
+CHANGES_KEY = 'paginator_count:changes:{}'
+# Значений в одном IN при подсчёте частей: меньше лимита SQLite на 999.
+IN_BATCH = 500
+ELLIPSIS = '…'
+
+
+def estimate_count(queryset):
+    """Число строк таблицы по статистике СУБД; None, если её нет."""
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+    elif connection.vendor == 'mysql':
+        sql = (
+            'SELECT table_rows FROM information_schema.tables '
+            'WHERE table_schema = DATABASE() AND table_name = %s'
+        )
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator без полного COUNT(*) по большим таблицам.
+
+    Для запроса без фильтров по таблице больше ESTIMATE_THRESHOLD строк
+    берётся оценка из статистики СУБД. Остальные запросы считаются не
+    дальше COUNT_LIMIT строк: ``SELECT COUNT(*) FROM (... LIMIT n)``.
+    """
+
+    estimate_threshold = ESTIMATE_THRESHOLD
+    count_limit = COUNT_LIMIT
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        if not queryset.query.where:
+            estimate = estimate_count(queryset)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return estimate
+        return queryset[:self.count_limit].count()
+
+
+def generation(model):
+    return cache.get(GENERATION_KEY.format(model._meta.label), 0)
+
+
+def changes(models):
+    keys = [CHANGES_KEY.format(model._meta.label) for model in models]
+    found = cache.get_many(keys)
+    return [found.get(key, 0) for key in keys]
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def signature(queryset):
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    return hashlib.sha1(repr((sql, params)).encode()).hexdigest()
+
+
+def count_key(queryset, generation):
+    return COUNT_KEY.format(
+        VERSION, queryset.model._meta.label, generation, signature(queryset)
+    )
+
+
+def _adjust(queryset, delta):
+    _bump(CHANGES_KEY.format(queryset.model._meta.label))
+    try:
+        cache.incr(count_key(queryset, generation(queryset.model)), delta)
+    except ValueError:
+        pass
+
+
+def adjust_count(queryset, delta):
+    """После коммита правит закешированное число строк, если оно есть."""
+    transaction.on_commit(lambda: _adjust(queryset, delta))
+
+
+def forget_counts(model):
+    """Сбрасывает все числа строк модели, например после ``update()``."""
+    key = GENERATION_KEY.format(model._meta.label)
+    _bump(key)
+    transaction.on_commit(lambda: _bump(key))
+
+
+def store_count(key, count, changed):
+    cache.add(key, count, COLD_TIMEOUT if changed else COUNT_TIMEOUT)
+
+
+class CachedCountPaginator(EstimatedCountPaginator):
+    """Paginator с числом строк из общего кеша.
+
+    ``count_by`` — ``(queryset, поле, значения)``: число строк
+    ``object_list`` равно сумме чисел ``queryset.filter(поле=значение)``.
+    Ленту подписок можно считать по авторам, и тогда подписка на нового
+    автора не требует нового COUNT(*), а числа всех авторов, которых нет
+    в кеше, считаются одним GROUP BY.
+    С ``allow_estimate`` при промахе кеша число берётся как у
+    EstimatedCountPaginator и кешируется, только если оно точное.
+    """
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True, count_by=None,
+                 allow_estimate=False):
+        super().__init__(object_list, per_page, orphans,
+                         allow_empty_first_page)
+        self.count_by = count_by
+        self.allow_estimate = allow_estimate
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        if self.count_by is not None:
+            return sum(self.cached_counts_by(*self.count_by))
+        if self.allow_estimate:
+            key = count_key(queryset, generation(queryset.model))
+            count = cache.get(key)
+            if count is None:
+                before = changes([queryset.model])
+                count = super().count
+                if queryset.query.where and count < self.count_limit:
+                    store_count(
+                        key, count, before != changes([queryset.model])
+                    )
+            return count
+        return self.cached_counts([queryset])[0]
+
+    def cached_counts(self, querysets):
+        generations = {}
+        keys = []
+        for queryset in querysets:
+            model = queryset.model
+            if model not in generations:
+                generations[model] = generation(model)
+            keys.append(count_key(queryset, generations[model]))
+        found = cache.get_many(keys)
+        missing = [
+            (key, queryset) for key, queryset in zip(keys, querysets)
+            if key not in found
+        ]
+        if missing:
+            before = changes(generations)
+            for key, queryset in missing:
+                found[key] = queryset.count()
+            changed = before != changes(generations)
+            for key, _ in missing:
+                store_count(key, found[key], changed)
+        return [found[key] for key in keys]
+
+    def cached_counts_by(self, queryset, field, values):
+        """Числа ``queryset.filter(field=value)`` для каждого значения."""
+        values = list(values)
+        model = queryset.model
+        keys = [
+            count_key(queryset.filter(**{field: value}), generation(model))
+            for value in values
+        ]
+        found = cache.get_many(keys)
+        missing = {
+            value: key for value, key in zip(values, keys) if key not in found
+        }
+        if missing:
+            before = changes([model])
+            counted = {}
+            pending = list(missing)
+            for start in range(0, len(pending), IN_BATCH):
+                counted.update(
+                    queryset.filter(**{
+                        f'{field}__in': pending[start:start + IN_BATCH]
+                    })
+                    .order_by().values_list(field).annotate(Count('pk'))
+                )
+            changed = before != changes([model])
+            for value, key in missing.items():
+                found[key] = counted.get(value, 0)
+                store_count(key, found[key], changed)
+        return [found[key] for key in keys]
+
+    def get_elided_page_range(self, number=1, on_each_side=3, on_ends=2):
+        return elided_page_range(self, number, on_each_side, on_ends)
+
+
+def elided_page_range(paginator, number=1, on_each_side=3, on_ends=2):
+    """Номера страниц для навигации; пропуски отмечены ELLIPSIS."""
+    number = paginator.validate_number(number)
+    num_pages = paginator.num_pages
+    if num_pages <= (on_each_side + on_ends) * 2:
+        yield from paginator.page_range
+        return
+    if number > 1 + on_each_side + on_ends + 1:
+        yield from range(1, on_ends + 1)
+        yield ELLIPSIS
+        yield from range(number - on_each_side, number + 1)
+    else:
+        yield from range(1, number + 1)
+    if number < num_pages - on_each_side - on_ends - 1:
+        yield from range(number + 1, number + on_each_side + 1)
+        yield ELLIPSIS
+        yield from range(num_pages - on_ends + 1, num_pages + 1)
+    else:
+        yield from range(number + 1, num_pages + 1)
@@ -0,0 +1,83 @@
+"""Ограничение частоты запросов к изменяющим данные страницам.
+
+Корзина токенов ёмкостью ``count`` пополняется целиком раз в ``period``
+секунд и хранится в общем кеше как счётчик окна: списание токена — это
+один атомарный ``cache.incr``. Отказы запоминаются в памяти процесса до
+конца окна и повторно в кеш не ходят, а запросы с методами, которые не
+ограничиваются, кеш не трогают вовсе.
+"""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .views import too_many_requests
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+MAX_BLOCKED_KEYS = 10000
+
+_blocked_until = {}
+
+
+def parse_rate(rate):
+    """'10/m' -> (10, 60); '100/5m' -> (100, 300)."""
+    count, period = rate.split('/')
+    return int(count), int(period[:-1] or 1) * PERIODS[period[-1]]
+
+
+def user_ip_key(request):
+    user_id = request.user.pk if request.user.is_authenticated else ''
+    return f'{user_id}:{request.META.get("REMOTE_ADDR", "")}'
+
+
+def take_token(scope, ident, rate):
+    """Списывает токен; возвращает 0 или число секунд до пополнения."""
+    count, period = parse_rate(rate)
+    now = time.time()
+    window = int(now // period)
+    retry_after = math.ceil((window + 1) * period - now)
+    key = f'ratelimit:{scope}:{ident}:{window}'
+    if _blocked_until.get(key, 0) > now:
+        return retry_after
+    try:
+        used = cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, period + 1):
+            used = 1
+        else:
+            used = cache.incr(key)
+    if used <= count:
+        return 0
+    if len(_blocked_until) >= MAX_BLOCKED_KEYS:
+        _blocked_until.clear()
+    _blocked_until[key] = (window + 1) * period
+    return retry_after
+
+
+def ratelimit(rate, scope=None, methods=('POST',), key=user_ip_key):
+    """Декоратор view: не больше ``rate`` запросов ``methods`` на ключ.
+
+    Ставится под ``login_required``, чтобы анонимные запросы отсекались
+    раньше, чем тратят токены. Частоту можно переопределить в
+    ``settings.RATELIMITS`` по имени ``scope`` (по умолчанию — имя view).
+    """
+    def decorator(view_func):
+        view_scope = scope or view_func.__name__
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if (
+                getattr(settings, 'RATELIMIT_ENABLE', True)
+                and request.method in methods
+            ):
+                view_rate = getattr(settings, 'RATELIMITS', {}).get(
+                    view_scope, rate
+                )
+                retry_after = take_token(view_scope, key(request), view_rate)
+                if retry_after:
+                    return too_many_requests(request, retry_after)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
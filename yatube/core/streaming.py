@@ -0,0 +1,157 @@
+"""Потоковый рендеринг шаблонов.
+
+Вместо одной строки шаблон отдаётся кусками: наследование, блоки и
+циклы ``{% for %}`` обходятся по узлам, остальные узлы рендерятся как
+обычно. Кусок уходит клиенту после каждого ``{% include %}`` и каждой
+итерации цикла, поэтому ``<head>`` и шапка приходят раньше, чем
+отрендерены карточки постов.
+
+Заголовки ответа отправляются до рендеринга, так что ошибка в шаблоне
+обрывает ответ, а не превращается в страницу 500. По той же причине
+middleware отрабатывают раньше шаблона: пользователь, сессия и
+CSRF-токен, которые шаблон прочитал бы лениво, читаются заранее, иначе
+ответ ушёл бы без ``Vary: Cookie`` и cookie csrftoken.
+"""
+from django.http import StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.template import loader
+from django.template.base import TextNode
+from django.template.context import make_context
+from django.template.defaulttags import ForNode
+from django.template.loader_tags import (
+    BLOCK_CONTEXT_KEY, BlockContext, BlockNode, ExtendsNode, IncludeNode,
+)
+from django.utils.cache import patch_vary_headers
+from django.utils.safestring import mark_safe
+
+FLUSH = object()
+
+
+def iter_nodelist(nodelist, context):
+    for node in nodelist:
+        yield from iter_node(node, context)
+
+
+def iter_node(node, context):
+    if isinstance(node, ExtendsNode):
+        yield from iter_extends(node, context)
+    elif isinstance(node, BlockNode):
+        yield from iter_block(node, context)
+    elif isinstance(node, ForNode) and len(node.loopvars) == 1:
+        yield from iter_for(node, context)
+    else:
+        yield node.render_annotated(context)
+        if isinstance(node, IncludeNode):
+            yield FLUSH
+
+
+def iter_extends(node, context):
+    """Повторяет ExtendsNode.render, но рендерит родителя по узлам."""
+    compiled_parent = node.get_parent(context)
+    if BLOCK_CONTEXT_KEY not in context.render_context:
+        context.render_context[BLOCK_CONTEXT_KEY] = BlockContext()
+    block_context = context.render_context[BLOCK_CONTEXT_KEY]
+    block_context.add_blocks(node.blocks)
+    for parent_node in compiled_parent.nodelist:
+        if not isinstance(parent_node, TextNode):
+            if not isinstance(parent_node, ExtendsNode):
+                block_context.add_blocks({
+                    block.name: block for block in
+                    compiled_parent.nodelist.get_nodes_by_type(BlockNode)
+                })
+            break
+    with context.render_context.push_state(
+        compiled_parent, isolated_context=False
+    ):
+        yield from iter_nodelist(compiled_parent.nodelist, context)
+
+
+def iter_block(node, context):
+    """Повторяет BlockNode.render с учётом переопределённых блоков."""
+    block_context = context.render_context.get(BLOCK_CONTEXT_KEY)
+    with context.push():
+        if block_context is None:
+            context['block'] = node
+            yield from iter_nodelist(node.nodelist, context)
+            return
+        push = block = block_context.pop(node.name)
+        if block is None:
+            block = node
+        block = type(node)(block.name, block.nodelist)
+        block.context = context
+        context['block'] = block
+        yield from iter_nodelist(block.nodelist, context)
+        if push is not None:
+            block_context.push(node.name, push)
+
+
+def iter_for(node, context):
+    """Повторяет ForNode.render с одной переменной цикла."""
+    parentloop = context['forloop'] if 'forloop' in context else {}
+    with context.push():
+        values = node.sequence.resolve(context, ignore_failures=True)
+        if values is None:
+            values = []
+        if not hasattr(values, '__len__'):
+            values = list(values)
+        len_values = len(values)
+        if len_values < 1:
+            yield node.nodelist_empty.render(context)
+            return
+        if node.is_reversed:
+            values = reversed(values)
+        loop_dict = context['forloop'] = {'parentloop': parentloop}
+        for i, item in enumerate(values):
+            loop_dict['counter0'] = i
+            loop_dict['counter'] = i + 1
+            loop_dict['revcounter'] = len_values - i
+            loop_dict['revcounter0'] = len_values - i - 1
+            loop_dict['first'] = (i == 0)
+            loop_dict['last'] = (i == len_values - 1)
+            context[node.loopvars[0]] = item
+            for loop_node in node.nodelist_loop:
+                yield loop_node.render_annotated(context)
+            yield FLUSH
+
+
+def iter_template(backend_template, context=None, request=None):
+    """Куски страницы; каждый заканчивается на точке сброса."""
+    template = backend_template.template
+    context = make_context(
+        context, request, autoescape=backend_template.backend.engine.autoescape
+    )
+    buffer = []
+    with context.render_context.push_state(template):
+        with context.bind_template(template):
+            context.template_name = template.name
+            for piece in iter_nodelist(template.nodelist, context):
+                if piece is not FLUSH:
+                    buffer.append(piece)
+                elif buffer:
+                    yield mark_safe(''.join(buffer))
+                    buffer = []
+    if buffer:
+        yield mark_safe(''.join(buffer))
+
+
+def stream_render(request, template_name, context=None, content_type=None,
+                  status=None, using=None):
+    """Потоковый аналог django.shortcuts.render.
+
+    Шаблон загружается сразу, чтобы его отсутствие стало ошибкой вью,
+    а не оборванным ответом.
+    """
+    template = loader.get_template(template_name, using=using)
+    response = StreamingHttpResponse(
+        iter_template(template, context, request),
+        content_type=content_type,
+        status=status,
+    )
+    if request is not None:
+        if hasattr(request, 'user'):
+            # Ленивый пользователь читает сессию, и SessionMiddleware
+            # добавит Vary: Cookie.
+            request.user.is_authenticated
+        get_token(request)
+        patch_vary_headers(response, ('Cookie',))
+    return response
@@ -0,0 +1,44 @@
+from django import template
+from django.template.base import token_kwargs
+from django.template.loader_tags import IncludeNode
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+
+class EsiNode(IncludeNode):
+    def render(self, context):
+        request = getattr(context, 'request', None)
+        fragments = getattr(request, 'esi_fragments', None)
+        if fragments is None:
+            return super().render(context)
+        values = {
+            key: value.resolve(context)
+            for key, value in self.extra_context.items()
+        }
+        fragments.append((self.template.resolve(context), values))
+        return mark_safe(f'<!--esi:{len(fragments) - 1}-->')
+
+
+@register.tag
+def esi(parser, token):
+    """Фрагмент страницы, который зависит от пользователя.
+
+    ``{% esi 'posts/includes/edit_link.html' post_id=post.pk %}``
+    работает как include с параметрами, но при общем рендеринге для кеша
+    (core.page_cache) оставляет метку, а фрагмент рендерится отдельно
+    для каждого пользователя. Поэтому фрагмент может опираться только на
+    переданные простые значения и контекст-процессоры.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} ожидает имя шаблона'
+        )
+    remaining = bits[2:]
+    values = token_kwargs(remaining, parser)
+    if remaining:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} принимает только именованные параметры'
+        )
+    return EsiNode(parser.compile_filter(bits[1]), extra_context=values)
@@ -0,0 +1,13 @@
+from django import template
+from django.urls import reverse
+
+register = template.Library()
+
+
+@register.filter
+def resized(image, size):
+    """``{{ post.image|resized:'960x339' }}`` — адрес уменьшенной копии."""
+    if not image:
+        return ''
+    width, height = size.split('x')
+    return reverse('resize_image', args=[int(width), int(height), image.name])
@@ -0,0 +1,19 @@
+from django import template
+
+from core.navigation import build_url
+from core.paginator import elided_page_range
+
+register = template.Library()
+
+
+@register.simple_tag
+def cached_url(viewname, *args):
+    return build_url(viewname, *args)
+
+
+@register.simple_tag
+def page_links(page_obj, on_each_side=3, on_ends=2):
+    """Номера страниц вокруг ``page_obj`` и по краям, с '…' в пропусках."""
+    return list(elided_page_range(
+        page_obj.paginator, page_obj.number, on_each_side, on_ends
+    ))
@@ -0,0 +1,851 @@
+import asyncio
+import gzip
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from http import HTTPStatus
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.templatetags.static import static
+from django.test import (
+    Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+
+from PIL import Image
+
+from posts.models import Comment, Group, Post
+
+from . import images, model_cache, ratelimit
+from .asgi import AsgiHandler
+from .middleware import WhitespaceCollapser
+from .navigation import build_url
+from .paginator import (
+    COLD_TIMEOUT, COUNT_TIMEOUT, ELLIPSIS, CachedCountPaginator,
+    EstimatedCountPaginator, forget_counts,
+)
+from .template_profiler import TemplateProfiler
+from .wsgi import (
+    EdgeCacheApplication, IMMUTABLE_CACHE_CONTROL, StaticFilesApplication,
+)
+
+User = get_user_model()
+
+DB_SESSIONS = 'django.contrib.sessions.backends.db'
+CACHED_DB_SESSIONS = 'django.contrib.sessions.backends.cached_db'
+SIGNED_COOKIE_SESSIONS = 'django.contrib.sessions.backends.signed_cookies'
+
+
+class SessionEngineQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='SessionUser')
+        cls.post = Post.objects.create(author=cls.user, text='Test text')
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def count_queries(self, engine, url):
+        with self.settings(SESSION_ENGINE=engine):
+            client = Client()
+            client.force_login(self.user)
+            with CaptureQueriesContext(connection) as queries:
+                client.get(url)
+        return len(queries)
+
+    def test_session_engines_save_queries(self):
+        """Проверка: cached_db и signed_cookies экономят запрос к
+        django_session на каждой странице авторизованного пользователя."""
+        urls = [
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        ]
+        for url in urls:
+            self.count_queries(DB_SESSIONS, url)
+            db_queries = self.count_queries(DB_SESSIONS, url)
+            for engine in (CACHED_DB_SESSIONS, SIGNED_COOKIE_SESSIONS):
+                with self.subTest(url=url, engine=engine):
+                    self.assertEqual(
+                        db_queries - self.count_queries(engine, url), 1
+                    )
+
+
+@override_settings(SESSION_ENGINE=DB_SESSIONS)
+class PurgeSessionsCommandTests(TestCase):
+    def test_purge_sessions_removes_only_expired(self):
+        """Проверка: команда удаляет пачками только истёкшие сессии."""
+        now = timezone.now()
+        Session.objects.bulk_create(
+            Session(
+                session_key=f'expired{i}',
+                session_data='',
+                expire_date=now - timedelta(days=1),
+            )
+            for i in range(5)
+        )
+        Session.objects.create(
+            session_key='alive',
+            session_data='',
+            expire_date=now + timedelta(days=1),
+        )
+        call_command('purge_sessions', batch_size=2, stdout=StringIO())
+        self.assertEqual(
+            list(Session.objects.values_list('session_key', flat=True)),
+            ['alive'],
+        )
+
+
+@override_settings(RATELIMITS={'add_comment': '2/m'})
+class RateLimitTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Spammer')
+        cls.other_user = User.objects.create_user(username='Reader')
+        cls.post = Post.objects.create(author=cls.user, text='Test text')
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        ratelimit._blocked_until.clear()
+        self.url = reverse(
+            'posts:add_comment', kwargs={'post_id': self.post.id}
+        )
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        cache.clear()
+        ratelimit._blocked_until.clear()
+        super().tearDown()
+
+    def test_too_many_comments_get_429(self):
+        """Проверка: сверх лимита комментарии отклоняются с 429
+        и заголовком Retry-After."""
+        for _ in range(2):
+            response = self.client.post(self.url, {'text': 'spam'})
+            self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        response = self.client.post(self.url, {'text': 'spam'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 60)
+        self.assertEqual(Comment.objects.count(), 2)
+
+    def test_limit_is_per_user(self):
+        """Проверка: лимит одного пользователя не мешает другому."""
+        for _ in range(3):
+            self.client.post(self.url, {'text': 'spam'})
+        other_client = Client()
+        other_client.force_login(self.other_user)
+        response = other_client.post(self.url, {'text': 'hello'})
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_get_requests_are_not_limited(self):
+        """Проверка: GET-запросы к форме не тратят токены."""
+        create_url = reverse('posts:post_create')
+        with self.settings(RATELIMITS={'post_create': '1/m'}):
+            for _ in range(3):
+                response = self.client.get(create_url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+class AsgiHandlerTests(SimpleTestCase):
+    def request(self, path):
+        handler = AsgiHandler(get_wsgi_application(), max_workers=2)
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': b'',
+            'headers': [(b'host', b'testserver')],
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(handler(scope, receive, send))
+        handler.executor.shutdown()
+        return messages
+
+    def test_asgi_handler_serves_django_views(self):
+        """Проверка: ASGI-обёртка отдаёт ответ Django-view."""
+        messages = self.request('/about/author/')
+        self.assertEqual(messages[0]['type'], 'http.response.start')
+        self.assertEqual(messages[0]['status'], HTTPStatus.OK)
+        body = b''.join(m.get('body', b'') for m in messages[1:])
+        self.assertIn(b'<html', body)
+        self.assertFalse(messages[-1].get('more_body', False))
+
+
+TEMP_STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(
+    STATIC_ROOT=TEMP_STATIC_ROOT,
+    STATICFILES_STORAGE='core.storage.CompressedManifestStaticFilesStorage',
+)
+class StaticPipelineTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+
+    def request(self, path, **headers):
+        calls = []
+        application = StaticFilesApplication(
+            lambda environ, start_response: [b'django'],
+        )
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, **headers}
+        body = b''.join(application(
+            environ, lambda status, headers: calls.append((status, headers))
+        ))
+        status, headers = calls[0] if calls else (None, [])
+        return status, dict(headers), body
+
+    def test_collectstatic_writes_hashed_gzip_copies(self):
+        """Проверка: collectstatic создаёт файлы с хешем и копии .gz."""
+        url = static('css/bootstrap.min.css')
+        self.assertRegex(url, r'bootstrap\.min\.[0-9a-f]{12}\.css$')
+        path = os.path.join(TEMP_STATIC_ROOT, url[len(settings.STATIC_URL):])
+        with open(path, 'rb') as original, gzip.open(f'{path}.gz') as copy:
+            self.assertEqual(original.read(), copy.read())
+
+    def test_static_layer_serves_precompressed_files(self):
+        """Проверка: WSGI-слой отдаёт сжатую копию с вечным кешем
+        и отвечает 304 на повторный запрос."""
+        url = static('css/bootstrap.min.css')
+        status, headers, body = self.request(
+            url, HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(int(headers['Content-Length']), len(body))
+        status, _, body = self.request(
+            url,
+            HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=headers['ETag'],
+        )
+        self.assertEqual(status, '304 Not Modified')
+        self.assertEqual(body, b'')
+
+    def test_static_layer_respects_zero_quality(self):
+        """Проверка: br;q=0 и gzip;q=0 запрещают сжатые копии."""
+        url = static('css/bootstrap.min.css')
+        _, headers, _ = self.request(
+            url, HTTP_ACCEPT_ENCODING='gzip;q=0, br;q=0, *'
+        )
+        self.assertNotIn('Content-Encoding', headers)
+
+    def test_static_layer_passes_other_requests_to_django(self):
+        """Проверка: остальные запросы уходят в Django."""
+        status, _, body = self.request('/about/author/')
+        self.assertIsNone(status)
+        self.assertEqual(body, b'django')
+
+
+class TemplateProfilerTests(SimpleTestCase):
+    def test_profiler_records_templates_and_includes(self):
+        """Проверка: профилировщик строит дерево шаблонов и include."""
+        with TemplateProfiler() as profiler:
+            self.client.get('/about/author/')
+        page = profiler.root.children['about/author.html']
+        base = page.children['base.html']
+        header = base.children["{% include 'includes/header.html' %}"]
+        self.assertEqual(page.calls, 1)
+        self.assertIn('includes/header.html', header.children)
+        self.assertGreaterEqual(page.total, base.total)
+        self.assertIn(
+            "about/author.html;base.html;{% include 'includes/header.html' %}",
+            profiler.folded(),
+        )
+
+    def test_profile_templates_command(self):
+        """Проверка: команда выводит разбивку времени по шаблонам."""
+        out = StringIO()
+        call_command('profile_templates', '/about/tech/', stdout=out)
+        self.assertIn('about/tech.html', out.getvalue())
+        self.assertIn('includes/footer.html', out.getvalue())
+
+
+class NavigationTests(SimpleTestCase):
+    def test_build_url_matches_reverse(self):
+        """Проверка: кешированные ссылки совпадают с reverse()."""
+        cases = [
+            ('posts:index', ()),
+            ('posts:profile', ('user.name@mail+1',)),
+            ('posts:profile', ('Пользователь',)),
+            ('posts:group_list', ('test-slug',)),
+            ('posts:post_detail', (100500,)),
+            ('posts:post_edit', (7,)),
+        ]
+        for viewname, args in cases:
+            with self.subTest(viewname=viewname, args=args):
+                self.assertEqual(
+                    build_url(viewname, *args), reverse(viewname, args=args)
+                )
+
+    def test_build_url_falls_back_to_reverse(self):
+        """Проверка: необычные значения проверяет обычный reverse()."""
+        with self.assertRaises(NoReverseMatch):
+            build_url('posts:profile', 'with/slash')
+
+    def test_header_uses_navigation_context(self):
+        """Проверка: шапка строится из контекста навигации."""
+        response = self.client.get(reverse('about:tech'))
+        self.assertEqual(response.context['view_name'], 'about:tech')
+        self.assertEqual(
+            response.context['nav']['about_tech'], reverse('about:tech')
+        )
+        self.assertContains(response, f'href="{reverse("users:signup")}"')
+
+
+class StreamingRenderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='streamer')
+        cls.group = Group.objects.create(title='Поток', slug='stream')
+        for number in range(3):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+
+    def get_page(self, streaming):
+        with self.settings(
+            STREAMING_RENDER=streaming, COLLAPSE_WHITESPACE=False
+        ):
+            return Client().get(
+                reverse('posts:group_list', args=[self.group.slug])
+            )
+
+    def test_streamed_page_matches_rendered_page(self):
+        """Проверка: потоковая страница совпадает с обычной."""
+        rendered = self.get_page(streaming=False)
+        streamed = self.get_page(streaming=True)
+        self.assertFalse(rendered.streaming)
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(
+            b''.join(streamed.streaming_content).decode(),
+            rendered.content.decode(),
+        )
+
+    def test_streamed_page_varies_on_cookie(self):
+        """Проверка: потоковая страница с именем пользователя в шапке
+        не попадёт в общий кеш и ставит cookie csrftoken."""
+        client = Client()
+        client.force_login(self.author)
+        with self.settings(STREAMING_RENDER=True):
+            response = client.get(
+                reverse('posts:profile', args=[self.author.username])
+            )
+        self.assertTrue(response.streaming)
+        self.assertIn('Cookie', response['Vary'])
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+
+    def test_head_and_header_are_flushed_before_posts(self):
+        """Проверка: шапка уходит отдельным куском, посты — по одному."""
+        chunks = [
+            chunk.decode()
+            for chunk in self.get_page(streaming=True).streaming_content
+        ]
+        first_post = next(
+            number for number, chunk in enumerate(chunks) if 'Пост' in chunk
+        )
+        head = ''.join(chunks[:first_post])
+        self.assertIn('</head>', head)
+        self.assertIn('</header>', head)
+        self.assertEqual(
+            sum('Пост' in chunk for chunk in chunks[first_post:]), 3
+        )
+
+
+class CollapseWhitespaceTests(SimpleTestCase):
+    html = (
+        '<ul>\n    <li>  один  </li>\n\n    <li>два</li>\n</ul>\n'
+        '<pre>  код\n    с отступом</pre>\n'
+        '<textarea name="text">\n  текст  </textarea>\n'
+        '<script>\n  if (a  <  b) {}\n</script>\n'
+    )
+    collapsed = (
+        '<ul>\n<li> один </li>\n<li>два</li>\n</ul>\n'
+        '<pre>  код\n    с отступом</pre>\n'
+        '<textarea name="text">\n  текст  </textarea>\n'
+        '<script>\n  if (a  <  b) {}\n</script>\n'
+    )
+
+    def collapse(self, chunks):
+        collapser = WhitespaceCollapser()
+        return ''.join(map(collapser.feed, chunks)) + collapser.close()
+
+    def test_collapses_indentation_outside_protected_tags(self):
+        """Проверка: отступы схлопываются, pre/textarea/script не трогаются."""
+        self.assertEqual(self.collapse([self.html]), self.collapsed)
+
+    def test_chunk_boundaries_do_not_change_result(self):
+        """Проверка: разбиение на куски не меняет результат."""
+        for size in (1, 3, 7, 16):
+            with self.subTest(size=size):
+                chunks = [
+                    self.html[start:start + size]
+                    for start in range(0, len(self.html), size)
+                ]
+                self.assertEqual(self.collapse(chunks), self.collapsed)
+
+    def test_middleware_collapses_html_responses(self):
+        """Проверка: из HTML-ответа убраны отступы шаблонов."""
+        response = self.client.get(reverse('about:tech'))
+        self.assertNotIn(b'\n  ', response.content)
+        self.assertNotIn(b'  ', response.content)
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='counter')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {number}') for number in range(7)
+        )
+
+    def test_count_is_exact_below_limit(self):
+        """Проверка: небольшие выборки считаются точно."""
+        paginator = EstimatedCountPaginator(Post.objects.all(), 3)
+        self.assertEqual(paginator.count, 7)
+        self.assertEqual(paginator.num_pages, 3)
+
+    def test_count_stops_at_limit(self):
+        """Проверка: подсчёт не идёт дальше count_limit строк."""
+        paginator = EstimatedCountPaginator(Post.objects.all(), 3)
+        paginator.count_limit = 5
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(paginator.count, 5)
+        self.assertIn('LIMIT 5', queries[0]['sql'])
+
+
+class CachedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='counter')
+        cls.other = User.objects.create_user(username='other')
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Пост {number}')
+            for number in range(7)
+        )
+        Post.objects.create(author=cls.other, text='Чужой пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def count(self, queryset, **options):
+        return CachedCountPaginator(queryset, 3, **options).count
+
+    def test_count_is_cached_per_query(self):
+        """Проверка: COUNT(*) выполняется один раз на запрос ленты,
+        сортировка и select_related на подпись не влияют."""
+        self.assertEqual(self.count(self.author.posts.all()), 7)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.count(
+                Post.objects.filter(author=self.author)
+                .select_related('group').order_by('pk')
+            ), 7)
+        self.assertEqual(self.count(Post.objects.all()), 8)
+
+    def test_count_parts_are_summed(self):
+        """Проверка: число ленты подписок — сумма чисел по авторам,
+        недостающие числа считаются одним запросом."""
+        nobody = User.objects.create_user(username='nobody')
+        authors = [self.author.pk, self.other.pk, nobody.pk]
+        count_by = (Post.objects.all(), 'author_id', authors)
+        feed = Post.objects.filter(author_id__in=authors)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.count(feed, count_by=count_by), 8)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.count(feed, count_by=count_by), 8)
+        self.assertEqual(self.count(self.author.posts.all()), 7)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.count(Post.objects.filter(
+                author_id=nobody.pk
+            )), 0)
+
+    def test_forget_counts_recounts(self):
+        """Проверка: после массового update() числа считаются заново."""
+        self.count(self.author.posts.all())
+        Post.objects.filter(author=self.author).update(is_deleted=True)
+        forget_counts(Post)
+        self.assertEqual(self.count(self.author.posts.all()), 0)
+
+    def test_elided_page_range(self):
+        """Проверка: ссылок на страницы не больше 2 * (3 + 2) + 1."""
+        paginator = CachedCountPaginator(range(100), 2)
+        self.assertEqual(list(paginator.get_elided_page_range(25)), [
+            1, 2, ELLIPSIS, 22, 23, 24, 25, 26, 27, 28, ELLIPSIS, 49, 50,
+        ])
+        self.assertEqual(list(paginator.get_elided_page_range(2)), [
+            1, 2, 3, 4, 5, ELLIPSIS, 49, 50,
+        ])
+        self.assertEqual(
+            list(CachedCountPaginator(range(10), 1).get_elided_page_range(5)),
+            list(range(1, 11)),
+        )
+
+
+class CachedCountAdjustmentTests(TransactionTestCase):
+    """Правки чисел идут после коммита, поэтому без обёртки TestCase."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='counter')
+        self.other = User.objects.create_user(username='other')
+        Post.objects.create(author=self.author, text='Пост')
+        Post.objects.create(author=self.other, text='Чужой пост')
+
+    def count(self, queryset):
+        return CachedCountPaginator(queryset, 3).count
+
+    def test_signals_adjust_cached_counts(self):
+        """Проверка: создание и удаление постов правят числа в кеше."""
+        self.count(Post.objects.all())
+        self.count(self.author.posts.all())
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        Post.objects.filter(author=self.other).get().soft_delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.count(Post.objects.all()), 2)
+            self.assertEqual(self.count(self.author.posts.all()), 2)
+        post.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.count(self.author.posts.all()), 1)
+
+    def test_rolled_back_posts_are_not_counted(self):
+        """Проверка: откаченная транзакция не меняет число в кеше."""
+        self.count(Post.objects.all())
+        with transaction.atomic():
+            Post.objects.create(author=self.author, text='Откат')
+            transaction.set_rollback(True)
+        self.assertEqual(self.count(Post.objects.all()), 2)
+
+    def test_count_racing_with_writes_is_kept_briefly(self):
+        """Проверка: число, во время подсчёта которого менялись посты,
+        хранится только COLD_TIMEOUT."""
+        original = QuerySet.count
+
+        def count_then_write(queryset):
+            result = original(queryset)
+            Post.objects.create(author=self.author, text='Во время подсчёта')
+            return result
+
+        with mock.patch.object(QuerySet, 'count', count_then_write), \
+                mock.patch.object(cache, 'add', wraps=cache.add) as add:
+            self.assertEqual(self.count(self.author.posts.all()), 1)
+        add.assert_any_call(mock.ANY, 1, COLD_TIMEOUT)
+        cache.clear()
+        with mock.patch.object(cache, 'add', wraps=cache.add) as add:
+            self.assertEqual(self.count(self.author.posts.all()), 2)
+        add.assert_any_call(mock.ANY, 2, COUNT_TIMEOUT)
+
+
+class EdgeCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.rendered = []
+        django_application = get_wsgi_application()
+
+        def counting_application(environ, start_response):
+            self.rendered.append(environ['PATH_INFO'])
+            return django_application(environ, start_response)
+
+        self.application = EdgeCacheApplication(counting_application)
+
+    def request(self, path, **headers):
+        calls = []
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(),
+            'wsgi.errors': StringIO(),
+            **headers,
+        }
+        body = b''.join(self.application(
+            environ, lambda status, headers: calls.append((status, headers))
+        ))
+        status, headers = calls[0]
+        return status, dict(headers), body
+
+    def test_anonymous_hits_are_served_from_memory(self):
+        """Проверка: страница рендерится один раз, дальше отдаётся из памяти
+        с заголовками кеша, сжатием и ответом 304."""
+        url = reverse('about:author')
+        status, headers, body = self.request(url)
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(self.rendered, [url])
+        self.assertIn('max-age', headers['Cache-Control'])
+        self.assertIn('Cookie', headers['Vary'])
+        _, gzip_headers, gzip_body = self.request(
+            url, HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(gzip_headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(gzip_body), body)
+        status, _, body = self.request(
+            url, HTTP_IF_NONE_MATCH=headers['ETag']
+        )
+        self.assertEqual(status, '304 Not Modified')
+        self.assertEqual(self.rendered, [url])
+
+    def test_encoding_and_etag_are_parsed(self):
+        """Проверка: gzip;q=0 отдаётся без сжатия, ETag сравнивается
+        целиком, а не как подстрока."""
+        url = reverse('about:author')
+        _, headers, _ = self.request(
+            url, HTTP_ACCEPT_ENCODING='gzip;q=0, identity'
+        )
+        self.assertNotIn('Content-Encoding', headers)
+        _, headers, _ = self.request(url, HTTP_ACCEPT_ENCODING='*;q=0.5')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        _, headers, _ = self.request(url, HTTP_ACCEPT_ENCODING='xgzip')
+        self.assertNotIn('Content-Encoding', headers)
+        etag = headers['ETag']
+        status, _, _ = self.request(url, HTTP_IF_NONE_MATCH=f'{etag}-x')
+        self.assertEqual(status, '200 OK')
+        status, _, _ = self.request(
+            url, HTTP_IF_NONE_MATCH=f'"other", W/{etag}'
+        )
+        self.assertEqual(status, '304 Not Modified')
+
+    def test_pages_are_kept_per_host_and_scheme(self):
+        """Проверка: копия страницы своя для каждого хоста и схемы,
+        запрос с неразрешённым хостом не попадает в кеш."""
+        url = reverse('about:author')
+        self.request(url)
+        self.request(url, HTTP_HOST='localhost')
+        self.request(url, HTTP_HOST='localhost')
+        self.request(url, **{'wsgi.url_scheme': 'https'})
+        self.assertEqual(self.rendered, [url, url, url])
+        status, _, _ = self.request(url, HTTP_HOST='evil.example.com')
+        self.assertEqual(status, '400 Bad Request')
+        status, _, _ = self.request(url, HTTP_HOST='evil.example.com')
+        self.assertEqual(status, '400 Bad Request')
+        self.assertEqual(len(self.rendered), 5)
+        self.assertEqual(len(self.application.pages), 3)
+
+    def test_sessions_and_other_pages_go_to_django(self):
+        """Проверка: запросы с сессией, параметрами и другие адреса
+        обрабатывает Django."""
+        url = reverse('about:tech')
+        self.request(url, HTTP_COOKIE=f'{settings.SESSION_COOKIE_NAME}=abc')
+        self.request(url, QUERY_STRING='a=1')
+        self.request(reverse('users:login'))
+        self.assertEqual(
+            self.rendered, [url, url, reverse('users:login')]
+        )
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    RESIZE_CACHE_DIR=os.path.join(TEMP_MEDIA_ROOT, 'cache'),
+    RESIZE_SIZES=['40x20', '30x0'],
+)
+class ResizeImageTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'))
+        Image.new('RGB', (400, 300), 'red').save(
+            os.path.join(TEMP_MEDIA_ROOT, 'posts', 'photo.jpg')
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def get_image(self, size, name='posts/photo.jpg'):
+        response = self.client.get(f'/media/resize/{size}/{name}')
+        if response.status_code != HTTPStatus.OK:
+            return response, None
+        content = b''.join(response.streaming_content)
+        return response, Image.open(BytesIO(content))
+
+    def test_resizes_to_allowed_sizes(self):
+        """Проверка: картинка обрезается до размера из списка."""
+        response, image = self.get_image('40x20')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('max-age', response['Cache-Control'])
+        self.assertEqual(image.size, (40, 20))
+        _, image = self.get_image('30x0')
+        self.assertEqual(image.size, (30, 22))
+
+    def test_rejects_unknown_sizes_and_paths(self):
+        """Проверка: чужие размеры и пути не обрабатываются."""
+        self.assertEqual(
+            self.get_image('41x20')[0].status_code, HTTPStatus.NOT_FOUND
+        )
+        self.assertEqual(
+            self.get_image('40x20', 'posts/missing.jpg')[0].status_code,
+            HTTPStatus.NOT_FOUND,
+        )
+        self.assertEqual(
+            self.get_image('40x20', '../settings.py')[0].status_code,
+            HTTPStatus.BAD_REQUEST,
+        )
+
+    def test_undecodable_images_are_not_found(self):
+        """Проверка: битая и слишком большая картинка дают 404."""
+        photo = os.path.join(TEMP_MEDIA_ROOT, 'posts', 'photo.jpg')
+        with open(photo, 'rb') as source:
+            data = source.read()
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'posts', 'cut.jpg'),
+                  'wb') as target:
+            target.write(data[:len(data) // 2])
+        self.assertEqual(
+            self.get_image('40x20', 'posts/cut.jpg')[0].status_code,
+            HTTPStatus.NOT_FOUND,
+        )
+        shutil.copy(photo, os.path.join(TEMP_MEDIA_ROOT, 'posts', 'big.jpg'))
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 100):
+            self.assertEqual(
+                self.get_image('30x0', 'posts/big.jpg')[0].status_code,
+                HTTPStatus.NOT_FOUND,
+            )
+
+    def test_disk_cache_evicts_least_recently_read(self):
+        """Проверка: при переполнении удаляются давно не читанные копии."""
+        root = os.path.join(TEMP_MEDIA_ROOT, 'lru')
+        disk_cache = images.DiskCache(root, max_size=25)
+        for key, mtime in (('read', 1), ('old', 2)):
+            disk_cache.put(key, lambda target: target.write(b'x' * 10))
+            os.utime(disk_cache.path(key), (mtime, mtime))
+        disk_cache.get('read')
+        disk_cache.put('new', lambda target: target.write(b'x' * 10))
+        self.assertIsNotNone(disk_cache.get('read'))
+        self.assertIsNone(disk_cache.get('old'))
+        self.assertIsNotNone(disk_cache.get('new'))
+        self.assertEqual(disk_cache.size, 20)
+
+
+class ModelCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='cached')
+        cls.group = Group.objects.create(title='Кеш', slug='cache')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        model_cache._counters.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_second_read_comes_from_cache(self):
+        """Проверка: повторное чтение по pk и slug не идёт в базу."""
+        model_cache.get(Group, slug='cache')
+        with self.assertNumQueries(0):
+            self.assertEqual(model_cache.get(Group, slug='cache'), self.group)
+            self.assertEqual(model_cache.get(Group, pk=self.group.pk).title,
+                             'Кеш')
+        self.assertEqual(
+            model_cache.stats()['posts.Group'], {'hits': 2, 'misses': 1}
+        )
+
+    def test_get_many_loads_only_misses(self):
+        """Проверка: get_many добирает из базы только промахи."""
+        ids = [post.pk for post in self.posts]
+        model_cache.get(Post, pk=ids[0])
+        with self.assertNumQueries(1):
+            found = model_cache.get_many(Post, ids + [0])
+        self.assertEqual(sorted(found), ids)
+        with self.assertNumQueries(0):
+            model_cache.get_many(Post, ids)
+
+    def test_save_and_rename_invalidate(self):
+        """Проверка: изменение и переименование сбрасывают кеш."""
+        model_cache.get(User, username='cached')
+        self.user.username = 'renamed'
+        self.user.save()
+        self.assertEqual(
+            model_cache.get(User, pk=self.user.pk).username, 'renamed'
+        )
+        with self.assertRaises(User.DoesNotExist):
+            model_cache.get(User, username='cached')
+
+    def test_soft_deleted_post_is_not_found(self):
+        """Проверка: мягко удалённый пост пропадает из кеша."""
+        post = model_cache.get(Post, pk=self.posts[0].pk)
+        post.soft_delete()
+        with self.assertRaises(Post.DoesNotExist):
+            model_cache.get(Post, pk=post.pk)
+
+    def test_passwords_are_not_cached(self):
+        """Проверка: хеш пароля не попадает в общий кеш."""
+        model_cache.get(User, pk=self.user.pk)
+        _, cached = cache.get(model_cache.make_key(User, 'pk', self.user.pk))
+        self.assertIn('password', cached.get_deferred_fields())
+        self.assertNotIn('password', cached.__dict__)
+
+    def test_unique_values_are_hashed_in_keys(self):
+        """Проверка: имя пользователя не попадает в ключ кеша."""
+        key = model_cache.make_key(User, 'username', 'Имя с пробелом')
+        self.assertNotIn('Имя', key)
+        self.assertNotIn(' ', key)
+        model_cache.get(User, username='cached')
+        with self.assertNumQueries(0):
+            model_cache.get(User, username='cached')
+
+    def test_fill_racing_with_write_is_not_read(self):
+        """Проверка: строка, прочитанная до чужой записи и положенная в
+        кеш после её сброса, не читается."""
+        pk = self.posts[0].pk
+        versions = model_cache._read(Post, [pk])[1]
+        stale = Post.objects.get(pk=pk)
+        Post.objects.filter(pk=pk).update(text='Новый текст')
+        model_cache.invalidate_pks(Post, [pk])
+        model_cache._fill([stale], versions)
+        self.assertEqual(model_cache.get(Post, pk=pk).text, 'Новый текст')
+
+    def test_edit_reads_post_from_database(self):
+        """Проверка: правка поста не сохраняет устаревшую копию из кеша
+        поверх мягкого удаления."""
+        post = self.posts[1]
+        model_cache.get(Post, pk=post.pk)
+        Post.objects.filter(pk=post.pk).update(is_deleted=True)
+        client = Client()
+        client.force_login(self.user)
+        response = client.post(
+            reverse('posts:post_edit', args=[post.pk]), {'text': 'Правка'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertTrue(Post.all_objects.get(pk=post.pk).is_deleted)
+
+    def test_stats_command(self):
+        """Проверка: команда выводит счётчики по моделям."""
+        model_cache.get(Post, pk=self.posts[0].pk)
+        out = StringIO()
+        call_command('model_cache_stats', stdout=out)
+        self.assertIn('posts.Post: попаданий 0, промахов 1', out.getvalue())
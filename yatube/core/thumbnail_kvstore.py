@@ -0,0 +1,102 @@
+"""Хранилище метаданных sorl-thumbnail без таблицы в базе.
+
+Стандартный cached_db KVStore при промахе кеша идёт в таблицу
+thumbnail_kvstore, и каждая карточка с картинкой на холодном кеше даёт
+запрос. Здесь метаданные живут только в общем кеше (THUMBNAIL_CACHE),
+а перед ним стоит LRU в памяти процесса на THUMBNAIL_LRU_SIZE записей:
+повторный ``{% thumbnail %}`` не ходит даже в кеш. Запись в LRU живёт
+не дольше THUMBNAIL_LRU_TIMEOUT секунд, чтобы удаление миниатюры в
+другом процессе не оставалось незамеченным.
+
+Кеш не умеет перечислять ключи, а общий список ключей пришлось бы
+переписывать целиком при каждой записи. Поэтому ключи в кеше содержат
+поколение: ``thumbnail clear`` поднимает его, и старые записи больше не
+читаются, а вытесняются кешем сами. ``thumbnail cleanup`` и
+``thumbnail clear_delete_all`` ключей не видят и ничего не делают;
+миниатюры удалённой картинки sorl находит по её собственной записи.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.kvstores.base import KVStoreBase
+
+LRU_SIZE = 10000
+LRU_TIMEOUT = 300
+
+
+class KVStore(KVStoreBase):
+    def __init__(self):
+        super().__init__()
+        self.lru_size = getattr(settings, 'THUMBNAIL_LRU_SIZE', LRU_SIZE)
+        self.lru_timeout = getattr(
+            settings, 'THUMBNAIL_LRU_TIMEOUT', LRU_TIMEOUT
+        )
+        self.lru = OrderedDict()
+        self.lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[thumbnail_settings.THUMBNAIL_CACHE]
+
+    @property
+    def generation_key(self):
+        return f'{thumbnail_settings.THUMBNAIL_KEY_PREFIX}||generation'
+
+    def generation(self):
+        return self.cache.get(self.generation_key, 0)
+
+    def cache_key(self, key, generation):
+        return f'{key}||{generation}'
+
+    def remember(self, key, value):
+        with self.lock:
+            self.lru[key] = (time.monotonic() + self.lru_timeout, value)
+            self.lru.move_to_end(key)
+            while len(self.lru) > self.lru_size:
+                self.lru.popitem(last=False)
+
+    def forget(self, keys):
+        with self.lock:
+            for key in keys:
+                self.lru.pop(key, None)
+
+    def _get_raw(self, key):
+        with self.lock:
+            entry = self.lru.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.lru.move_to_end(key)
+                return entry[1]
+        value = self.cache.get(self.cache_key(key, self.generation()))
+        if value is not None:
+            self.remember(key, value)
+        return value
+
+    def _set_raw(self, key, value):
+        self.cache.set(
+            self.cache_key(key, self.generation()), value,
+            thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT,
+        )
+        self.remember(key, value)
+
+    def _delete_raw(self, *keys):
+        generation = self.generation()
+        self.cache.delete_many(
+            [self.cache_key(key, generation) for key in keys]
+        )
+        self.forget(keys)
+
+    def _find_keys_raw(self, prefix):
+        return []
+
+    def clear(self):
+        try:
+            self.cache.incr(self.generation_key)
+        except ValueError:
+            if not self.cache.add(self.generation_key, 1, None):
+                self.cache.incr(self.generation_key)
+        with self.lock:
+            self.lru.clear()
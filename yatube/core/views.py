@@ -1,4 +1,10 @@
+from django.conf import settings
+from django.http import FileResponse, Http404
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
+from PIL import Image
+
+from . import images
 
 
 def page_not_found(request, exception):
@@ -15,3 +21,28 @@ def permission_denied(request, exception):
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+def too_many_requests(request, retry_after):
+    response = render(
+        request,
+        'core/429.html',
+        {'retry_after': retry_after},
+        status=429,
+    )
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def resize_image(request, width, height, path):
+    if not images.allowed_size(width, height):
+        raise Http404('Размер не разрешён')
+    try:
+        resized = images.open_resized(path, width, height)
+    except (OSError, Image.DecompressionBombError):
+        raise Http404('Картинка не найдена')
+    response = FileResponse(resized, content_type='image/jpeg')
+    patch_cache_control(
+        response, public=True, max_age=settings.RESIZE_MAX_AGE
+    )
+    return response
@@ -0,0 +1,326 @@
+"""WSGI-слои, которые отвечают на запрос раньше Django."""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+import time
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.core.exceptions import DisallowedHost
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import reverse
+from django.utils.http import http_date, parse_etags
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=60'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+TEXT_TYPES = ('application/javascript', 'application/json', 'image/svg+xml')
+BLOCK_SIZE = 64 * 1024
+EDGE_VARY = 'Cookie, Accept-Encoding'
+EDGE_SKIP_HEADERS = ('content-length', 'content-encoding', 'vary', 'etag')
+EDGE_MAX_HOSTS = 8
+
+
+def encoding_qualities(accept_encoding):
+    """q-значения кодировок из заголовка Accept-Encoding."""
+    qualities = {}
+    for part in accept_encoding.split(','):
+        coding, *params = part.split(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def choose_encoding(accept_encoding, encodings):
+    """Кодировка с наибольшим q из ``encodings``; при равенстве — первая.
+
+    Кодировка с q=0 запрещена, не названная — разрешена только через
+    ``*``. None — отдавать без сжатия.
+    """
+    qualities = encoding_qualities(accept_encoding)
+    chosen, best = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best:
+            chosen, best = encoding, quality
+    return chosen
+
+
+def etag_matches(etag, if_none_match):
+    """Слабое сравнение ETag с If-None-Match, как требует RFC 7232."""
+    etags = parse_etags(if_none_match)
+    if etags == ['*']:
+        return True
+    etag = etag[2:] if etag.startswith('W/') else etag
+    return any(
+        (tag[2:] if tag.startswith('W/') else tag) == etag for tag in etags
+    )
+
+
+class StaticFile:
+    def __init__(self, path, immutable):
+        content_type, _ = mimetypes.guess_type(path)
+        content_type = content_type or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in TEXT_TYPES:
+            content_type += '; charset=utf-8'
+        cache_control = (
+            IMMUTABLE_CACHE_CONTROL if immutable else DEFAULT_CACHE_CONTROL
+        )
+        self.variants = {}
+        for encoding, suffix in ENCODINGS + ((None, ''),):
+            if not os.path.isfile(path + suffix):
+                continue
+            stat = os.stat(path + suffix)
+            etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+            not_modified_headers = [
+                ('Cache-Control', cache_control),
+                ('Last-Modified', http_date(stat.st_mtime)),
+                ('ETag', etag),
+                ('Vary', 'Accept-Encoding'),
+            ]
+            headers = not_modified_headers + [
+                ('Content-Type', content_type),
+                ('Content-Length', str(stat.st_size)),
+            ]
+            if encoding:
+                headers.append(('Content-Encoding', encoding))
+            self.variants[encoding] = (
+                path + suffix, etag, headers, not_modified_headers
+            )
+
+    def select(self, accept_encoding):
+        encoding = choose_encoding(accept_encoding, [
+            encoding for encoding, _ in ENCODINGS
+            if encoding in self.variants
+        ])
+        return self.variants[encoding]
+
+    def serve(self, environ, start_response):
+        path, etag, headers, not_modified_headers = self.select(
+            environ.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if etag_matches(etag, environ.get('HTTP_IF_NONE_MATCH', '')):
+            start_response('304 Not Modified', not_modified_headers)
+            return []
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        file_wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return file_wrapper(open(path, 'rb'), BLOCK_SIZE)
+
+
+class StaticFilesApplication:
+    """Отдаёт собранные collectstatic файлы без стека Django.
+
+    Файлы из STATIC_ROOT сканируются один раз при старте, заголовки
+    считаются заранее. Если клиент принимает br или gzip, отдаётся готовая
+    сжатая копия. Файлы с хешем в имени кешируются браузером навсегда.
+    Тело передаётся через wsgi.file_wrapper, то есть sendfile, если его
+    поддерживает сервер.
+    """
+
+    def __init__(self, application, root=None, prefix=None):
+        self.application = application
+        self.root = root or settings.STATIC_ROOT
+        self.prefix = prefix or settings.STATIC_URL
+        self.files = self.scan()
+
+    def scan(self):
+        if not self.root or not os.path.isdir(self.root):
+            return {}
+        manifest_path = os.path.join(self.root, 'staticfiles.json')
+        hashed_names = set()
+        if os.path.isfile(manifest_path):
+            with open(manifest_path) as manifest:
+                hashed_names.update(json.load(manifest)['paths'].values())
+        files = {}
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+                    continue
+                path = os.path.join(directory, name)
+                relative = os.path.relpath(path, self.root).replace(
+                    os.sep, '/'
+                )
+                files[self.prefix + relative] = StaticFile(
+                    path, relative in hashed_names
+                )
+        return files
+
+    def __call__(self, environ, start_response):
+        if environ['REQUEST_METHOD'] in ('GET', 'HEAD'):
+            static_file = self.files.get(environ.get('PATH_INFO', ''))
+            if static_file is not None:
+                return static_file.serve(environ, start_response)
+        return self.application(environ, start_response)
+
+
+class EdgePage:
+    """Готовый ответ: тело и gzip-копия с заранее собранными заголовками."""
+
+    def __init__(self, status, headers, body, max_age):
+        self.status = status
+        self.expires = time.monotonic() + max_age
+        self.etag = f'"{hashlib.md5(body).hexdigest()}"'
+        base_headers = [
+            (name, value) for name, value in headers
+            if name.lower() not in EDGE_SKIP_HEADERS
+            and name.lower() != 'cache-control'
+        ] + [
+            ('Cache-Control', f'public, max-age={max_age}'),
+            ('Vary', EDGE_VARY),
+            ('ETag', self.etag),
+        ]
+        compressed = gzip.compress(body)
+        self.variants = {
+            None: (body, base_headers + [
+                ('Content-Length', str(len(body))),
+            ]),
+            'gzip': (compressed, base_headers + [
+                ('Content-Encoding', 'gzip'),
+                ('Content-Length', str(len(compressed))),
+            ]),
+        }
+        self.not_modified_headers = [
+            (name, value) for name, value in base_headers
+            if name in ('Cache-Control', 'Vary', 'ETag')
+        ]
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.expires
+
+    def serve(self, environ, start_response):
+        if etag_matches(self.etag, environ.get('HTTP_IF_NONE_MATCH', '')):
+            start_response('304 Not Modified', self.not_modified_headers)
+            return []
+        encoding = choose_encoding(
+            environ.get('HTTP_ACCEPT_ENCODING', ''), ('gzip',)
+        )
+        body, headers = self.variants[encoding]
+        start_response(self.status, headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        return [body]
+
+
+class EdgeCacheApplication:
+    """Кеш целых страниц для анонимов перед Django.
+
+    Страницы из EDGE_CACHE_PAGES один раз рендерятся обычным Django,
+    дальше запрос без cookie сессии и без параметров получает готовые
+    байты из памяти процесса: без middleware, сессии, резолвера и
+    шаблонов. По истечении EDGE_CACHE_TTL страницу перерисовывает один
+    поток, остальные пока отдают старую копию. Ответы с Set-Cookie
+    и не 200 не кешируются.
+
+    Копия хранится по схеме, хосту и пути. Хост проверяется так же, как
+    в Django (ALLOWED_HOSTS, USE_X_FORWARDED_HOST): запрос с чужим хостом
+    уходит в Django и получает 400. Для одной страницы хранится не больше
+    EDGE_MAX_HOSTS хостов, остальные обслуживает Django.
+    """
+
+    def __init__(self, application, pages=None, max_age=None):
+        self.application = application
+        self.page_names = (
+            settings.EDGE_CACHE_PAGES if pages is None else pages
+        )
+        self.max_age = (
+            settings.EDGE_CACHE_TTL if max_age is None else max_age
+        )
+        self.cookie_name = settings.SESSION_COOKIE_NAME
+        self.paths = None
+        self.pages = {}
+        self.locks = {}
+        self.locks_lock = threading.Lock()
+
+    def cacheable(self, environ):
+        if self.paths is None:
+            self.paths = {reverse(name) for name in self.page_names}
+        return (
+            environ['REQUEST_METHOD'] in ('GET', 'HEAD')
+            and environ.get('PATH_INFO', '') in self.paths
+            and not environ.get('QUERY_STRING')
+            and f'{self.cookie_name}=' not in environ.get('HTTP_COOKIE', '')
+        )
+
+    def page_key(self, environ):
+        """Схема, хост и путь страницы; None, если хост не разрешён."""
+        request = WSGIRequest(environ)
+        try:
+            host = request.get_host()
+        except DisallowedHost:
+            return None
+        return request.scheme, host, environ['PATH_INFO']
+
+    def lock(self, key):
+        with self.locks_lock:
+            lock = self.locks.get(key)
+            if lock is None:
+                path_keys = sum(1 for page in self.locks if page[2] == key[2])
+                if path_keys >= EDGE_MAX_HOSTS:
+                    return None
+                lock = self.locks[key] = threading.Lock()
+            return lock
+
+    def render(self, environ):
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response.update(status=status, headers=headers)
+
+        environ = {**environ, 'REQUEST_METHOD': 'GET'}
+        result = self.application(environ, start_response)
+        try:
+            body = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        cookies = any(
+            name.lower() == 'set-cookie' for name, _ in response['headers']
+        )
+        if response['status'].startswith('200') and not cookies:
+            return EdgePage(
+                response['status'], response['headers'], body, self.max_age
+            )
+        return None
+
+    def refresh(self, key, environ, stale):
+        lock = self.lock(key)
+        if lock is None or not lock.acquire(blocking=stale is None):
+            return stale
+        try:
+            page = self.pages.get(key)
+            if page is None or page.expired:
+                page = self.render(environ) or stale
+                if page is not None:
+                    self.pages[key] = page
+            return page
+        finally:
+            lock.release()
+
+    def __call__(self, environ, start_response):
+        if not self.cacheable(environ):
+            return self.application(environ, start_response)
+        key = self.page_key(environ)
+        if key is None:
+            return self.application(environ, start_response)
+        page = self.pages.get(key)
+        if page is None or page.expired:
+            page = self.refresh(key, environ, page)
+            if page is None:
+                return self.application(environ, start_response)
+        return page.serve(environ, start_response)
@@ -1,16 +1,136 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin import helpers
+from django.contrib.admin.views.main import (
+    ERROR_FLAG, IGNORED_PARAMS, PAGE_VAR, SEARCH_VAR,
+)
+from django.template.response import TemplateResponse
 
-from .models import Comment, Follow, Group, Post
+from core.paginator import EstimatedCountPaginator
+
+from . import moderation
+from .models import Comment, Follow, Group, ModerationJob, Post
+
+
+class ModerationActionsMixin:
+    """Массовые действия ставят ModerationJob в очередь.
+
+    Синхронное «удалить выбранные» убрано: на больших выборках оно
+    упирается в таймаут запроса.
+    """
+
+    def get_queryset(self, request):
+        # Скрытые строки видны модератору, чтобы их можно было вернуть.
+        queryset = moderation.base_queryset(self.model)
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def selection(self, request, queryset):
+        """Фильтр и поиск списка при «выбрать все», иначе id строк."""
+        if request.POST.get('select_across') == '1':
+            ignored = IGNORED_PARAMS + (PAGE_VAR, ERROR_FLAG)
+            lookups = {
+                key: value for key, value in request.GET.items()
+                if key not in ignored
+            }
+            return lookups, request.GET.get(SEARCH_VAR, '')
+        pks = queryset.order_by('pk').values_list('pk', flat=True)
+        return {'pk__in': ','.join(map(str, pks))}, ''
+
+    def queue_job(self, request, action, queryset, group=None):
+        lookups, search = self.selection(request, queryset)
+        job = moderation.queue(
+            action, self.model, lookups, search, request.user, group
+        )
+        self.message_user(
+            request,
+            f'Задача #{job.pk} «{job.get_action_display()}» поставлена '
+            f'в очередь: {job.total} объектов.',
+        )
+
+    def queue_hide_authors(self, request, queryset):
+        self.queue_job(request, ModerationJob.HIDE_AUTHORS, queryset)
+    queue_hide_authors.short_description = (
+        'Скрыть все посты и комментарии авторов'
+    )
+
+    def queue_show_authors(self, request, queryset):
+        self.queue_job(request, ModerationJob.SHOW_AUTHORS, queryset)
+    queue_show_authors.short_description = (
+        'Вернуть скрытые посты и комментарии авторов'
+    )
+
+
+class ReassignGroupForm(forms.Form):
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.all(),
+        required=False,
+        label='Группа',
+        help_text='Пустое значение убирает посты из групп',
+    )
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(ModerationActionsMixin, admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group',)
-    list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
-    list_filter = ('pub_date',)
+    list_filter = ('pub_date', 'is_hidden')
+    date_hierarchy = 'pub_date'
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('group',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = (
+        'queue_delete', 'queue_reassign_group', 'queue_hide_authors',
+        'queue_show_authors',
+    )
     empty_value_display = '-пусто-'
 
+    def queue_delete(self, request, queryset):
+        self.queue_job(
+            request,
+            ModerationJob.DELETE_POSTS,
+            queryset,
+        )
+    queue_delete.short_description = 'Удалить выбранные посты в фоне'
+
+    def queue_reassign_group(self, request, queryset):
+        form = ReassignGroupForm(
+            request.POST if 'apply' in request.POST else None
+        )
+        if form.is_valid():
+            self.queue_job(
+                request,
+                ModerationJob.REASSIGN_GROUP,
+                queryset,
+                form.cleaned_data['group'],
+            )
+            return None
+        return TemplateResponse(
+            request,
+            'admin/posts/post/reassign_group.html',
+            {
+                **self.admin_site.each_context(request),
+                'title': 'Перенести посты в группу',
+                'opts': self.model._meta,
+                'form': form,
+                'queryset': queryset,
+                'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+                'select_across': request.POST.get('select_across', '0'),
+            },
+        )
+    queue_reassign_group.short_description = (
+        'Перенести выбранные посты в группу'
+    )
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
@@ -21,13 +141,56 @@ class GroupAdmin(admin.ModelAdmin):
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(ModerationActionsMixin, admin.ModelAdmin):
     list_display = ('post', 'author', 'text', 'created')
-    search_fields = ('text', 'author')
-    list_filter = ('author', 'created')
+    list_select_related = ('post', 'author')
+    search_fields = ('text', 'author__username')
+    date_hierarchy = 'created'
+    raw_id_fields = ('post', 'author')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_filter = ('is_hidden',)
+    actions = ('queue_delete', 'queue_hide_authors', 'queue_show_authors')
     empty_value_display = '-пусто-'
 
+    def queue_delete(self, request, queryset):
+        self.queue_job(
+            request,
+            ModerationJob.DELETE_COMMENTS,
+            queryset,
+        )
+    queue_delete.short_description = 'Удалить выбранные комментарии в фоне'
+
 
 @admin.register(Follow)
 class FollowAdmin(admin.ModelAdmin):
     list_display = ('user', 'author')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(ModerationJob)
+class ModerationJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'action', 'status', 'progress', 'created_by', 'created',
+        'updated',
+    )
+    list_filter = ('status', 'action')
+    list_select_related = ('created_by',)
+    readonly_fields = (
+        'action', 'group', 'status', 'phase', 'cursor', 'processed',
+        'total', 'progress', 'error', 'created_by', 'created', 'updated',
+    )
+    exclude = ('target',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def progress(self, job):
+        if not job.total:
+            return '-'
+        share = job.processed / job.total
+        return f'{job.processed} из {job.total} ({share:.0%})'
+    progress.short_description = 'Прогресс'
@@ -0,0 +1,126 @@
+"""Карточки постов по списку id.
+
+Всё, что хранит id постов (рейтинги, подборки, поиск), превращает их
+в карточки через ``get_posts_by_ids``: один ``get_many`` из кеша и
+один запрос с select_related и числом комментариев для промахов.
+Карточки — лёгкие объекты со ``__slots__`` с теми же именами полей,
+что у Post (автор и группа — строки из posts.read_models), поэтому
+их выводит тот же posts/includes/post_card.html.
+Адрес миниатюры считается один раз, при сборке карточки.
+
+Карточку сбрасывают изменения поста и его комментариев; имя автора
+и название группы обновятся не позже чем через TIMEOUT.
+"""
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.helpers import ThumbnailError
+
+from .models import Post
+from .read_models import AuthorRow, GroupRow
+from .thumbnails import THUMBNAILS
+
+VERSION = 2
+TIMEOUT = 10 * 60
+CARD_KEY = 'post_card:{}:{}'
+# Ошибки битой или пропавшей картинки; остальные (настройки, кеш)
+# пробрасываются.
+IMAGE_ERRORS = (OSError, Image.DecompressionBombError, ThumbnailError)
+
+logger = logging.getLogger(__name__)
+
+
+class PostCard:
+    __slots__ = (
+        'pk', 'text', 'pub_date', 'author', 'group', 'image',
+        'thumbnail_url', 'comment_count',
+    )
+
+    def __init__(self, post):
+        self.pk = post.pk
+        self.text = post.text
+        self.pub_date = post.pub_date
+        author = post.author
+        self.author = AuthorRow(
+            author.pk, author.username, author.get_full_name()
+        )
+        group = post.group
+        self.group = group and GroupRow(group.pk, group.slug, group.title)
+        self.image = post.image.name
+        self.thumbnail_url = thumbnail_url(post.image)
+        self.comment_count = post.comment_count
+
+    @property
+    def id(self):
+        return self.pk
+
+    @property
+    def author_id(self):
+        return self.author.pk
+
+    @property
+    def group_id(self):
+        return self.group and self.group.pk
+
+    def __str__(self):
+        return self.text[:15]
+
+
+def thumbnail_url(image):
+    """Адрес миниатюры для ленты; None, если её не удалось сделать."""
+    if not image:
+        return None
+    geometry, options = THUMBNAILS[0]
+    try:
+        return get_thumbnail(image, geometry, **options).url
+    except IMAGE_ERRORS:
+        logger.exception('Не удалось создать миниатюру для %s', image)
+        return None
+
+
+def make_key(pk):
+    return CARD_KEY.format(VERSION, pk)
+
+
+def get_posts_by_ids(ids):
+    """Карточки постов в порядке ``ids``; удалённые посты пропускаются.
+
+    Отсутствие поста тоже кешируется (как False): сигнал сохранения
+    сбросит эту запись, когда пост появится или восстановится.
+    """
+    keys = {make_key(pk): pk for pk in ids}
+    cards = {
+        keys[key]: card
+        for key, card in cache.get_many(list(keys)).items()
+    }
+    missing = [pk for pk in keys.values() if pk not in cards]
+    if missing:
+        posts = (
+            Post.objects.filter(pk__in=missing)
+            .select_related('author', 'group')
+            .annotate(comment_count=Count(
+                'comments', filter=Q(comments__is_hidden=False)
+            ))
+            .order_by()
+        )
+        loaded = dict.fromkeys(missing, False)
+        loaded.update((post.pk, PostCard(post)) for post in posts)
+        cache.set_many(
+            {make_key(pk): card for pk, card in loaded.items()}, TIMEOUT
+        )
+        cards.update(loaded)
+    return [cards[pk] for pk in ids if cards.get(pk)]
+
+
+def _delete(keys):
+    cache.delete_many(keys)
+
+
+def invalidate(*pks):
+    keys = [make_key(pk) for pk in pks]
+    _delete(keys)
+    transaction.on_commit(lambda: _delete(keys))
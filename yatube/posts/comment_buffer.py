@@ -0,0 +1,262 @@
+"""Отложенная запись комментариев.
+
+При COMMENT_WRITE_BEHIND комментарий проверяется формой в запросе и
+дописывается строкой JSON в локальный файл COMMENT_BUFFER_PATH (с fsync,
+если включён COMMENT_BUFFER_FSYNC), а в базу попадает пачкой: одна
+транзакция с ``bulk_create`` на FLUSH_SIZE комментариев вместо
+транзакции на каждый. Так всплеск комментариев под популярным постом
+не выстраивается в очередь за единственным писателем SQLite.
+
+Сбрасывает буфер поток процесса — каждые COMMENT_FLUSH_INTERVAL_MS
+миллисекунд или сразу, как набралось COMMENT_FLUSH_SIZE строк, — или
+команда flush_comments, если интервал равен None. Перед записью буфер
+под блокировкой переименовывается в ``.flushing``; файл, оставшийся
+после падения, дописывается при следующем сбросе без повторов: у каждой
+строки свой ``id``, он сохраняется в ``Comment.buffer_id``, так что два
+одинаковых «+1» остаются двумя комментариями.
+
+Пока комментарий в буфере, автор видит его на странице поста:
+``pending_for()`` читает оба файла.
+"""
+import fcntl
+import json
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core import page_cache
+
+from . import cards, events
+from .models import Comment, Post, User
+
+logger = logging.getLogger(__name__)
+
+RECOVERY_WINDOW = timedelta(minutes=10)
+# Условий CASE в одном UPDATE: по два параметра на комментарий плюс
+# список id, в пределах лимита SQLite на 999 параметров.
+UPDATE_BATCH = 300
+
+
+def buffer_path():
+    return settings.COMMENT_BUFFER_PATH
+
+
+def batch_path():
+    return f'{buffer_path()}.flushing'
+
+
+@contextmanager
+def locked(name='lock'):
+    with open(f'{buffer_path()}.{name}', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def append(post_id, author_id, text):
+    """Дописывает комментарий в буфер; запись переживёт падение процесса."""
+    line = json.dumps({
+        'id': uuid.uuid4().hex,
+        'post_id': post_id,
+        'author_id': author_id,
+        'text': text,
+        'created': timezone.now().isoformat(),
+    }, ensure_ascii=False)
+    os.makedirs(os.path.dirname(buffer_path()), exist_ok=True)
+    with locked(), open(buffer_path(), 'a', encoding='utf-8') as buffer:
+        buffer.write(line + '\n')
+        buffer.flush()
+        if settings.COMMENT_BUFFER_FSYNC:
+            os.fsync(buffer.fileno())
+    flusher.added()
+
+
+def read_entries(path):
+    """Строки файла буфера; недописанная последняя строка пропускается."""
+    try:
+        with open(path, encoding='utf-8') as source:
+            lines = source.readlines()
+    except FileNotFoundError:
+        return []
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue
+    return entries
+
+
+def pending_for(post_id, author_id):
+    """Комментарии автора к посту, которые ещё не попали в базу."""
+    return [
+        Comment(
+            post_id=entry['post_id'],
+            author_id=entry['author_id'],
+            text=entry['text'],
+            created=parse_datetime(entry['created']),
+        )
+        for path in (batch_path(), buffer_path())
+        for entry in read_entries(path)
+        if entry['post_id'] == post_id and entry['author_id'] == author_id
+    ]
+
+
+def _already_saved(entries):
+    """Для файла после падения: убирает комментарии, уже записанные."""
+    since = min(parse_datetime(entry['created']) for entry in entries)
+    saved = {
+        buffer_id.hex for buffer_id in Comment.objects.filter(
+            created__gte=since - RECOVERY_WINDOW, buffer_id__isnull=False
+        ).values_list('buffer_id', flat=True)
+    }
+    return [entry for entry in entries if entry['id'] not in saved]
+
+
+def _restore_created(entries):
+    """Возвращает комментариям время отправки из буфера: auto_now_add
+    при bulk_create ставит время сброса."""
+    for start in range(0, len(entries), UPDATE_BATCH):
+        batch = entries[start:start + UPDATE_BATCH]
+        Comment.objects.filter(
+            buffer_id__in=[entry['id'] for entry in batch]
+        ).update(created=Case(
+            *(
+                When(
+                    buffer_id=entry['id'],
+                    then=Value(parse_datetime(entry['created'])),
+                )
+                for entry in batch
+            ),
+            output_field=DateTimeField(),
+        ))
+
+
+def save_entries(entries, recovered=False):
+    if not entries:
+        return 0
+    if recovered:
+        entries = _already_saved(entries)
+    post_ids = set(Post.objects.filter(
+        pk__in={entry['post_id'] for entry in entries}
+    ).values_list('pk', flat=True))
+    author_ids = set(User.objects.filter(
+        pk__in={entry['author_id'] for entry in entries}
+    ).values_list('pk', flat=True))
+    entries = [
+        entry for entry in entries
+        if entry['post_id'] in post_ids and entry['author_id'] in author_ids
+    ]
+    comments = [
+        Comment(
+            post_id=entry['post_id'],
+            author_id=entry['author_id'],
+            text=entry['text'],
+            buffer_id=entry['id'],
+        )
+        for entry in entries
+    ]
+    # bulk_create не шлёт сигналы: сбрасываем кеши и шлём события сами,
+    # по одному на пост.
+    last = {comment.post_id: comment for comment in comments}
+    with transaction.atomic():
+        Comment.objects.bulk_create(
+            comments, batch_size=settings.COMMENT_FLUSH_SIZE
+        )
+        _restore_created(entries)
+        for comment, entry in zip(comments, entries):
+            comment.created = parse_datetime(entry['created'])
+        page_cache.bump(*(f'post:{post_id}' for post_id in last))
+        cards.invalidate(*last)
+        transaction.on_commit(lambda: publish(last.values()))
+    return len(comments)
+
+
+def publish(comments):
+    for comment in comments:
+        events.publish_comment(comment)
+
+
+def flush():
+    """Переносит буфер в базу; возвращает число записанных комментариев."""
+    if not os.path.exists(buffer_path()) and not os.path.exists(batch_path()):
+        return 0
+    saved = 0
+    # Запись в буфер ждёт только переименования, а не записи в базу.
+    with locked('flush'):
+        if os.path.exists(batch_path()):
+            saved += save_entries(read_entries(batch_path()), recovered=True)
+            os.remove(batch_path())
+        with locked():
+            if not os.path.exists(buffer_path()):
+                return saved
+            os.replace(buffer_path(), batch_path())
+        saved += save_entries(read_entries(batch_path()))
+        os.remove(batch_path())
+    return saved
+
+
+class Flusher:
+    """Фоновый поток сброса; запускается при первой записи в буфер."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.count = 0
+
+    def added(self):
+        interval = settings.COMMENT_FLUSH_INTERVAL_MS
+        if interval is None:
+            return
+        with self.lock:
+            self.count += 1
+            if self.count >= settings.COMMENT_FLUSH_SIZE:
+                self.wake.set()
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, args=(interval / 1000,),
+                    name='comment-flusher', daemon=True,
+                )
+                self.thread.start()
+
+    def stop(self):
+        """Дожидается последнего сброса и останавливает поток."""
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is None:
+            return
+        self.stopped.set()
+        self.wake.set()
+        thread.join()
+        self.stopped.clear()
+
+    def run(self, interval):
+        while not self.stopped.is_set():
+            self.wake.wait(interval)
+            self.wake.clear()
+            with self.lock:
+                self.count = 0
+            try:
+                flush()
+            except Exception:
+                # Буфер остаётся на диске: повторим на следующем шаге.
+                logger.exception('Не удалось сбросить буфер комментариев')
+            finally:
+                close_old_connections()
+        connections.close_all()
+
+
+flusher = Flusher()
@@ -0,0 +1,170 @@
+"""Шина событий о новых постах и комментариях для live-обновлений.
+
+Общий кеш служит брокером между воркерами: у каждого события есть номер
+из атомарного счётчика ``cache.incr``, само событие хранится в кеше под
+этим номером. Внутри процесса события складываются в кольцевой буфер,
+и все открытые потоки SSE ждут на одном Condition: публикация в этом же
+процессе будит их сразу, а события других воркеров подтягиваются из кеша
+не чаще раза в POLL_INTERVAL секунд на процесс, а не на соединение.
+
+Страницы подписываются на поток ``stream()`` через EventSource. Поток
+занимает воркер (или поток пула AsgiHandler), поэтому живёт не дольше
+STREAM_TIMEOUT секунд, после чего браузер переподключается с
+Last-Event-ID. Браузеры без EventSource ждут события long-poll запросом
+``poll()``, тоже не дольше POLL_TIMEOUT секунд. Выключается настройкой
+LIVE_UPDATES.
+"""
+import json
+import threading
+import time
+import uuid
+from collections import deque
+
+from django.core.cache import cache
+from django.urls import reverse
+
+SEQ_KEY = 'events:seq'
+EPOCH_KEY = 'events:epoch'
+EVENT_KEY = 'events:'
+BUFFER_SIZE = 1000
+EVENT_TTL = 5 * 60
+POLL_INTERVAL = 1.0
+STREAM_TIMEOUT = 30
+POLL_TIMEOUT = 25
+HEARTBEAT = 15
+RETRY_MS = 3000
+
+
+class EventBus:
+    def __init__(self, size=BUFFER_SIZE, poll_interval=POLL_INTERVAL):
+        self.condition = threading.Condition()
+        self.events = deque(maxlen=size)
+        self.seq = 0
+        self.epoch = None
+        self.poll_interval = poll_interval
+        self.polled_at = 0
+
+    def publish(self, event, channels, payload):
+        try:
+            seq = cache.incr(SEQ_KEY)
+        except ValueError:
+            if cache.add(SEQ_KEY, 0, None):
+                cache.set(EPOCH_KEY, uuid.uuid4().hex, None)
+            seq = cache.incr(SEQ_KEY)
+        cache.set(
+            f'{EVENT_KEY}{seq}', (event, list(channels), payload), EVENT_TTL
+        )
+        with self.condition:
+            self.sync()
+            self.condition.notify_all()
+        return seq
+
+    def sync(self):
+        state = cache.get_many([SEQ_KEY, EPOCH_KEY])
+        latest = state.get(SEQ_KEY, 0)
+        self.polled_at = time.monotonic()
+        if state.get(EPOCH_KEY) != self.epoch:
+            self.events.clear()
+            self.seq = 0
+            self.epoch = state.get(EPOCH_KEY)
+        if latest == self.seq:
+            return
+        first = max(self.seq + 1, latest - self.events.maxlen + 1)
+        keys = [f'{EVENT_KEY}{seq}' for seq in range(first, latest + 1)]
+        stored = cache.get_many(keys)
+        for seq, key in enumerate(keys, first):
+            if key in stored:
+                self.events.append((seq, *stored[key]))
+        self.seq = latest
+
+    def last_seq(self):
+        with self.condition:
+            self.sync()
+            return self.seq
+
+    def wait(self, after, channels, timeout):
+        """События после номера ``after`` из каналов ``channels``.
+
+        Возвращает пустой список, если за ``timeout`` секунд их не было.
+        """
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                if time.monotonic() - self.polled_at >= self.poll_interval:
+                    self.sync()
+                found = [
+                    event for event in self.events
+                    if event[0] > after and channels.intersection(event[2])
+                ]
+                remaining = deadline - time.monotonic()
+                if found or remaining <= 0:
+                    return found
+                self.condition.wait(min(remaining, self.poll_interval))
+
+
+bus = EventBus()
+
+
+def post_channels(post):
+    channels = ['posts', f'author:{post.author_id}']
+    if post.group_id:
+        channels.append(f'group:{post.group_id}')
+    return channels
+
+
+def publish_post(post):
+    url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+    return bus.publish(
+        'post', post_channels(post), {'id': post.pk, 'url': url}
+    )
+
+
+def publish_comment(comment):
+    return bus.publish(
+        'comment', [f'post:{comment.post_id}'], {'id': comment.pk}
+    )
+
+
+def format_events(events):
+    return ''.join(
+        f'id: {seq}\nevent: {event}\ndata: {json.dumps(payload)}\n\n'
+        for seq, event, _, payload in events
+    )
+
+
+def poll(channels, last_event_id=None, timeout=POLL_TIMEOUT):
+    """Ответ на один long-poll запрос в формате Server-Sent Events.
+
+    Ждёт до ``timeout`` секунд событий после ``last_event_id``; если их
+    не было — отдаёт только строку ``id:`` с номером, от которого
+    спрашивать в следующий раз. Первый опрос без номера отвечает сразу.
+    """
+    if last_event_id is None:
+        return f'id: {bus.last_seq()}\n\n'
+    after = last_event_id
+    events = bus.wait(after, set(channels), timeout)
+    if not events:
+        return f'id: {after}\n\n'
+    return format_events(events)
+
+
+def stream(channels, last_event_id=None, timeout=STREAM_TIMEOUT):
+    """Текст потока Server-Sent Events для клиентов EventSource.
+
+    Поток закрывается через ``timeout`` секунд, чтобы не держать воркер,
+    и браузер переподключается с Last-Event-ID.
+    """
+    channels = set(channels)
+    after = bus.last_seq() if last_event_id is None else last_event_id
+    deadline = time.monotonic() + timeout
+    yield f'retry: {RETRY_MS}\n\n'
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        events = bus.wait(after, channels, min(remaining, HEARTBEAT))
+        if not events:
+            yield ': ping\n\n'
+            continue
+        yield format_events(events)
+        after = events[-1][0]
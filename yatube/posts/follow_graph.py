@@ -0,0 +1,173 @@
+"""Граф подписок в общем кеше.
+
+Для каждого пользователя в кеше лежит отсортированный массив id авторов,
+на которых он подписан (``array('I')`` в байтах, 4 байта на подписку),
+а для каждого автора — число подписчиков. Проверка подписки — бинарный
+поиск по массиву, без запроса к Follow. Массив строится из таблицы при
+первом обращении после изменения; счётчики меняются через
+``cache.incr``/``cache.decr``. Внутри ``with deferred():`` правки
+копятся и применяются один раз на выходе.
+
+Массив не правится на месте: чтение, правка и запись в кеш не атомарны,
+и из двух одновременных подписок одна бы потерялась. Вместо этого
+запись в Follow поднимает версию пользователя (сразу и ещё раз после
+коммита), а массив хранится вместе с версией, прочитанной до запроса к
+таблице. Массив с чужой версией считается промахом, так что устаревшая
+сборка, закончившаяся после записи, не будет прочитана.
+"""
+import threading
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow
+
+TYPECODE = 'I'
+TIMEOUT = 60 * 60 * 24
+FOLLOWEES_KEY = 'follow_graph:followees:{}'
+FOLLOWERS_KEY = 'follow_graph:followers:{}'
+VERSION_KEY = 'follow_graph:version:{}'
+# Больше id в одном IN SQLite не принимает (лимит 999 параметров).
+IN_BATCH = 500
+
+_pending = threading.local()
+
+
+def pack(ids):
+    return array(TYPECODE, sorted(ids)).tobytes()
+
+
+def unpack(data):
+    ids = array(TYPECODE)
+    ids.frombytes(data)
+    return ids
+
+
+def contains(ids, value):
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def followees_many(user_ids):
+    """Массивы подписок для нескольких пользователей за один поход в кеш."""
+    user_ids = list(user_ids)
+    keys = {FOLLOWEES_KEY.format(user_id): user_id for user_id in user_ids}
+    version_keys = {
+        user_id: VERSION_KEY.format(user_id) for user_id in user_ids
+    }
+    cached = cache.get_many([*keys, *version_keys.values()])
+    versions = {
+        user_id: cached.get(key, 0) for user_id, key in version_keys.items()
+    }
+    graph = {}
+    for key, user_id in keys.items():
+        entry = cached.get(key)
+        if entry is not None and entry[0] == versions[user_id]:
+            graph[user_id] = unpack(entry[1])
+    missing = [user_id for user_id in user_ids if user_id not in graph]
+    built = {user_id: [] for user_id in missing}
+    for start in range(0, len(missing), IN_BATCH):
+        rows = Follow.objects.filter(
+            user_id__in=missing[start:start + IN_BATCH]
+        ).values_list('user_id', 'author_id')
+        for user_id, author_id in rows:
+            built[user_id].append(author_id)
+    if built:
+        packed = {
+            user_id: pack(author_ids) for user_id, author_ids in built.items()
+        }
+        cache.set_many({
+            FOLLOWEES_KEY.format(user_id): (versions[user_id], data)
+            for user_id, data in packed.items()
+        }, TIMEOUT)
+        for user_id, data in packed.items():
+            graph[user_id] = unpack(data)
+    return graph
+
+
+def followees(user_id):
+    return followees_many([user_id])[user_id]
+
+
+def is_following(user_id, author_id):
+    return contains(followees(user_id), author_id)
+
+
+def mutuals(user_id):
+    """Авторы, с которыми пользователь подписан друг на друга."""
+    ids = followees(user_id)
+    graph = followees_many(ids)
+    return [
+        author_id for author_id in ids if contains(graph[author_id], user_id)
+    ]
+
+
+def follower_count(author_id):
+    key = FOLLOWERS_KEY.format(author_id)
+    count = cache.get(key)
+    if count is None:
+        count = Follow.objects.filter(author_id=author_id).count()
+        cache.add(key, count, TIMEOUT)
+    return count
+
+
+def _bump(user_id):
+    key = VERSION_KEY.format(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def apply(user_id, author_ids, delta):
+    _bump(user_id)
+    transaction.on_commit(lambda: _bump(user_id))
+    for author_id in author_ids:
+        try:
+            cache.incr(FOLLOWERS_KEY.format(author_id), delta)
+        except ValueError:
+            pass
+
+
+def update(user_id, author_ids, delta):
+    """Правит граф после записи в Follow.
+
+    ``author_ids`` — только реально созданные (delta=1) или удалённые
+    (delta=-1) подписки, иначе счётчики подписчиков разъедутся.
+    """
+    if not author_ids:
+        return
+    pending = getattr(_pending, 'updates', None)
+    if pending is not None:
+        pending[user_id, delta].extend(author_ids)
+        return
+    apply(user_id, author_ids, delta)
+
+
+@contextmanager
+def deferred():
+    """Одна правка графа на пользователя вместо правки на каждую строку."""
+    if getattr(_pending, 'updates', None) is not None:
+        yield
+        return
+    _pending.updates = defaultdict(list)
+    try:
+        yield
+        pending = _pending.updates
+    finally:
+        _pending.updates = None
+    for (user_id, delta), author_ids in pending.items():
+        apply(user_id, author_ids, delta)
+
+
+def followed(user_id, author_ids):
+    update(user_id, author_ids, 1)
+
+
+def unfollowed(user_id, author_ids):
+    update(user_id, author_ids, -1)
@@ -0,0 +1,69 @@
+"""Массовая подписка и отписка по списку имён пользователей.
+
+Имена превращаются в id одним запросом на пачку. В транзакции по
+каждой пачке читаются уже существующие подписки, а остальные пишутся
+одним ``bulk_create``; граф подписок и счётчики правятся один раз
+и только на действительно созданные строки.
+"""
+import re
+
+from django.db import transaction
+
+from . import follow_graph
+from .models import Follow, User
+
+MAX_USERNAMES = 5000
+SEPARATORS = re.compile(r'[\s,;]+')
+
+
+def parse_usernames(text):
+    """Имена через пробелы, запятые или с новой строки, без повторов."""
+    return list(dict.fromkeys(
+        username.lstrip('@') for username in SEPARATORS.split(text)
+        if username.lstrip('@')
+    ))
+
+
+def resolve_usernames(usernames):
+    """Словарь имя -> id для существующих пользователей."""
+    found = {}
+    for start in range(0, len(usernames), follow_graph.IN_BATCH):
+        found.update(User.objects.filter(
+            username__in=usernames[start:start + follow_graph.IN_BATCH]
+        ).values_list('username', 'pk'))
+    return found
+
+
+def follow_many(user, usernames):
+    """Подписывает на всех найденных; возвращает (новых, не найдены)."""
+    found = resolve_usernames(usernames)
+    author_ids = sorted(set(found.values()) - {user.pk})
+    created = []
+    with transaction.atomic():
+        for start in range(0, len(author_ids), follow_graph.IN_BATCH):
+            batch = author_ids[start:start + follow_graph.IN_BATCH]
+            existing = set(Follow.objects.filter(
+                user=user, author_id__in=batch
+            ).values_list('author_id', flat=True))
+            new = [pk for pk in batch if pk not in existing]
+            Follow.objects.bulk_create(
+                [Follow(user=user, author_id=pk) for pk in new],
+                ignore_conflicts=True,
+            )
+            created.extend(new)
+    follow_graph.followed(user.pk, created)
+    return len(created), [name for name in usernames if name not in found]
+
+
+def unfollow_many(user, usernames):
+    """Отписывает от всех найденных; возвращает (удалено, не найдены)."""
+    found = resolve_usernames(usernames)
+    author_ids = sorted(set(found.values()))
+    deleted = 0
+    with follow_graph.deferred(), transaction.atomic():
+        for start in range(0, len(author_ids), follow_graph.IN_BATCH):
+            deleted += Follow.objects.filter(
+                user=user,
+                author_id__in=author_ids[start:start + follow_graph.IN_BATCH],
+            ).delete()[0]
+    return deleted, [name for name in usernames if name not in found]
@@ -1,6 +1,7 @@
 from django import forms
 from django.utils.translation import gettext_lazy as _
 
+from .follows import MAX_USERNAMES, parse_usernames
 from .models import Comment, Post
 
 
@@ -30,3 +31,25 @@ class CommentForm(forms.ModelForm):
         help_texts = {
             'text': _('Текст комментария'),
         }
+
+
+class BulkFollowForm(forms.Form):
+    usernames = forms.CharField(
+        label=_('Пользователи'),
+        help_text=_('Имена через пробел, запятую или с новой строки'),
+        widget=forms.Textarea,
+    )
+    unfollow = forms.BooleanField(
+        label=_('Отписаться'),
+        help_text=_('Отписаться от перечисленных вместо подписки'),
+        required=False,
+    )
+
+    def clean_usernames(self):
+        usernames = parse_usernames(self.cleaned_data['usernames'])
+        if len(usernames) > MAX_USERNAMES:
+            raise forms.ValidationError(
+                _('Не больше %(max)s имён за раз'),
+                params={'max': MAX_USERNAMES},
+            )
+        return usernames
@@ -0,0 +1,111 @@
+"""Кеш лент групп.
+
+Slug группы превращается в id через словарь в памяти процесса. В общем
+кеше для группы лежат сама группа, id постов первых PAGES страниц и
+общее число постов; страница из этого диапазона собирается одним
+``in_bulk``, без COUNT и без поиска группы по slug. Дальние страницы
+читаются из базы обычным запросом.
+
+Запись сбрасывает ``invalidate()``: сигналы постов и групп и массовая
+модерация. Сброс повторяется после коммита, как в core.page_cache.
+"""
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import Http404
+
+from .models import Group, Post
+
+PAGES = 5
+TIMEOUT = 10 * 60
+FEED_KEY = 'group_feed:{}'
+
+_group_ids = {}
+
+
+def _in_order(objects, ids):
+    return [objects[pk] for pk in ids if pk in objects]
+
+
+def hydrate(ids):
+    return _in_order(
+        Post.objects.select_related('author', 'group').in_bulk(ids), ids
+    )
+
+
+class FeedPaginator(Paginator):
+    """Paginator, который берёт первые страницы из списка id.
+
+    ``object_list`` — обычный QuerySet ленты, он нужен только для
+    страниц дальше закешированных.
+    """
+
+    def __init__(self, object_list, per_page, ids, count):
+        super().__init__(object_list, per_page)
+        self.ids = ids
+        self.total = count
+
+    @property
+    def count(self):
+        return self.total
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top <= len(self.ids) or len(self.ids) == self.total:
+            posts = hydrate(self.ids[bottom:top])
+        else:
+            posts = list(self.object_list[bottom:top])
+        return self._get_page(posts, number, self)
+
+
+def load(group, per_page):
+    limit = per_page * PAGES
+    ids = list(group.posts.values_list('pk', flat=True)[:limit])
+    count = len(ids) if len(ids) < limit else group.posts.count()
+    return {'group': group, 'ids': ids, 'count': count}
+
+
+def get_feed(slug, per_page):
+    """Группа и её закешированная лента; Http404, если группы нет."""
+    group_id = _group_ids.get(slug)
+    entry = group_id and cache.get(FEED_KEY.format(group_id))
+    if entry is None or entry['group'].slug != slug:
+        try:
+            group = Group.objects.get(slug=slug)
+        except Group.DoesNotExist:
+            _group_ids.pop(slug, None)
+            raise Http404('Группа не найдена')
+        _group_ids[slug] = group.pk
+        entry = load(group, per_page)
+        cache.set(FEED_KEY.format(group.pk), entry, TIMEOUT)
+    return entry
+
+
+def get_page(slug, page_number, per_page):
+    entry = get_feed(slug, per_page)
+    group = entry['group']
+    paginator = FeedPaginator(
+        group.posts.all(), per_page, entry['ids'], entry['count']
+    )
+    return group, paginator.get_page(page_number)
+
+
+def _delete(keys):
+    cache.delete_many(keys)
+
+
+def invalidate(*group_ids):
+    keys = [FEED_KEY.format(pk) for pk in set(group_ids) if pk is not None]
+    if keys:
+        _delete(keys)
+        transaction.on_commit(lambda: _delete(keys))
+
+
+def forget_group(group):
+    """Сбрасывает slug группы в этом процессе и её ленту."""
+    for slug, group_id in list(_group_ids.items()):
+        if group_id == group.pk:
+            del _group_ids[slug]
+    invalidate(group.pk)
@@ -0,0 +1,112 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+
+from posts import comment_buffer
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+TEXT = 'Комментарий для нагрузочного теста'
+FLUSH_INTERVAL = 0.2
+
+
+def load(write, threads, seconds):
+    """Пишет комментарии из нескольких потоков; число успехов и ошибок."""
+    done = [0] * threads
+    failed = [0] * threads
+    deadline = time.monotonic() + seconds
+
+    def worker(number):
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    write()
+                except DatabaseError:
+                    failed[number] += 1
+                else:
+                    done[number] += 1
+        finally:
+            connection.close()
+
+    workers = [
+        threading.Thread(target=worker, args=(number,))
+        for number in range(threads)
+    ]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sum(done), sum(failed)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест комментариев: сколько комментариев в секунду '
+        'принимается при записи в базу по одному и через буфер '
+        'отложенной записи. Тестовые пользователь и пост удаляются '
+        'вместе с комментариями.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=10)
+
+    def handle(self, *args, **options):
+        threads, seconds = options['threads'], options['seconds']
+        comment_buffer.flush()
+        author = User.objects.create_user(username='bench_comments')
+        post = Post.objects.create(author=author, text='Нагрузочный тест')
+        try:
+            direct = load(
+                lambda: Comment.objects.create(
+                    post=post, author=author, text=TEXT
+                ),
+                threads, seconds,
+            )
+            self.report('По одному', *direct, seconds)
+
+            # Без интервала в настройках фонового потока нет: сбрасываем
+            # буфер сами, как это делала бы flush_comments --loop.
+            stop = threading.Event()
+            flusher = threading.Thread(target=self.flush_until, args=(stop,))
+            if settings.COMMENT_FLUSH_INTERVAL_MS is None:
+                flusher.start()
+            buffered = load(
+                lambda: comment_buffer.append(post.pk, author.pk, TEXT),
+                threads, seconds,
+            )
+            started = time.monotonic()
+            stop.set()
+            if flusher.is_alive():
+                flusher.join()
+            comment_buffer.flush()
+            drain = time.monotonic() - started
+            self.report('Через буфер', *buffered, seconds)
+            self.stdout.write(
+                f'Остаток буфера записан за {drain:.2f} с, с ним '
+                f'{buffered[0] / (seconds + drain):.0f} комментариев/с'
+            )
+            stored = Comment.objects.filter(post=post).count()
+            self.stdout.write(
+                f'В базе {stored} из {direct[0] + buffered[0]} комментариев'
+            )
+        finally:
+            author.delete()
+
+    def flush_until(self, stop):
+        try:
+            while not stop.wait(FLUSH_INTERVAL):
+                comment_buffer.flush()
+        finally:
+            connection.close()
+
+    def report(self, name, done, failed, seconds):
+        self.stdout.write(
+            f'{name}: {done / seconds:.0f} комментариев/с, '
+            f'ошибок записи {failed}'
+        )
@@ -0,0 +1,97 @@
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Group, Post
+from posts.read_models import feed_rows
+
+User = get_user_model()
+
+TEXT = 'Текст поста для замера памяти. ' * 40
+
+
+def timed(load):
+    started = time.perf_counter()
+    rows = load()
+    return len(rows), time.perf_counter() - started
+
+
+def peak_memory(load):
+    tracemalloc.start()
+    rows = load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return peak
+
+
+def measure(loads, repeat):
+    """Лучшее время из ``repeat`` прогонов и пик памяти каждой выборки.
+
+    Сначала по одному прогону вхолостую, чтобы первая выборка не платила
+    за холодный кеш базы; дальше порядок выборок чередуется.
+    """
+    for load in loads.values():
+        timed(load)
+    results = {name: (0, float('inf')) for name in loads}
+    names = list(loads)
+    for attempt in range(repeat):
+        for name in names if attempt % 2 == 0 else reversed(names):
+            count, elapsed = timed(loads[name])
+            results[name] = (count, min(results[name][1], elapsed))
+    return {
+        name: (count, elapsed, peak_memory(loads[name]))
+        for name, (count, elapsed) in results.items()
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время и память выборки постов экземплярами ORM '
+        'и строками posts.read_models. Тестовые посты создаются во '
+        'временной транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Сколько раз замерять время каждой выборки.',
+        )
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with transaction.atomic():
+            author = User.objects.create_user(username='bench_read_models')
+            group = Group.objects.create(
+                title='Замер', slug='bench-read-models'
+            )
+            Post.objects.bulk_create(
+                (
+                    Post(author=author, group=group, text=TEXT)
+                    for _ in range(rows)
+                ),
+                batch_size=options['batch_size'],
+            )
+            queryset = Post.objects.filter(author=author)
+            results = measure({
+                'ORM': lambda: list(
+                    queryset.select_related('author', 'group')
+                ),
+                'read_models': lambda: list(feed_rows(queryset)),
+            }, max(options['repeat'], 1))
+            transaction.set_rollback(True)
+        for name, (count, elapsed, peak) in results.items():
+            self.stdout.write(
+                f'{name}: {count} строк, {elapsed:.2f} с, '
+                f'пик памяти {peak / 2 ** 20:.1f} МиБ'
+            )
+        orm, light = results['ORM'], results['read_models']
+        self.stdout.write(
+            f'Память: в {orm[2] / max(light[2], 1):.1f} раза меньше, '
+            f'время: в {orm[1] / max(light[1], 1e-9):.1f} раза быстрее'
+        )
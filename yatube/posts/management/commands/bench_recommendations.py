@@ -0,0 +1,56 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import recommendations
+
+
+def synthetic_edges(users, follows, seed=0):
+    """Граф подписок, где популярные авторы собирают больше подписчиков."""
+    rnd = random.Random(seed)
+    edges = []
+    for user_id in range(1, users + 1):
+        authors = {
+            1 + int(users * rnd.random() ** 3) for _ in range(follows)
+        }
+        authors.discard(user_id)
+        edges.extend((user_id, author_id) for author_id in authors)
+    return edges
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет расчёт рекомендаций «кого почитать» на синтетическом '
+        'графе подписок без записи в базу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--follows', type=int, default=20)
+        parser.add_argument('--workers', type=int, default=None)
+        parser.add_argument(
+            '--engine',
+            choices=recommendations.ENGINES,
+            action='append',
+            help='По умолчанию все доступные.',
+        )
+
+    def handle(self, *args, **options):
+        engines = options['engine'] or [
+            engine for engine in recommendations.ENGINES
+            if engine == 'python' or recommendations.sparse is not None
+        ]
+        edges = synthetic_edges(options['users'], options['follows'])
+        self.stdout.write(
+            f'Пользователей: {options["users"]}, подписок: {len(edges)}'
+        )
+        for engine in engines:
+            started = time.perf_counter()
+            rows = sum(1 for _ in recommendations.compute(
+                edges, workers=options['workers'], engine=engine
+            ))
+            self.stdout.write(
+                f'{engine}: {rows} рекомендаций, '
+                f'{time.perf_counter() - started:.1f} с'
+            )
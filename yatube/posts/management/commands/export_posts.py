@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.read_models import feed_rows
+
+
+def export_row(row):
+    return {
+        'id': row.pk,
+        'author': row.author.username,
+        'group': row.group and row.group.slug,
+        'pub_date': row.pub_date.isoformat(),
+        'image': row.image or None,
+        'text': row.text,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты строками JSON, от старых к новым. Посты читаются '
+        'пачками через posts.read_models, без экземпляров ORM.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', help='Только посты группы (slug).')
+        parser.add_argument('--author', help='Только посты автора (имя).')
+        parser.add_argument(
+            '--output', help='Файл для выгрузки; по умолчанию stdout.'
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.order_by('pk')
+        if options['group']:
+            posts = posts.filter(group__slug=options['group'])
+        if options['author']:
+            posts = posts.filter(author__username=options['author'])
+        output = self.stdout
+        if options['output']:
+            output = open(options['output'], 'w', encoding='utf-8')
+        try:
+            exported = 0
+            for row in feed_rows(posts, text_length=None):
+                output.write(
+                    json.dumps(export_row(row), ensure_ascii=False) + '\n'
+                )
+                exported += 1
+        finally:
+            if output is not self.stdout:
+                output.close()
+        if output is not self.stdout:
+            self.stdout.write(f'Выгружено постов: {exported}')
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import comment_buffer
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит комментарии из буфера отложенной записи в базу. '
+        'Нужна, если COMMENT_FLUSH_INTERVAL_MS = None, и после остановки '
+        'сервера, чтобы не ждать следующего запуска.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            type=float,
+            metavar='SECONDS',
+            help='Не завершаться, а повторять сброс с этим интервалом.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            saved = comment_buffer.flush()
+            self.stdout.write(f'Записано комментариев: {saved}')
+            if not options['loop']:
+                return
+            time.sleep(options['loop'])
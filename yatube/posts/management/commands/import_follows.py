@@ -0,0 +1,54 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import follows
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Подписывает пользователя на авторов из файла со списком имён '
+        '(через пробел, запятую или с новой строки). Файл «-» — stdin.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path')
+        parser.add_argument(
+            '--unfollow',
+            action='store_true',
+            help='Отписать от перечисленных авторов.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=follows.MAX_USERNAMES,
+            help='Сколько имён обрабатывать за раз.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'Пользователь {options["username"]} не найден')
+        if options['path'] == '-':
+            usernames = follows.parse_usernames(sys.stdin.read())
+        else:
+            with open(options['path'], encoding='utf-8') as source:
+                usernames = follows.parse_usernames(source.read())
+        bulk_action = (
+            follows.unfollow_many if options['unfollow']
+            else follows.follow_many
+        )
+        changed, missing = 0, []
+        batch_size = options['batch_size']
+        for start in range(0, len(usernames), batch_size):
+            batch_changed, batch_missing = bulk_action(
+                user, usernames[start:start + batch_size]
+            )
+            changed += batch_changed
+            missing += batch_missing
+        self.stdout.write(f'Изменено подписок: {changed}')
+        if missing:
+            self.stdout.write(f'Не найдены: {", ".join(missing)}')
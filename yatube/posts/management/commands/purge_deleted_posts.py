@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts.purge import BATCH_SIZE, purge_deleted_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Окончательно удаляет помеченные удалёнными посты вместе с '
+        'комментариями и картинками. Запускается по расписанию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Сколько постов обработать за запуск.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько комментариев удалять одним запросом.',
+        )
+
+    def handle(self, *args, **options):
+        purged = purge_deleted_posts(options['limit'], options['batch_size'])
+        self.stdout.write(f'Удалено постов: {purged}')
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации «кого почитать» по графу подписок. '
+        'Запускается по расписанию, например раз в сутки из cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=recommendations.TOP_K,
+            help='Сколько рекомендаций хранить на пользователя.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Число процессов; по умолчанию по числу ядер.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=recommendations.CHUNK_SIZE,
+            help='Сколько пользователей отдавать процессу за раз.',
+        )
+        parser.add_argument(
+            '--engine',
+            choices=recommendations.ENGINES,
+            default=recommendations.default_engine(),
+            help='scipy (нужны numpy и scipy) или python.',
+        )
+
+    def handle(self, *args, **options):
+        engine = options['engine']
+        started = time.perf_counter()
+        stored = recommendations.refresh(
+            options['top'], options['workers'], options['chunk_size'], engine
+        )
+        self.stdout.write(
+            f'Рекомендаций: {stored}, {engine}, '
+            f'{time.perf_counter() - started:.1f} с'
+        )
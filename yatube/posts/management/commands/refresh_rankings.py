@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import rankings
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинги популярных постов и групп. '
+        'Запускается по расписанию, например раз в 10 минут из cron.'
+    )
+
+    def handle(self, *args, **options):
+        post_ids, group_ids = rankings.refresh()
+        self.stdout.write(
+            f'Популярных постов: {len(post_ids)}, групп: {len(group_ids)}'
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from posts.moderation import CHUNK_SIZE, run_pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет задачи массовой модерации из админки пачками. '
+        'Запускается по расписанию; прерванные задачи продолжаются '
+        'с места остановки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Сколько строк менять одним запросом.',
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Повторить задачи, завершившиеся ошибкой.',
+        )
+
+    def handle(self, *args, **options):
+        done, failed = run_pending(
+            options['chunk_size'], options['retry_failed']
+        )
+        self.stdout.write(f'Выполнено задач: {done}, с ошибкой: {failed}')
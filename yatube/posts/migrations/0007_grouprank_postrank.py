@@ -0,0 +1,36 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_auto_20220723_0841'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupRank',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rank', serialize=False, to='posts.Group')),
+                ('score', models.FloatField(db_index=True)),
+                ('refreshed', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-score'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PostRank',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rank', serialize=False, to='posts.Post')),
+                ('score', models.FloatField(db_index=True)),
+                ('refreshed', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-score'],
+            },
+        ),
+    ]
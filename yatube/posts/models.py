@@ -13,9 +13,26 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def soft_delete(self):
+        return self.update(is_deleted=True)
+
+
+class PostManager(models.Manager.from_queryset(PostQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().filter(
+            is_deleted=False, is_hidden=False
+        )
+
+
+class CommentManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(is_hidden=False)
+
+
 class Post(models.Model):
     text = models.TextField()
-    pub_date = models.DateTimeField(auto_now_add=True)
+    pub_date = models.DateTimeField(auto_now_add=True, db_index=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -32,6 +49,13 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    is_deleted = models.BooleanField(default=False, db_index=True)
+    # Скрыт модерацией вместе с автором; в отличие от is_deleted,
+    # обратимо и не удаляется purge_deleted_posts.
+    is_hidden = models.BooleanField(default=False, db_index=True)
+
+    objects = PostManager()
+    all_objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
@@ -39,6 +63,10 @@ class Post(models.Model):
     def __str__(self):
         return self.text[:15]
 
+    def soft_delete(self):
+        self.is_deleted = True
+        self.save(update_fields=['is_deleted'])
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -54,7 +82,16 @@ class Comment(models.Model):
         related_name='comments'
     )
     text = models.TextField()
-    created = models.DateTimeField(auto_now_add=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Метка записи из буфера comment_buffer: по ней сброс после падения
+    # отличает уже записанный комментарий от такого же нового.
+    buffer_id = models.UUIDField(
+        blank=True, null=True, unique=True, editable=False
+    )
+    is_hidden = models.BooleanField(default=False, db_index=True)
+
+    objects = CommentManager()
+    all_objects = models.Manager()
 
     class Meta:
         ordering = ['-created']
@@ -82,3 +119,113 @@ class Follow(models.Model):
                 name='unique_following',
             )
         ]
+
+
+class PostRank(models.Model):
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rank'
+    )
+    score = models.FloatField(db_index=True)
+    refreshed = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-score']
+
+
+class GroupRank(models.Model):
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rank'
+    )
+    score = models.FloatField(db_index=True)
+    refreshed = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-score']
+
+
+class FollowRecommendation(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['-score', 'author_id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_recommendation',
+            )
+        ]
+
+
+class ModerationJob(models.Model):
+    DELETE_POSTS = 'delete_posts'
+    DELETE_COMMENTS = 'delete_comments'
+    REASSIGN_GROUP = 'reassign_group'
+    HIDE_AUTHORS = 'hide_authors'
+    SHOW_AUTHORS = 'show_authors'
+    ACTIONS = (
+        (DELETE_POSTS, 'Удалить посты'),
+        (DELETE_COMMENTS, 'Удалить комментарии'),
+        (REASSIGN_GROUP, 'Перенести посты в группу'),
+        (HIDE_AUTHORS, 'Скрыть посты и комментарии авторов'),
+        (SHOW_AUTHORS, 'Вернуть посты и комментарии авторов'),
+    )
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    action = models.CharField(max_length=32, choices=ACTIONS)
+    # JSON с описанием выбранных строк, см. posts.moderation.
+    target = models.TextField()
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='+'
+    )
+    status = models.CharField(
+        max_length=16, choices=STATUSES, default=PENDING, db_index=True
+    )
+    phase = models.PositiveSmallIntegerField(default=0)
+    cursor = models.BigIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        User,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='+'
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created']
+
+    def __str__(self):
+        return f'{self.get_action_display()} #{self.pk}'
@@ -0,0 +1,216 @@
+"""Фоновые задачи массовой модерации.
+
+Действие в админке только записывает ModerationJob с описанием
+выбранных строк в JSON: по фазе на модель, в каждой — параметры
+фильтра списка в админке в том же виде, что в адресе страницы
+(отмеченные вручную строки — ``pk__in=1,2,3``), строка поиска и
+наибольший подходящий id на момент постановки. Так «выбрать все» на
+миллионе строк не превращается в миллион id, а строки, появившиеся
+позже, в задачу не попадают. Скрытие и возврат авторов проходят две
+фазы: посты, затем комментарии.
+
+Команда run_moderation_jobs выполняет задачу пачками по CHUNK_SIZE
+строк: один UPDATE или DELETE на пачку. Пачка и сдвиг курсора (фаза и
+последний обработанный id) коммитятся в одной транзакции, поэтому
+после падения задача продолжается с места остановки, а повторный
+прогон пачки ничего не ломает.
+
+Удаление постов — мягкое: посты помечаются удалёнными, а комментарии
+и картинки потом убирает purge_deleted_posts. Скрытие автора ставит
+отдельный флаг is_hidden, который purge не трогает, и обратимо.
+"""
+import json
+
+from django.contrib import admin
+from django.contrib.admin.utils import prepare_lookup_value
+from django.db import transaction
+from django.db.models import Count, Max
+
+from core import model_cache, page_cache
+from core.paginator import forget_counts
+
+from . import cards, group_feed
+from .models import Comment, ModerationJob, Post
+from .purge import delete_comments
+
+CHUNK_SIZE = 500
+MODELS = {'post': Post, 'comment': Comment}
+AUTHOR_ACTIONS = {
+    ModerationJob.HIDE_AUTHORS: True,
+    ModerationJob.SHOW_AUTHORS: False,
+}
+
+
+def base_queryset(model):
+    """Все строки, доступные модерации, включая скрытые."""
+    if model is Post:
+        return Post.all_objects.filter(is_deleted=False)
+    return Comment.all_objects.all()
+
+
+def select(model, lookups, search=''):
+    """Строки модели по параметрам фильтра и поиска списка в админке."""
+    rows = base_queryset(model).filter(**{
+        key: prepare_lookup_value(key, value)
+        for key, value in lookups.items()
+    })
+    if search:
+        rows, distinct = admin.site._registry[model].get_search_results(
+            None, rows, search
+        )
+        if distinct:
+            rows = rows.distinct()
+    return rows
+
+
+def phases(action, model, lookups, search):
+    if action not in AUTHOR_ACTIONS:
+        return [(model, lookups, search)]
+    authors = sorted(set(
+        select(model, lookups, search)
+        .order_by().values_list('author_id', flat=True)
+    ))
+    if not authors:
+        return []
+    by_author = {'author_id__in': ','.join(map(str, authors))}
+    return [(Post, by_author, ''), (Comment, by_author, '')]
+
+
+def queue(action, model, lookups, search='', user=None, group=None):
+    """Ставит задачу над строками ``model``, которые админка показала бы
+    с параметрами ``lookups`` и поиском ``search``."""
+    target = []
+    total = 0
+    for phase_model, phase_lookups, phase_search in phases(
+        action, model, lookups, search
+    ):
+        stats = select(phase_model, phase_lookups, phase_search).aggregate(
+            count=Count('pk'), last_pk=Max('pk')
+        )
+        total += stats['count']
+        target.append({
+            'model': phase_model._meta.model_name,
+            'lookups': phase_lookups,
+            'search': phase_search,
+            'last_pk': stats['last_pk'] or 0,
+        })
+    return ModerationJob.objects.create(
+        action=action,
+        target=json.dumps({'phases': target}, ensure_ascii=False),
+        group=group,
+        total=total,
+        created_by=user,
+    )
+
+
+def job_phases(job):
+    for phase in json.loads(job.target)['phases']:
+        model = MODELS[phase['model']]
+        rows = select(model, phase['lookups'], phase['search'])
+        yield model, rows.filter(pk__lte=phase['last_pk'])
+
+
+def next_chunk(job, rows, chunk_size):
+    return list(
+        rows.filter(pk__gt=job.cursor)
+        .order_by('pk')
+        .values_list('pk', flat=True)[:chunk_size]
+    )
+
+
+def apply_comments(job, pks):
+    if job.action == ModerationJob.DELETE_COMMENTS:
+        delete_comments(pks)
+        return
+    comments = Comment.all_objects.filter(pk__in=pks)
+    post_ids = set(
+        comments.order_by().values_list('post_id', flat=True).distinct()
+    ) - {None}
+    comments.update(is_hidden=AUTHOR_ACTIONS[job.action])
+    page_cache.bump(*(f'post:{post_id}' for post_id in post_ids))
+    cards.invalidate(*post_ids)
+
+
+def apply_posts(job, pks):
+    posts = Post.all_objects.filter(pk__in=pks)
+    group_ids = set(
+        posts.order_by().values_list('group_id', flat=True).distinct()
+    )
+    if job.action == ModerationJob.REASSIGN_GROUP:
+        posts.update(group_id=job.group_id)
+        group_ids.add(job.group_id)
+    else:
+        if job.action in AUTHOR_ACTIONS:
+            posts.update(is_hidden=AUTHOR_ACTIONS[job.action])
+        else:
+            posts.soft_delete()
+        forget_counts(Post)
+    group_feed.invalidate(*group_ids)
+    model_cache.invalidate_pks(Post, pks)
+    cards.invalidate(*pks)
+    page_cache.bump('posts', *(f'post:{pk}' for pk in pks))
+
+
+def apply_chunk(job, model, pks):
+    if model is Comment:
+        apply_comments(job, pks)
+    else:
+        apply_posts(job, pks)
+
+
+def run_job(job, chunk_size=CHUNK_SIZE):
+    """Выполняет задачу до конца; возвращает число обработанных строк."""
+    ModerationJob.objects.filter(pk=job.pk).update(
+        status=ModerationJob.RUNNING
+    )
+    job.status = ModerationJob.RUNNING
+    processed = 0
+    try:
+        for phase, (model, rows) in enumerate(job_phases(job)):
+            if phase < job.phase:
+                continue
+            if phase > job.phase:
+                job.phase, job.cursor = phase, 0
+                job.save(update_fields=['phase', 'cursor', 'updated'])
+            while True:
+                pks = next_chunk(job, rows, chunk_size)
+                if not pks:
+                    break
+                with transaction.atomic():
+                    apply_chunk(job, model, pks)
+                    job.cursor = pks[-1]
+                    job.processed += len(pks)
+                    job.save(
+                        update_fields=['cursor', 'processed', 'updated']
+                    )
+                processed += len(pks)
+    except Exception as error:
+        job.status = ModerationJob.FAILED
+        job.error = repr(error)
+        job.save(update_fields=['status', 'error', 'updated'])
+        raise
+    job.status = ModerationJob.DONE
+    job.total = max(job.total, job.processed)
+    job.save(update_fields=['status', 'total', 'updated'])
+    return processed
+
+
+def run_pending(chunk_size=CHUNK_SIZE, retry_failed=False):
+    """Выполняет очередь, начиная с прерванных задач.
+
+    Возвращает число выполненных и упавших задач; упавшая задача
+    не мешает остальным.
+    """
+    statuses = [ModerationJob.RUNNING, ModerationJob.PENDING]
+    if retry_failed:
+        statuses.append(ModerationJob.FAILED)
+    jobs = ModerationJob.objects.filter(status__in=statuses).order_by('pk')
+    done = failed = 0
+    for job in jobs:
+        try:
+            run_job(job, chunk_size)
+        except Exception:
+            failed += 1
+        else:
+            done += 1
+    return done, failed
@@ -0,0 +1,65 @@
+"""Фоновая очистка мягко удалённых постов.
+
+post_delete только помечает пост удалённым, а комментарии, миниатюры и
+файлы картинок удаляются здесь небольшими пачками, каждая в своей
+транзакции, чтобы не держать блокировку записи SQLite надолго.
+
+Комментарии удаляются одним DELETE без загрузки строк: сигнал
+post_delete на каждый комментарий сбрасывал бы одни и те же кеши поста
+сотни раз, поэтому страницы и карточки сбрасываются один раз на пачку.
+"""
+from sorl.thumbnail import delete as delete_image
+
+from core import page_cache
+
+from . import cards
+from .models import Comment, Post
+
+BATCH_SIZE = 1000
+
+
+def drop_comment_pages(post_ids):
+    page_cache.bump(*(f'post:{post_id}' for post_id in post_ids))
+    cards.invalidate(*post_ids)
+
+
+def delete_comments(pks):
+    """Удаляет комментарии по id и сбрасывает кеши их постов."""
+    comments = Comment.all_objects.filter(pk__in=pks)
+    post_ids = set(
+        comments.order_by().values_list('post_id', flat=True).distinct()
+    ) - {None}
+    comments._raw_delete(comments.db)
+    drop_comment_pages(post_ids)
+
+
+def purge_comments(post_id, batch_size=BATCH_SIZE):
+    deleted = 0
+    while True:
+        ids = list(
+            Comment.all_objects.filter(post_id=post_id)
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        Comment.all_objects.filter(pk__in=ids)._raw_delete(Comment.objects.db)
+        deleted += len(ids)
+    if deleted:
+        drop_comment_pages([post_id])
+    return deleted
+
+
+def purge_post(post, batch_size=BATCH_SIZE):
+    purge_comments(post.pk, batch_size)
+    if post.image:
+        delete_image(post.image)
+    post.delete()
+
+
+def purge_deleted_posts(limit=None, batch_size=BATCH_SIZE):
+    posts = Post.all_objects.filter(is_deleted=True).only('pk', 'image')
+    purged = 0
+    for post in list(posts[:limit]):
+        purge_post(post, batch_size)
+        purged += 1
+    return purged
@@ -0,0 +1,131 @@
+"""Предрасчитанные рейтинги: популярные посты и активные группы.
+
+Очки хранятся в PostRank/GroupRank и затухают экспоненциально: при каждом
+обновлении старые очки умножаются на 0.5 ** (прошедшее время / HALF_LIFE),
+и к ним добавляются события с прошлого обновления. Страницы читают готовый
+список id лучших объектов из кеша.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.utils import timezone
+
+from . import cards
+from .models import Comment, Group, GroupRank, Post, PostRank
+
+TOP_SIZE = 10
+HALF_LIFE = timedelta(days=2)
+BACKFILL = timedelta(days=7)
+MIN_SCORE = 0.01
+POST_WEIGHT = 3
+COMMENT_WEIGHT = 1
+BATCH_SIZE = 500
+
+TRENDING_POSTS_KEY = 'rankings:posts'
+TOP_GROUPS_KEY = 'rankings:groups'
+
+
+def _count_by(queryset, field):
+    return dict(
+        queryset.order_by().values(field)
+        .annotate(n=Count('pk')).values_list(field, 'n')
+    )
+
+
+def _apply_scores(rank_model, key_field, scores, now):
+    ranks = rank_model.objects.in_bulk(list(scores))
+    new_ranks = []
+    for pk, points in scores.items():
+        rank = ranks.get(pk)
+        if rank is None:
+            new_ranks.append(
+                rank_model(**{key_field: pk}, score=points, refreshed=now)
+            )
+        else:
+            rank.score += points
+    rank_model.objects.bulk_update(
+        ranks.values(), ['score'], batch_size=BATCH_SIZE
+    )
+    rank_model.objects.bulk_create(new_ranks, batch_size=BATCH_SIZE)
+
+
+def _decay(rank_model, since, now):
+    factor = 0.5 ** ((now - since) / HALF_LIFE)
+    rank_model.objects.update(score=F('score') * factor, refreshed=now)
+    rank_model.objects.filter(score__lt=MIN_SCORE).delete()
+
+
+def _top_ids(rank_model, size=TOP_SIZE):
+    return list(rank_model.objects.values_list('pk', flat=True)[:size])
+
+
+def refresh(now=None):
+    """Затухание старых очков и учёт новых событий одним проходом."""
+    now = now or timezone.now()
+    since = max(
+        PostRank.objects.aggregate(last=Max('refreshed'))['last']
+        or now - BACKFILL,
+        GroupRank.objects.aggregate(last=Max('refreshed'))['last']
+        or now - BACKFILL,
+    )
+    comments = Comment.objects.filter(
+        created__gt=since, created__lte=now,
+        post__is_deleted=False, post__is_hidden=False,
+    )
+    posts = Post.objects.filter(pub_date__gt=since, pub_date__lte=now)
+    post_scores = {
+        post_id: n * COMMENT_WEIGHT
+        for post_id, n in _count_by(
+            comments.filter(post__isnull=False), 'post'
+        ).items()
+    }
+    group_scores = {
+        group_id: n * POST_WEIGHT
+        for group_id, n in _count_by(
+            posts.filter(group__isnull=False), 'group'
+        ).items()
+    }
+    group_comments = _count_by(
+        comments.filter(post__group__isnull=False), 'post__group'
+    )
+    for group_id, n in group_comments.items():
+        group_scores[group_id] = (
+            group_scores.get(group_id, 0) + n * COMMENT_WEIGHT
+        )
+    with transaction.atomic():
+        _decay(PostRank, since, now)
+        _decay(GroupRank, since, now)
+        _apply_scores(PostRank, 'post_id', post_scores, now)
+        _apply_scores(GroupRank, 'group_id', group_scores, now)
+    post_ids = _top_ids(PostRank)
+    group_ids = _top_ids(GroupRank)
+    cache.set_many(
+        {TRENDING_POSTS_KEY: post_ids, TOP_GROUPS_KEY: group_ids}, None
+    )
+    return post_ids, group_ids
+
+
+def _cached_top_ids(key, rank_model):
+    ids = cache.get(key)
+    if ids is None:
+        ids = _top_ids(rank_model)
+        cache.set(key, ids, None)
+    return ids
+
+
+def _in_order(objects, ids):
+    return [objects[pk] for pk in ids if pk in objects]
+
+
+def trending_posts():
+    ids = _cached_top_ids(TRENDING_POSTS_KEY, PostRank)
+    return cards.get_posts_by_ids(ids)
+
+
+def top_groups():
+    ids = _cached_top_ids(TOP_GROUPS_KEY, GroupRank)
+    return _in_order(
+        Group.objects.annotate(score=F('rank__score')).in_bulk(ids), ids
+    )
@@ -0,0 +1,209 @@
+"""Рекомендации «кого почитать», посчитанные заранее по графу подписок.
+
+Кандидаты для пользователя — авторы, на которых подписаны его авторы
+(друзья друзей), очки — число таких общих связей. Если есть numpy и
+scipy, граф собирается в разреженную матрицу A, и для пачки строк
+считается A[rows] @ A; без них работает счёт по словарю множеств.
+Пачки пользователей раздаются процессам multiprocessing, лучшие TOP_K
+на пользователя записываются в FollowRecommendation.
+
+Расчёт идёт вне транзакции: ``store()`` заменяет рекомендации пачками
+пользователей, каждую в своей короткой транзакции, и не держит
+блокировку записи SQLite, пока считаются остальные. Пользователь видит
+либо старый, либо новый список целиком. Замер на синтетическом графе:
+``python manage.py bench_recommendations``.
+"""
+import heapq
+import multiprocessing
+from collections import Counter, defaultdict
+from itertools import chain
+
+from django.db import transaction
+
+from . import follow_graph
+from .models import Follow, FollowRecommendation
+
+try:
+    import numpy
+    from scipy import sparse
+except ImportError:
+    numpy = sparse = None
+
+TOP_K = 10
+SHOWN = 5
+CHUNK_SIZE = 1000
+BATCH_SIZE = 5000
+DELETE_BATCH = 500
+ENGINES = ('scipy', 'python')
+
+_state = {}
+
+
+def load_edges():
+    return Follow.objects.order_by().values_list(
+        'user_id', 'author_id'
+    ).iterator(chunk_size=BATCH_SIZE)
+
+
+def build_matrix(edges):
+    users, authors = numpy.fromiter(
+        chain.from_iterable(edges), dtype=numpy.int64
+    ).reshape(-1, 2).T
+    ids = numpy.unique(numpy.concatenate([users, authors]))
+    matrix = sparse.csr_matrix(
+        (
+            numpy.ones(len(users), dtype=numpy.int32),
+            (numpy.searchsorted(ids, users), numpy.searchsorted(ids, authors)),
+        ),
+        shape=(len(ids), len(ids)),
+    )
+    return ids, matrix
+
+
+def build_graph(edges):
+    graph = defaultdict(set)
+    for user_id, author_id in edges:
+        graph[user_id].add(author_id)
+    return graph
+
+
+def _init(state):
+    _state.update(state)
+
+
+def _top_matrix(rows):
+    ids, matrix, top = _state['ids'], _state['matrix'], _state['top']
+    block = (matrix[rows] @ matrix).tocsr()
+    result = []
+    for index, row in enumerate(rows):
+        start, end = block.indptr[index], block.indptr[index + 1]
+        columns, scores = block.indices[start:end], block.data[start:end]
+        followed = matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]
+        keep = (columns != row) & ~numpy.isin(columns, followed)
+        columns, scores = columns[keep], scores[keep]
+        if len(columns) > top:
+            best = numpy.argpartition(-scores, top)[:top]
+            columns, scores = columns[best], scores[best]
+        order = numpy.lexsort((ids[columns], -scores))
+        user_id = int(ids[row])
+        result.extend(
+            (user_id, int(ids[column]), int(score))
+            for column, score in zip(columns[order], scores[order])
+        )
+    return result
+
+
+def _top_graph(user_ids):
+    graph, top = _state['graph'], _state['top']
+    result = []
+    for user_id in user_ids:
+        followed = graph[user_id]
+        scores = Counter()
+        for author_id in followed:
+            scores.update(graph.get(author_id, ()))
+        scores.pop(user_id, None)
+        for author_id in followed:
+            scores.pop(author_id, None)
+        best = heapq.nsmallest(
+            top, scores.items(), key=lambda item: (-item[1], item[0])
+        )
+        result.extend((user_id, author_id, score) for author_id, score in best)
+    return result
+
+
+def default_engine():
+    return 'python' if sparse is None else 'scipy'
+
+
+def compute(edges, top=TOP_K, workers=None, chunk_size=CHUNK_SIZE,
+            engine=None):
+    """Лучшие ``top`` кандидатов: итератор (user_id, author_id, score).
+
+    Строки одного пользователя идут подряд.
+    """
+    if (engine or default_engine()) == 'scipy':
+        ids, matrix = build_matrix(edges)
+        state = {'ids': ids, 'matrix': matrix, 'top': top}
+        rows = numpy.unique(matrix.nonzero()[0])
+        func = _top_matrix
+    else:
+        graph = build_graph(edges)
+        state = {'graph': graph, 'top': top}
+        rows = sorted(graph)
+        func = _top_graph
+    chunks = [
+        rows[start:start + chunk_size]
+        for start in range(0, len(rows), chunk_size)
+    ]
+    workers = workers or multiprocessing.cpu_count()
+    if workers == 1 or len(chunks) < 2:
+        _init(state)
+        for chunk in chunks:
+            yield from func(chunk)
+        return
+    with multiprocessing.Pool(
+        min(workers, len(chunks)), initializer=_init, initargs=(state,)
+    ) as pool:
+        for result in pool.imap_unordered(func, chunks):
+            yield from result
+
+
+def _replace(user_ids, batch):
+    with transaction.atomic():
+        FollowRecommendation.objects.filter(user_id__in=user_ids).delete()
+        FollowRecommendation.objects.bulk_create(batch)
+
+
+def store(recommendations, batch_size=BATCH_SIZE):
+    """Заменяет все рекомендации новыми; возвращает число строк.
+
+    Рекомендации меняются пачками по целым пользователям; у тех, для
+    кого новых нет, старые удаляются в конце.
+    """
+    stale = set(
+        FollowRecommendation.objects.order_by()
+        .values_list('user_id', flat=True).distinct()
+    )
+    stored = 0
+    user_ids = []
+    batch = []
+    for user_id, author_id, score in recommendations:
+        if not user_ids or user_ids[-1] != user_id:
+            if len(batch) >= batch_size or len(user_ids) >= DELETE_BATCH:
+                _replace(user_ids, batch)
+                stored += len(batch)
+                user_ids, batch = [], []
+            user_ids.append(user_id)
+            stale.discard(user_id)
+        batch.append(FollowRecommendation(
+            user_id=user_id, author_id=author_id, score=score
+        ))
+    if batch:
+        _replace(user_ids, batch)
+        stored += len(batch)
+    stale = sorted(stale)
+    for start in range(0, len(stale), DELETE_BATCH):
+        FollowRecommendation.objects.filter(
+            user_id__in=stale[start:start + DELETE_BATCH]
+        ).delete()
+    return stored
+
+
+def refresh(top=TOP_K, workers=None, chunk_size=CHUNK_SIZE, engine=None):
+    return store(
+        compute(load_edges(), top, workers, chunk_size, engine)
+    )
+
+
+def recommended_authors(user, limit=SHOWN):
+    """Рекомендации для страницы без тех, на кого уже подписались."""
+    if not user.is_authenticated:
+        return []
+    followed = follow_graph.followees(user.pk)
+    recommendations = FollowRecommendation.objects.filter(
+        user=user
+    ).select_related('author')[:TOP_K]
+    return [
+        recommendation.author for recommendation in recommendations
+        if not follow_graph.contains(followed, recommendation.author_id)
+    ][:limit]
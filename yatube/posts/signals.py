@@ -0,0 +1,115 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import page_cache
+from core.paginator import adjust_count
+
+from . import cards, events, follow_graph, group_feed, thumbnails
+from .models import Comment, Follow, Group, Post
+
+
+# Поля, от которых зависит, в каких лентах пост и сколько их в ленте.
+FEED_FIELDS = {'group', 'author', 'is_deleted', 'is_hidden'}
+
+
+def counted_in(author_id):
+    """Запросы лент, в чьи числа постов (core.paginator) входит пост."""
+    return [Post.objects.all(), Post.objects.filter(author_id=author_id)]
+
+
+def count_author(author_id, is_deleted, is_hidden, **fields):
+    return None if is_deleted or is_hidden else author_id
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_feeds(sender, instance, update_fields, **kwargs):
+    instance._old_feeds = None
+    if instance.pk is None or (
+        update_fields is not None and not FEED_FIELDS & set(update_fields)
+    ):
+        return
+    instance._old_feeds = (
+        Post.all_objects.filter(pk=instance.pk)
+        .values('group_id', 'author_id', 'is_deleted', 'is_hidden').first()
+    )
+
+
+def adjust_feed_counts(instance, created):
+    new = count_author(
+        instance.author_id, instance.is_deleted, instance.is_hidden
+    )
+    old = getattr(instance, '_old_feeds', None)
+    if old is not None:
+        old = count_author(**old)
+    elif not created:
+        return
+    if old == new:
+        return
+    if old is not None:
+        for queryset in counted_in(old):
+            adjust_count(queryset, -1)
+    if new is not None:
+        for queryset in counted_in(new):
+            adjust_count(queryset, 1)
+
+
+@receiver(post_save, sender=Post)
+def publish_new_post(sender, instance, created, update_fields, **kwargs):
+    page_cache.bump('posts', f'post:{instance.pk}')
+    cards.invalidate(instance.pk)
+    old = getattr(instance, '_old_feeds', None)
+    group_feed.invalidate(instance.group_id, old and old['group_id'])
+    adjust_feed_counts(instance, created)
+    if created:
+        transaction.on_commit(lambda: events.publish_post(instance))
+    if instance.image and (update_fields is None or 'image' in update_fields):
+        transaction.on_commit(lambda: thumbnails.warm(instance.image))
+
+
+@receiver(post_save, sender=Comment)
+def publish_new_comment(sender, instance, created, **kwargs):
+    if created:
+        page_cache.bump(f'post:{instance.post_id}')
+        cards.invalidate(instance.post_id)
+        transaction.on_commit(lambda: events.publish_comment(instance))
+
+
+@receiver(post_delete, sender=Post)
+def drop_post_page(sender, instance, **kwargs):
+    # Ленты не сбрасываются: удалённый пост живёт в них до таймаута.
+    page_cache.bump(f'post:{instance.pk}')
+    cards.invalidate(instance.pk)
+    # purge_deleted_posts удаляет посты без group_id: их лента
+    # и числа постов уже сброшены при мягком удалении.
+    deferred = instance.get_deferred_fields()
+    if 'group_id' not in deferred:
+        group_feed.invalidate(instance.group_id)
+    if not deferred and not instance.is_deleted and not instance.is_hidden:
+        for queryset in counted_in(instance.author_id):
+            adjust_count(queryset, -1)
+
+
+@receiver(post_delete, sender=Comment)
+def drop_comment_count(sender, instance, **kwargs):
+    # Пачки модерации и purge_deleted_posts удаляют без сигналов
+    # и сбрасывают кеши сами, один раз на пачку (posts.purge).
+    page_cache.bump(f'post:{instance.post_id}')
+    cards.invalidate(instance.post_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def drop_group_feed(sender, instance, **kwargs):
+    group_feed.forget_group(instance)
+
+
+@receiver(post_save, sender=Follow)
+def add_followee(sender, instance, created, **kwargs):
+    if created:
+        follow_graph.followed(instance.user_id, [instance.author_id])
+
+
+@receiver(post_delete, sender=Follow)
+def remove_followee(sender, instance, **kwargs):
+    follow_graph.unfollowed(instance.user_id, [instance.author_id])
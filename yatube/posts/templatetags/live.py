@@ -0,0 +1,14 @@
+from django import template
+from django.conf import settings
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/live_updates.html')
+def live_updates(events_url, event):
+    """Баннер о новых событиях; пустой, если LIVE_UPDATES выключен."""
+    return {
+        'enabled': settings.LIVE_UPDATES,
+        'events_url': events_url,
+        'event': event,
+    }
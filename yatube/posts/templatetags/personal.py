@@ -0,0 +1,42 @@
+from django import template
+from django.conf import settings
+
+from posts import comment_buffer, follow_graph, recommendations
+from posts.forms import CommentForm
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def is_following(context, author_id):
+    user = context['user']
+    return user.is_authenticated and follow_graph.is_following(
+        user.pk, author_id
+    )
+
+
+@register.simple_tag
+def follower_count(author_id):
+    return follow_graph.follower_count(author_id)
+
+
+@register.simple_tag(takes_context=True)
+def recommended_authors(context):
+    return recommendations.recommended_authors(context['user'])
+
+
+@register.simple_tag
+def comment_form():
+    return CommentForm()
+
+
+@register.simple_tag(takes_context=True)
+def pending_comments(context, post_id):
+    """Свои комментарии к посту, ещё лежащие в буфере отложенной записи."""
+    user = context['user']
+    if not (settings.COMMENT_WRITE_BEHIND and user.is_authenticated):
+        return []
+    comments = comment_buffer.pending_for(post_id, user.pk)
+    for comment in comments:
+        comment.author = user
+    return comments
@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import TestCase
+
+from .. import cards
+from ..cards import get_posts_by_ids
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class PostCardsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='carder', first_name='Карл', last_name='Карточкин'
+        )
+        cls.group = Group.objects.create(title='Карточки', slug='cards')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Карточка {number}'
+            )
+            for number in range(3)
+        ]
+        Comment.objects.create(
+            post=cls.posts[1], author=cls.author, text='Первый'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_order_and_batching(self):
+        """Проверка: порядок id сохраняется, промахи — одним запросом."""
+        ids = [self.posts[2].pk, 0, self.posts[0].pk, self.posts[1].pk]
+        with self.assertNumQueries(1):
+            cards = get_posts_by_ids(ids)
+        self.assertEqual([card.pk for card in cards], [ids[0]] + ids[2:])
+        self.assertEqual(
+            [card.comment_count for card in cards], [0, 0, 1]
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(len(get_posts_by_ids(ids)), 3)
+
+    def test_comment_and_edit_reset_card(self):
+        """Проверка: новый комментарий и правка обновляют карточку."""
+        post = self.posts[0]
+        get_posts_by_ids([post.pk])
+        Comment.objects.create(post=post, author=self.author, text='Ещё')
+        post.text = 'Исправлено'
+        post.save()
+        card, = get_posts_by_ids([post.pk])
+        self.assertEqual(card.comment_count, 1)
+        self.assertEqual(card.text, 'Исправлено')
+
+    def test_post_card_template_renders_cards(self):
+        """Проверка: post_card.html выводит карточку как пост."""
+        card, = get_posts_by_ids([self.posts[1].pk])
+        html = render_to_string(
+            'posts/includes/post_card.html', {'post': card}
+        )
+        self.assertIn('Карл Карточкин', html)
+        self.assertIn('/group/cards/', html)
+        self.assertIn('Комментариев: 1', html)
+        self.assertIn(f'/posts/{card.pk}/', html)
+
+    def test_broken_image_is_logged_not_raised(self):
+        """Проверка: битая картинка даёт карточку без миниатюры и запись
+        в лог, а прочие ошибки не глотаются."""
+        with mock.patch.object(
+            cards, 'get_thumbnail', side_effect=OSError('truncated')
+        ), self.assertLogs('posts.cards', 'ERROR'):
+            self.assertIsNone(cards.thumbnail_url('posts/broken.jpg'))
+        with mock.patch.object(
+            cards, 'get_thumbnail', side_effect=KeyError('engine')
+        ), self.assertRaises(KeyError):
+            cards.thumbnail_url('posts/broken.jpg')
@@ -0,0 +1,189 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import comment_buffer
+from ..models import Comment, Post
+
+User = get_user_model()
+
+TEMP_BUFFER_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+THREAD_BUFFER_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(
+    COMMENT_WRITE_BEHIND=True,
+    COMMENT_BUFFER_PATH=os.path.join(TEMP_BUFFER_DIR, 'comments.log'),
+    COMMENT_BUFFER_FSYNC=False,
+    COMMENT_FLUSH_INTERVAL_MS=None,
+)
+class CommentBufferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='TestReader')
+        cls.post = Post.objects.create(author=cls.author, text='Test post')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_BUFFER_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        for name in os.listdir(TEMP_BUFFER_DIR):
+            os.remove(os.path.join(TEMP_BUFFER_DIR, name))
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.url = reverse('posts:post_detail', args=(self.post.pk,))
+
+    def comment(self, text):
+        return self.author_client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            data={'text': text},
+        )
+
+    def test_author_reads_own_buffered_comment(self):
+        """Проверка: комментарий ждёт в буфере, но автор его уже видит."""
+        self.reader_client.get(self.url)
+        self.comment('Buffered comment')
+        self.assertFalse(Comment.objects.exists())
+        self.assertContains(
+            self.author_client.get(self.url), 'Buffered comment'
+        )
+        self.assertNotContains(
+            self.reader_client.get(self.url), 'Buffered comment'
+        )
+
+    def test_flush_saves_batch(self):
+        """Проверка: сброс пишет все комментарии и очищает буфер,
+        страница поста перестаёт быть устаревшей."""
+        self.reader_client.get(self.url)
+        for number in range(3):
+            self.comment(f'Comment {number}')
+        out = StringIO()
+        call_command('flush_comments', stdout=out)
+        self.assertIn('3', out.getvalue())
+        self.assertEqual(
+            sorted(Comment.objects.values_list('text', flat=True)),
+            ['Comment 0', 'Comment 1', 'Comment 2'],
+        )
+        self.assertEqual(comment_buffer.pending_for(
+            self.post.pk, self.author.pk
+        ), [])
+        self.assertContains(self.reader_client.get(self.url), 'Comment 2')
+        self.assertEqual(comment_buffer.flush(), 0)
+
+    def test_interrupted_flush_is_not_repeated(self):
+        """Проверка: файл прерванного сброса дописывается без повторов,
+        одинаковый текст второй строки не считается повтором."""
+        saved_id = uuid.uuid4()
+        Comment.objects.create(
+            post=self.post, author=self.author, text='+1', buffer_id=saved_id
+        )
+        created = timezone.now() - timedelta(minutes=1)
+        lines = [
+            json.dumps({
+                'id': buffer_id.hex,
+                'post_id': self.post.pk,
+                'author_id': self.author.pk,
+                'text': '+1',
+                'created': created.isoformat(),
+            })
+            for buffer_id in (saved_id, uuid.uuid4())
+        ]
+        with open(comment_buffer.batch_path(), 'w') as batch:
+            batch.write('\n'.join(lines) + '\n{"post_id": ')
+        self.assertEqual(comment_buffer.flush(), 1)
+        self.assertEqual(
+            list(Comment.objects.values_list('text', flat=True)),
+            ['+1', '+1'],
+        )
+        self.assertEqual(Comment.objects.earliest('created').created, created)
+
+    def test_comments_to_deleted_posts_are_dropped(self):
+        """Проверка: комментарии к удалённому посту не ломают сброс."""
+        post = Post.objects.create(author=self.author, text='Short-lived')
+        comment_buffer.append(post.pk, self.author.pk, 'Orphan')
+        comment_buffer.append(self.post.pk, self.author.pk, 'Kept')
+        Post.all_objects.filter(pk=post.pk).delete()
+        self.assertEqual(comment_buffer.flush(), 1)
+        self.assertEqual(Comment.objects.get().text, 'Kept')
+
+
+@override_settings(
+    COMMENT_WRITE_BEHIND=True,
+    COMMENT_BUFFER_PATH=os.path.join(THREAD_BUFFER_DIR, 'comments.log'),
+    COMMENT_BUFFER_FSYNC=False,
+    COMMENT_FLUSH_INTERVAL_MS=20,
+)
+class FlusherThreadTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(THREAD_BUFFER_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='TestAuthor')
+        self.post = Post.objects.create(author=self.author, text='Test post')
+        self.flusher = comment_buffer.Flusher()
+        patcher = mock.patch.object(comment_buffer, 'flusher', self.flusher)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.flusher.stop)
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_thread_flushes_buffer(self):
+        """Проверка: поток сам переносит буфер в базу."""
+        comment_buffer.append(self.post.pk, self.author.pk, 'Flushed')
+        # Пока поток пишет, общая база SQLite в памяти заперта для чтения:
+        # ждём исчезновения файлов буфера и останавливаем поток.
+        self.wait_for(lambda: not any(
+            os.path.exists(path) for path in (
+                comment_buffer.buffer_path(), comment_buffer.batch_path()
+            )
+        ))
+        self.flusher.stop()
+        self.assertEqual(Comment.objects.get().text, 'Flushed')
+
+    def test_thread_logs_failed_flush(self):
+        """Проверка: ошибка сброса пишется в лог, поток продолжает работу."""
+        calls = []
+
+        def failing_flush():
+            calls.append(None)
+            raise OSError('disk is gone')
+
+        with mock.patch.object(comment_buffer, 'flush', failing_flush), \
+                self.assertLogs('posts.comment_buffer', 'ERROR') as logs:
+            comment_buffer.append(self.post.pk, self.author.pk, 'Kept')
+            self.wait_for(lambda: len(calls) >= 2)
+            self.flusher.stop()
+        self.assertIn('disk is gone', logs.output[0])
+        self.assertTrue(comment_buffer.pending_for(
+            self.post.pk, self.author.pk
+        ))
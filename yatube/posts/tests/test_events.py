@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import events
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class EventsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.follower = User.objects.create_user(username='Follower')
+        cls.group = Group.objects.create(
+            title='Test group title',
+            slug='test-slug',
+            description='Test group description',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Test post text', group=cls.group
+        )
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def read_stream(self, client, url, last_event_id):
+        response = client.get(
+            url, {'poll': 1}, HTTP_LAST_EVENT_ID=str(last_event_id)
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return response.content.decode()
+
+    def test_bus_filters_events_by_channel(self):
+        """Проверка: подписчик получает только события своих каналов."""
+        seq = events.publish_post(self.post)
+        found = events.bus.wait(seq - 1, {f'group:{self.group.pk}'}, 0)
+        self.assertEqual([event[0] for event in found], [seq])
+        self.assertEqual(events.bus.wait(seq - 1, {'group:0'}, 0), [])
+
+    def test_feed_streams_get_new_posts(self):
+        """Проверка: ленты главной, группы и подписок получают
+        уведомление о новом посте."""
+        seq = events.publish_post(self.post)
+        follower_client = Client()
+        follower_client.force_login(self.follower)
+        urls = [
+            reverse('posts:index_events'),
+            reverse('posts:group_events', kwargs={'slug': self.group.slug}),
+            reverse('posts:follow_events'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                stream = self.read_stream(follower_client, url, seq - 1)
+                self.assertIn(f'id: {seq}\nevent: post\n', stream)
+                self.assertIn(f'"id": {self.post.pk}', stream)
+
+    def test_post_stream_gets_new_comments(self):
+        """Проверка: страница поста получает уведомление о комментарии."""
+        comment = Comment.objects.create(
+            post=self.post, author=self.follower, text='Comment'
+        )
+        seq = events.publish_comment(comment)
+        stream = self.read_stream(
+            self.client,
+            reverse('posts:post_events', kwargs={'post_id': self.post.pk}),
+            seq - 1,
+        )
+        self.assertIn(f'id: {seq}\nevent: comment\n', stream)
+
+    def test_first_poll_returns_current_id(self):
+        """Проверка: первый опрос сразу отвечает номером для следующего."""
+        seq = events.publish_post(self.post)
+        response = self.client.get(reverse('posts:index_events'), {'poll': 1})
+        self.assertEqual(response.content.decode(), f'id: {seq}\n\n')
+
+    def test_long_poll_is_bounded(self):
+        """Проверка: long-poll без событий отвечает по таймауту номером."""
+        seq = events.publish_post(self.post)
+        self.assertEqual(
+            events.poll(['group:0'], seq, timeout=0.05), f'id: {seq}\n\n'
+        )
+
+    def test_pages_subscribe_by_default(self):
+        """Проверка: страницы подписываются на поток событий, пока
+        LIVE_UPDATES не выключен."""
+        url = reverse('posts:index')
+        self.assertContains(self.client.get(url), 'EventSource')
+        cache.clear()
+        with override_settings(LIVE_UPDATES=False):
+            response = self.client.get(url)
+        self.assertNotContains(response, 'live-updates')
@@ -0,0 +1,111 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import follow_graph
+from ..models import Follow
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Reader')
+        cls.authors = [
+            User.objects.create_user(username=f'Author{number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_graph_follows_table_writes(self):
+        """Проверка: граф правится при создании и удалении подписок."""
+        first, second, _ = self.authors
+        self.assertFalse(follow_graph.is_following(self.user.pk, first.pk))
+        Follow.objects.create(user=self.user, author=second)
+        Follow.objects.create(user=self.user, author=first)
+        self.assertEqual(
+            list(follow_graph.followees(self.user.pk)),
+            sorted([first.pk, second.pk]),
+        )
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                follow_graph.is_following(self.user.pk, first.pk)
+            )
+        Follow.objects.filter(user=self.user, author=first).delete()
+        self.assertFalse(follow_graph.is_following(self.user.pk, first.pk))
+
+    def test_build_racing_with_write_is_not_read(self):
+        """Проверка: массив, собранный до записи в Follow, но положенный
+        в кеш после неё, не читается."""
+        author = self.authors[0]
+        stale = Follow.objects.filter
+
+        def follow_during_build(*args, **kwargs):
+            rows = list(stale(*args, **kwargs).values_list(
+                'user_id', 'author_id'
+            ))
+            Follow.objects.create(user=self.user, author=author)
+            return mock.Mock(values_list=lambda *fields: rows)
+
+        with mock.patch.object(
+            Follow.objects, 'filter', side_effect=follow_during_build
+        ):
+            self.assertEqual(list(follow_graph.followees(self.user.pk)), [])
+        self.assertTrue(follow_graph.is_following(self.user.pk, author.pk))
+
+    def test_follower_count(self):
+        """Проверка: счётчик подписчиков меняется без пересчёта."""
+        author = self.authors[0]
+        self.assertEqual(follow_graph.follower_count(author.pk), 0)
+        follow = Follow.objects.create(user=self.user, author=author)
+        with self.assertNumQueries(0):
+            self.assertEqual(follow_graph.follower_count(author.pk), 1)
+        follow.delete()
+        self.assertEqual(follow_graph.follower_count(author.pk), 0)
+
+    def test_mutuals(self):
+        """Проверка: взаимные подписки находятся по графу."""
+        first, second, third = self.authors
+        for author in (first, second, third):
+            Follow.objects.create(user=self.user, author=author)
+        Follow.objects.create(user=second, author=self.user)
+        Follow.objects.create(user=third, author=first)
+        self.assertEqual(follow_graph.mutuals(self.user.pk), [second.pk])
+
+    def test_follow_view_creates_one_follow(self):
+        """Проверка: повторная подписка не создаёт запись и не считается."""
+        author = self.authors[0]
+        url = reverse('posts:profile_follow', args=[author.username])
+        self.client.get(url)
+        self.client.get(url)
+        self.assertEqual(
+            Follow.objects.filter(user=self.user, author=author).count(), 1
+        )
+        self.assertEqual(follow_graph.follower_count(author.pk), 1)
+        response = self.client.get(
+            reverse('posts:profile', args=[author.username])
+        )
+        self.assertContains(response, 'Подписчиков: 1')
+        self.assertContains(response, 'Отписаться')
+
+    def test_follow_view_ignores_stale_graph(self):
+        """Проверка: подписка, которой нет в устаревшем графе, не
+        увеличивает счётчик подписчиков второй раз."""
+        author = self.authors[0]
+        self.assertEqual(follow_graph.follower_count(author.pk), 0)
+        Follow.objects.bulk_create([Follow(user=self.user, author=author)])
+        self.client.get(
+            reverse('posts:profile_follow', args=[author.username])
+        )
+        self.assertEqual(follow_graph.follower_count(author.pk), 0)
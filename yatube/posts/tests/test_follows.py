@@ -0,0 +1,108 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import ratelimit
+
+from .. import follow_graph
+from ..follows import parse_usernames
+from ..models import Follow
+
+User = get_user_model()
+
+
+class BulkFollowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Migrant')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        ratelimit._blocked_until.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        cache.clear()
+        ratelimit._blocked_until.clear()
+
+    def test_parse_usernames(self):
+        """Проверка: имена разбираются по разделителям без повторов."""
+        self.assertEqual(
+            parse_usernames('@one, two\nthree;one  two'),
+            ['one', 'two', 'three'],
+        )
+
+    def test_bulk_follow_uses_fixed_number_of_queries(self):
+        """Проверка: число запросов не зависит от длины списка."""
+        Follow.objects.create(user=self.user, author=self.authors[0])
+        usernames = ' '.join(
+            [author.username for author in self.authors]
+            + [self.user.username, 'nobody']
+        )
+        url = reverse('posts:follow_bulk')
+        self.client.get(url)
+        with self.assertNumQueries(6):
+            response = self.client.post(url, {'usernames': usernames})
+        self.assertEqual(response.context['changed'], 4)
+        self.assertEqual(response.context['missing'], ['nobody'])
+        self.assertEqual(
+            Follow.objects.filter(user=self.user).count(), len(self.authors)
+        )
+        self.assertEqual(
+            list(follow_graph.followees(self.user.pk)),
+            sorted(author.pk for author in self.authors),
+        )
+
+    def test_bulk_follow_counts_only_new_rows(self):
+        """Проверка: подписки, уже записанные в обход устаревшего графа,
+        не считаются второй раз."""
+        author = self.authors[0]
+        self.assertEqual(follow_graph.follower_count(author.pk), 0)
+        follow_graph.followees(self.user.pk)
+        Follow.objects.bulk_create([Follow(user=self.user, author=author)])
+        response = self.client.post(
+            reverse('posts:follow_bulk'), {'usernames': author.username}
+        )
+        self.assertEqual(response.context['changed'], 0)
+        self.assertEqual(follow_graph.follower_count(author.pk), 0)
+
+    def test_bulk_unfollow_updates_graph_once(self):
+        """Проверка: массовая отписка правит граф и счётчики."""
+        for author in self.authors:
+            Follow.objects.create(user=self.user, author=author)
+        author = self.authors[1]
+        self.assertEqual(follow_graph.follower_count(author.pk), 1)
+        response = self.client.post(reverse('posts:follow_bulk'), {
+            'usernames': f'{author.username} {self.authors[2].username}',
+            'unfollow': 'on',
+        })
+        self.assertEqual(response.context['changed'], 2)
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 3)
+        self.assertFalse(follow_graph.is_following(self.user.pk, author.pk))
+        self.assertEqual(follow_graph.follower_count(author.pk), 0)
+
+    def test_import_follows_command(self):
+        """Проверка: команда подписывает по файлу со списком имён."""
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.txt', delete=False
+        ) as source:
+            source.write('\n'.join(a.username for a in self.authors[:3]))
+        self.addCleanup(os.remove, source.name)
+        out = StringIO()
+        call_command(
+            'import_follows', self.user.username, source.name,
+            '--batch-size=2', stdout=out,
+        )
+        self.assertIn('Изменено подписок: 3', out.getvalue())
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 3)
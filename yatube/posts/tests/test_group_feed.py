@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.http import Http404
+from django.test import TestCase
+
+from .. import group_feed, moderation
+from ..models import Group, ModerationJob, Post
+
+User = get_user_model()
+
+
+class GroupFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Feeder')
+        cls.group = Group.objects.create(
+            title='Большая', slug='big', description='Много постов'
+        )
+        cls.other = Group.objects.create(
+            title='Другая', slug='other', description='Пусто'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+            for number in range(12)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        group_feed._group_ids.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_cached_pages_need_one_query(self):
+        """Проверка: закешированная страница — один запрос in_bulk."""
+        group_feed.get_page('big', 1, 2)
+        with self.assertNumQueries(1):
+            group, page = group_feed.get_page('big', '2', 2)
+        self.assertEqual(group, self.group)
+        self.assertIsInstance(page.paginator, Paginator)
+        self.assertEqual(page.paginator.count, 12)
+        expected = Post.objects.filter(group=self.group)[2:4]
+        self.assertEqual(list(page), list(expected))
+
+    def test_far_pages_are_read_from_database(self):
+        """Проверка: страницы дальше кеша читаются обычным запросом."""
+        group_feed.get_page('big', 1, 2)
+        _, page = group_feed.get_page('big', 6, 2)
+        self.assertEqual(
+            list(page), list(Post.objects.filter(group=self.group)[10:12])
+        )
+        self.assertEqual(len(group_feed.get_feed('big', 2)['ids']), 10)
+
+    def test_unknown_slug_gives_404(self):
+        """Проверка: несуществующая группа — 404."""
+        with self.assertRaises(Http404):
+            group_feed.get_page('missing', 1, 2)
+
+    def test_group_change_resets_both_feeds(self):
+        """Проверка: перенос поста сбрасывает ленты обеих групп."""
+        group_feed.get_page('big', 1, 10)
+        group_feed.get_page('other', 1, 10)
+        post = self.posts[-1]
+        post.group = self.other
+        post.save()
+        _, page = group_feed.get_page('other', 1, 10)
+        self.assertEqual(list(page), [post])
+        _, page = group_feed.get_page('big', 1, 10)
+        self.assertEqual(page.paginator.count, 11)
+
+    def test_moderation_reassign_resets_feeds(self):
+        """Проверка: массовый перенос в модерации сбрасывает ленты."""
+        group_feed.get_page('big', 1, 10)
+        job = moderation.queue(
+            ModerationJob.REASSIGN_GROUP,
+            Post,
+            {'pk__in': ','.join(str(post.pk) for post in self.posts[:3])},
+            group=self.other,
+        )
+        moderation.run_job(job)
+        _, page = group_feed.get_page('big', 1, 10)
+        self.assertEqual(page.paginator.count, 9)
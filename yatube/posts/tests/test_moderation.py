@@ -0,0 +1,191 @@
+import json
+from io import StringIO
+from unittest import mock
+
+from django.contrib.admin import helpers
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import page_cache
+
+from .. import moderation
+from ..models import Comment, Group, ModerationJob, Post
+
+User = get_user_model()
+
+
+class ModerationJobsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='moderator', email='mod@example.com', password='pass'
+        )
+        cls.spammer = User.objects.create_user(username='spammer')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        self.spam = [
+            Post.objects.create(author=self.spammer, text=f'Спам {number}')
+            for number in range(5)
+        ]
+        self.post = Post.objects.create(author=self.author, text='Пост')
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def run_action(self, model, action, objects, **data):
+        return self.client.post(
+            reverse(f'admin:posts_{model}_changelist'),
+            {
+                'action': action,
+                helpers.ACTION_CHECKBOX_NAME: [obj.pk for obj in objects],
+                **data,
+            },
+            follow=True,
+        )
+
+    def test_delete_action_only_queues_job(self):
+        """Проверка: действие в админке ставит задачу, а не удаляет сразу."""
+        self.run_action('post', 'queue_delete', self.spam)
+        job = ModerationJob.objects.get()
+        self.assertEqual(job.status, ModerationJob.PENDING)
+        self.assertEqual(job.total, 5)
+        self.assertEqual(Post.objects.filter(author=self.spammer).count(), 5)
+        call_command(
+            'run_moderation_jobs', '--chunk-size=2', stdout=StringIO()
+        )
+        job.refresh_from_db()
+        self.assertEqual(job.status, ModerationJob.DONE)
+        self.assertEqual(job.processed, 5)
+        self.assertFalse(Post.objects.filter(author=self.spammer).exists())
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_reassign_group_asks_for_group(self):
+        """Проверка: перенос в группу спрашивает группу и ставит задачу."""
+        response = self.run_action(
+            'post', 'queue_reassign_group', self.spam[:2]
+        )
+        self.assertContains(response, 'name="apply"')
+        self.run_action(
+            'post', 'queue_reassign_group', self.spam[:2],
+            apply='1', group=self.group.pk,
+        )
+        moderation.run_pending()
+        self.assertEqual(self.group.posts.count(), 2)
+
+    def test_hide_authors_from_comments(self):
+        """Проверка: скрытие автора по его комментарию скрывает его посты
+        и комментарии, purge их не удаляет, а возврат показывает снова."""
+        comment = Comment.objects.create(
+            post=self.post, author=self.spammer, text='Спам'
+        )
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.assertContains(self.client.get(url), 'Спам')
+        self.run_action('comment', 'queue_hide_authors', [comment])
+        moderation.run_pending()
+        self.assertFalse(Post.objects.filter(author=self.spammer).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertNotContains(self.client.get(url), 'Спам')
+        call_command('purge_deleted_posts', stdout=StringIO())
+        self.assertEqual(
+            Post.all_objects.filter(author=self.spammer).count(), 5
+        )
+        self.run_action('comment', 'queue_show_authors', [comment])
+        moderation.run_pending()
+        self.assertEqual(Post.objects.filter(author=self.spammer).count(), 5)
+        self.assertEqual(Comment.objects.get(), comment)
+        self.assertContains(self.client.get(url), 'Спам')
+
+    def test_job_resumes_after_crash(self):
+        """Проверка: упавшая задача продолжается с последней пачки."""
+        job = moderation.queue(
+            ModerationJob.DELETE_POSTS, Post, {'author_id': self.spammer.pk}
+        )
+        apply_chunk = moderation.apply_chunk
+        calls = []
+
+        def crash_on_second_chunk(job, model, pks):
+            calls.append(pks)
+            if len(calls) == 2:
+                raise RuntimeError('воркер упал')
+            apply_chunk(job, model, pks)
+
+        with mock.patch.object(
+            moderation, 'apply_chunk', crash_on_second_chunk
+        ):
+            self.assertEqual(moderation.run_pending(chunk_size=2), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ModerationJob.FAILED)
+        self.assertEqual(job.processed, 2)
+        self.assertEqual(Post.objects.filter(author=self.spammer).count(), 3)
+        moderation.run_pending(chunk_size=2, retry_failed=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ModerationJob.DONE)
+        self.assertEqual(job.processed, 5)
+        self.assertFalse(Post.objects.filter(author=self.spammer).exists())
+
+    def test_select_across_stores_filter(self):
+        """Проверка: «выбрать все» хранит фильтр, а не список id,
+        и не трогает строки, появившиеся после постановки задачи."""
+        self.client.post(
+            reverse('admin:posts_post_changelist') + '?q=Спам',
+            {
+                'action': 'queue_delete',
+                'select_across': '1',
+                'index': '0',
+                helpers.ACTION_CHECKBOX_NAME: [self.spam[0].pk],
+            },
+        )
+        job = ModerationJob.objects.get()
+        self.assertEqual(job.total, 5)
+        self.assertEqual(json.loads(job.target)['phases'], [{
+            'model': 'post',
+            'lookups': {},
+            'search': 'Спам',
+            'last_pk': self.spam[-1].pk,
+        }])
+        late = Post.objects.create(author=self.spammer, text='Спам поздний')
+        moderation.run_job(job, chunk_size=2)
+        self.assertEqual(
+            list(Post.objects.filter(author=self.spammer)), [late]
+        )
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_deleted_comments_drop_post_page(self):
+        """Проверка: удаление комментариев задачей сбрасывает страницу."""
+        comment = Comment.objects.create(
+            post=self.post, author=self.spammer, text='Спам-комментарий'
+        )
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.assertContains(self.client.get(url), 'Спам-комментарий')
+        job = moderation.queue(
+            ModerationJob.DELETE_COMMENTS, Comment, {'pk__in': str(comment.pk)}
+        )
+        with mock.patch.object(page_cache, 'bump') as bump:
+            moderation.run_job(job)
+        bump.assert_called_once_with(f'post:{self.post.pk}')
+        self.assertFalse(Comment.all_objects.exists())
+
+    def test_reassign_drops_post_pages(self):
+        """Проверка: перенос в группу сбрасывает страницы постов и лент."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.client.get(url)
+        job = moderation.queue(
+            ModerationJob.REASSIGN_GROUP, Post, {'pk__in': str(self.post.pk)},
+            group=self.group,
+        )
+        moderation.run_job(job)
+        self.assertContains(self.client.get(url), self.group.title)
+
+    def test_progress_is_shown_in_admin(self):
+        """Проверка: прогресс задачи виден в списке задач."""
+        job = moderation.queue(
+            ModerationJob.DELETE_POSTS, Post, {'author_id': self.spammer.pk}
+        )
+        moderation.run_job(job, chunk_size=10)
+        response = self.client.get(
+            reverse('admin:posts_moderationjob_changelist')
+        )
+        self.assertContains(response, '5 из 5 (100%)')
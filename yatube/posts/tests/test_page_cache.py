@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import page_cache
+
+from ..models import Follow, Post
+
+User = get_user_model()
+
+
+class SharedPageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Writer')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.post = Post.objects.create(author=cls.author, text='Общий пост')
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_users_share_one_render(self):
+        """Проверка: страница рендерится один раз для всех пользователей."""
+        url = reverse('posts:profile', args=[self.author.username])
+        edit_url = reverse('posts:post_edit', args=[self.post.pk])
+        anonymous = Client().get(url)
+        self.assertIsNotNone(anonymous.context)
+        with self.assertNumQueries(0):
+            Client().get(url)
+        author = self.author_client.get(url)
+        reader = self.reader_client.get(url)
+        self.assertNotIn('page_obj', author.context)
+        self.assertNotIn('<!--esi:', author.content.decode())
+        self.assertContains(author, edit_url)
+        self.assertNotContains(reader, edit_url)
+        self.assertNotContains(anonymous, edit_url)
+        self.assertContains(reader, 'Подписаться')
+        self.assertContains(reader, 'Выйти')
+        self.assertNotContains(anonymous, 'Выйти')
+        self.assertEqual(author['Vary'], 'Cookie')
+
+    def test_fragments_follow_user_state(self):
+        """Проверка: кнопка подписки меняется без сброса страницы."""
+        url = reverse('posts:profile', args=[self.author.username])
+        self.reader_client.get(url)
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(url)
+        self.assertContains(response, 'Отписаться')
+        self.assertContains(response, 'Подписчиков: 1')
+
+    def test_new_post_bumps_listing_version(self):
+        """Проверка: новый пост сразу виден в закешированных лентах."""
+        version = page_cache.version('posts')
+        url = reverse('posts:index')
+        Client().get(url)
+        Post.objects.create(author=self.author, text='Свежий пост')
+        self.assertGreater(page_cache.version('posts'), version)
+        self.assertContains(Client().get(url), 'Свежий пост')
+
+    def test_comment_form_is_rendered_per_user(self):
+        """Проверка: форма комментария есть только у авторизованных."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.assertNotContains(Client().get(url), 'csrfmiddlewaretoken')
+        self.assertContains(
+            self.reader_client.get(url), 'csrfmiddlewaretoken'
+        )
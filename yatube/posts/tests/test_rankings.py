@@ -0,0 +1,89 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import rankings
+from ..models import Comment, Group, GroupRank, Post, PostRank
+
+User = get_user_model()
+
+
+class RankingsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.group = Group.objects.create(
+            title='Test group title',
+            slug='test-slug',
+            description='Test group description',
+        )
+        cls.quiet_group = Group.objects.create(
+            title='Quiet group',
+            slug='quiet-slug',
+            description='Test group description',
+        )
+        cls.hot_post = Post.objects.create(
+            author=cls.user, text='Hot post', group=cls.group
+        )
+        cls.cold_post = Post.objects.create(author=cls.user, text='Cold post')
+        Comment.objects.bulk_create(
+            Comment(post=cls.hot_post, author=cls.user, text='Comment')
+            for _ in range(3)
+        )
+        Comment.objects.create(
+            post=cls.cold_post, author=cls.user, text='Comment'
+        )
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_refresh_orders_by_activity(self):
+        """Проверка: посты и группы упорядочены по числу событий."""
+        call_command('refresh_rankings', stdout=StringIO())
+        self.assertEqual(
+            [post.pk for post in rankings.trending_posts()],
+            [self.hot_post.pk, self.cold_post.pk],
+        )
+        self.assertEqual(rankings.top_groups(), [self.group])
+
+    def test_scores_decay_between_refreshes(self):
+        """Проверка: очки затухают вдвое за HALF_LIFE и новые события
+        не учитываются повторно."""
+        now = timezone.now()
+        rankings.refresh(now)
+        rankings.refresh(now + rankings.HALF_LIFE)
+        self.assertAlmostEqual(
+            PostRank.objects.get(post=self.hot_post).score, 1.5
+        )
+        self.assertAlmostEqual(
+            GroupRank.objects.get(group=self.group).score,
+            (rankings.POST_WEIGHT + 3 * rankings.COMMENT_WEIGHT) / 2,
+        )
+
+    def test_faded_scores_are_removed(self):
+        """Проверка: давно неактивные посты выпадают из рейтинга."""
+        now = timezone.now()
+        rankings.refresh(now)
+        rankings.refresh(now + timedelta(days=365))
+        self.assertFalse(PostRank.objects.exists())
+
+    def test_pages_read_precomputed_top(self):
+        """Проверка: страницы рейтингов читают готовый топ из кеша."""
+        rankings.refresh()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('posts:trending'))
+        self.assertEqual(
+            [post.pk for post in response.context['posts']],
+            [self.hot_post.pk, self.cold_post.pk],
+        )
+        response = self.client.get(reverse('posts:group_top'))
+        self.assertContains(response, self.group.title)
+        self.assertNotContains(response, self.quiet_group.title)
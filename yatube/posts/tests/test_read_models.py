@@ -0,0 +1,70 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.template.loader import render_to_string
+from django.test import TestCase
+
+from ..models import Group, Post
+from ..read_models import FeedRow, feed_rows
+
+User = get_user_model()
+
+
+class FeedRowsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='reader', first_name='Лёгкий', last_name='Читатель'
+        )
+        cls.group = Group.objects.create(title='Строки', slug='rows')
+        cls.long_post = Post.objects.create(
+            author=cls.author, group=cls.group, text='слово ' * 100
+        )
+        cls.short_post = Post.objects.create(
+            author=cls.author, text='Коротко'
+        )
+
+    def test_rows_follow_queryset_and_share_authors(self):
+        """Проверка: строки идут в порядке запроса, автор — один объект."""
+        with self.assertNumQueries(1):
+            rows = list(feed_rows(Post.objects.all(), text_length=20))
+        self.assertEqual(
+            [row.pk for row in rows],
+            list(Post.objects.values_list('pk', flat=True)),
+        )
+        self.assertIsInstance(rows[0], FeedRow)
+        self.assertIs(rows[0].author, rows[1].author)
+        long_row = next(row for row in rows if row.pk == self.long_post.pk)
+        self.assertEqual(len(long_row.text), 20)
+        self.assertTrue(long_row.text.endswith('…'))
+        self.assertEqual(long_row.group.slug, 'rows')
+
+    def test_post_card_template_renders_rows(self):
+        """Проверка: post_card.html выводит строку как пост."""
+        row = next(feed_rows(Post.objects.filter(pk=self.long_post.pk)))
+        html = render_to_string('posts/includes/post_card.html', {'post': row})
+        self.assertIn('Лёгкий Читатель', html)
+        self.assertIn('/group/rows/', html)
+        self.assertIn(f'/posts/{row.pk}/', html)
+
+    def test_benchmark_command_rolls_back(self):
+        """Проверка: замер печатает оба варианта и не оставляет постов."""
+        posts = Post.objects.count()
+        out = StringIO()
+        call_command('bench_read_models', '--rows=50', stdout=out)
+        self.assertIn('ORM: 50 строк', out.getvalue())
+        self.assertIn('read_models: 50 строк', out.getvalue())
+        self.assertEqual(Post.objects.count(), posts)
+
+    def test_export_command_writes_full_posts(self):
+        """Проверка: выгрузка отдаёт посты целиком строками JSON."""
+        out = StringIO()
+        call_command('export_posts', '--group=rows', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['id'], self.long_post.pk)
+        self.assertEqual(rows[0]['text'], self.long_post.text)
+        self.assertEqual(rows[0]['author'], 'reader')
+        self.assertEqual(rows[0]['group'], 'rows')
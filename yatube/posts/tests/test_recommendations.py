@@ -0,0 +1,121 @@
+from io import StringIO
+from unittest import skipIf
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import recommendations
+from ..models import Follow, FollowRecommendation
+
+User = get_user_model()
+
+
+class RecommendationsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.first, cls.second, cls.popular, cls.other = [
+            User.objects.create_user(username=name)
+            for name in ('Reader', 'First', 'Second', 'Popular', 'Other')
+        ]
+        for user, author in (
+            (cls.reader, cls.first),
+            (cls.reader, cls.second),
+            (cls.first, cls.popular),
+            (cls.first, cls.other),
+            (cls.second, cls.popular),
+            (cls.second, cls.first),
+        ):
+            Follow.objects.create(user=user, author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def expected(self):
+        return [
+            (self.reader.pk, self.popular.pk, 2),
+            (self.reader.pk, self.other.pk, 1),
+            (self.second.pk, self.other.pk, 1),
+        ]
+
+    def test_friends_of_friends_scores(self):
+        """Проверка: кандидаты — авторы авторов, без уже отслеживаемых."""
+        edges = Follow.objects.values_list('user_id', 'author_id')
+        self.assertEqual(
+            sorted(recommendations.compute(list(edges), workers=1)),
+            sorted(self.expected()),
+        )
+
+    @skipIf(recommendations.sparse is None, 'нужны numpy и scipy')
+    def test_matrix_engine_matches_python_engine(self):
+        """Проверка: расчёт на разреженной матрице совпадает с расчётом
+        по словарю множеств."""
+        edges = list(Follow.objects.values_list('user_id', 'author_id'))
+        for engine in recommendations.ENGINES:
+            with self.subTest(engine=engine):
+                self.assertEqual(
+                    sorted(recommendations.compute(
+                        edges, workers=1, engine=engine
+                    )),
+                    sorted(self.expected()),
+                )
+
+    def test_store_swaps_batches_outside_transaction(self):
+        """Проверка: рекомендации считаются вне транзакции, меняются
+        пачками по пользователям, устаревшие удаляются."""
+        FollowRecommendation.objects.create(
+            user=self.other, author=self.reader, score=1
+        )
+        depth = len(connection.savepoint_ids)
+        depths = []
+
+        def rows():
+            for row in self.expected():
+                depths.append(len(connection.savepoint_ids))
+                yield row
+
+        self.assertEqual(recommendations.store(rows(), batch_size=1), 3)
+        self.assertEqual(depths, [depth] * 3)
+        self.assertEqual(
+            sorted(FollowRecommendation.objects.values_list(
+                'user_id', 'author_id', 'score'
+            )),
+            sorted(self.expected()),
+        )
+
+    def test_parallel_compute_gives_same_result(self):
+        """Проверка: расчёт в нескольких процессах даёт тот же результат."""
+        edges = list(Follow.objects.values_list('user_id', 'author_id'))
+        self.assertEqual(
+            sorted(recommendations.compute(edges, workers=2, chunk_size=1)),
+            sorted(self.expected()),
+        )
+
+    def test_command_stores_and_pages_show_recommendations(self):
+        """Проверка: команда сохраняет рекомендации, лента их показывает."""
+        call_command('recommend_follows', '--workers=1', stdout=StringIO())
+        self.assertEqual(
+            FollowRecommendation.objects.filter(user=self.reader).count(), 2
+        )
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            response.context['recommendations'], [self.popular, self.other]
+        )
+        Follow.objects.create(user=self.reader, author=self.popular)
+        response = client.get(
+            reverse('posts:profile', args=[self.first.username])
+        )
+        self.assertContains(
+            response, reverse('posts:profile', args=[self.other.username])
+        )
+        self.assertNotContains(
+            response, reverse('posts:profile', args=[self.popular.username])
+        )
@@ -0,0 +1,113 @@
+import shutil
+import tempfile
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailStoreTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Photographer')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                text=f'Пост с картинкой {number}',
+                image=SimpleUploadedFile(
+                    f'thumb{number}.gif', SMALL_GIF, content_type='image/gif'
+                ),
+            )
+            for number in range(10)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        default.kvstore.lru.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_listing_runs_no_thumbnail_queries(self):
+        """Проверка: лента из постов с картинками не читает thumbnail_kvstore.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(reverse('posts:index'))
+            cache.clear()
+            Client().get(reverse('posts:index'))
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertFalse(any(
+            'thumbnail_kvstore' in query['sql']
+            for query in queries.captured_queries
+        ))
+
+    @skipUnless(
+        hasattr(Image, 'ANTIALIAS'),
+        'sorl-thumbnail 12.7 создаёт миниатюры только с Pillow < 10',
+    )
+    def test_warm_stores_template_thumbnails(self):
+        """Проверка: при загрузке создаются миниатюры для карточек."""
+        image = self.posts[0].image
+        thumbnails.warm(image)
+        for geometry, options in thumbnails.THUMBNAILS:
+            with self.subTest(geometry=geometry):
+                thumbnail = get_thumbnail(image, geometry, **options)
+                self.assertIsNotNone(default.kvstore.get(thumbnail))
+
+    def test_warm_logs_engine_errors(self):
+        """Проверка: ошибка движка не ломает сохранение, а пишется в лог."""
+        with mock.patch.object(
+            thumbnails, 'get_thumbnail', side_effect=OSError('broken')
+        ), self.assertLogs('posts.thumbnails', 'ERROR') as logs:
+            thumbnails.warm(self.posts[0].image)
+        self.assertIn('broken', logs.output[0])
+
+    def test_lru_answers_without_shared_cache(self):
+        """Проверка: повторное чтение не обращается к общему кешу."""
+        kvstore = default.kvstore
+        key = 'sorl-thumbnail||image||key'
+        kvstore._set_raw(key, 'value')
+        cache.delete(kvstore.cache_key(key, kvstore.generation()))
+        self.assertEqual(kvstore._get_raw(key), 'value')
+        kvstore.lru.clear()
+        self.assertIsNone(kvstore._get_raw(key))
+
+    def test_clear_hides_old_entries(self):
+        """Проверка: clear поднимает поколение, старые записи не видны."""
+        kvstore = default.kvstore
+        key = 'sorl-thumbnail||image||key'
+        kvstore._set_raw(key, 'value')
+        kvstore.clear()
+        self.assertIsNone(kvstore._get_raw(key))
+        kvstore._set_raw(key, 'new')
+        kvstore.lru.clear()
+        self.assertEqual(kvstore._get_raw(key), 'new')
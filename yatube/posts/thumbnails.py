@@ -0,0 +1,32 @@
+"""Миниатюры картинок постов для карточек ленты.
+
+Геометрия и параметры должны совпадать с ``cards.thumbnail_url``:
+тогда миниатюры, созданные при загрузке, находятся в KVStore и
+карточка их только читает. Шаблоны без карточки берут копию через
+фильтр ``resized``.
+"""
+import logging
+
+from sorl.thumbnail import get_thumbnail
+
+logger = logging.getLogger(__name__)
+
+THUMBNAILS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+
+def warm(image):
+    """Создаёт миниатюры картинки заранее.
+
+    Ошибки движка не пробрасываются, а пишутся в лог: пост уже сохранён,
+    а карточка попробует ещё раз.
+    """
+    for geometry, options in THUMBNAILS:
+        try:
+            get_thumbnail(image, geometry, **options)
+        except Exception:
+            logger.exception(
+                'Не удалось создать миниатюру %s для %s', geometry, image
+            )
+            return
@@ -1,63 +1,106 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 
-from .forms import CommentForm, PostForm
+from core import model_cache, page_cache
+from core.paginator import CachedCountPaginator
+from core.ratelimit import ratelimit
+from core.streaming import stream_render
+
+from . import (
+    comment_buffer, events, follow_graph, follows, group_feed, rankings,
+    recommendations,
+)
+from .forms import BulkFollowForm, CommentForm, PostForm
 from .models import Follow, Group, Post, User
 
 POSTS_PER_PAGE = 10
 
 
-def get_page(request, post_list, posts_per_page):
-    paginator = Paginator(post_list, posts_per_page)
+def get_page(request, post_list, posts_per_page, **options):
+    paginator = CachedCountPaginator(post_list, posts_per_page, **options)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
 
 
-@cache_page(20, key_prefix='index_page')
+def render_feed(request, template, context):
+    if settings.STREAMING_RENDER:
+        return stream_render(request, template, context)
+    return render(request, template, context)
+
+
+def get_last_event_id(request):
+    last_event_id = request.META.get(
+        'HTTP_LAST_EVENT_ID', request.GET.get('last_event_id')
+    )
+    try:
+        return int(last_event_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def event_stream(request, channels):
+    last_event_id = get_last_event_id(request)
+    if 'poll' in request.GET:
+        response = HttpResponse(
+            events.poll(channels, last_event_id),
+            content_type='text/event-stream',
+        )
+    else:
+        response = StreamingHttpResponse(
+            events.stream(channels, last_event_id),
+            content_type='text/event-stream',
+        )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@page_cache.shared_page('posts')
 def index(request):
     template = 'posts/index.html'
     post_list = Post.objects.all()
-    page_obj = get_page(request, post_list, POSTS_PER_PAGE)
+    page_obj = get_page(
+        request, post_list, POSTS_PER_PAGE, allow_estimate=True
+    )
     context = {
         'page_obj': page_obj,
     }
     return render(request, template, context)
 
 
+@page_cache.shared_page('posts')
 def group_posts(request, slug):
     template = 'posts/group_list.html'
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page_obj = get_page(request, post_list, POSTS_PER_PAGE)
+    group, page_obj = group_feed.get_page(
+        slug, request.GET.get('page'), POSTS_PER_PAGE
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
     }
-    return render(request, template, context)
+    return render_feed(request, template, context)
 
 
+@page_cache.shared_page('posts')
 def profile(request, username):
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
+    author = model_cache.get_object_or_404(User, username=username)
     post_list = author.posts.all()
-    following = request.user.is_authenticated and author.following.filter(
-        user=request.user
-    ).exists()
     page_obj = get_page(request, post_list, POSTS_PER_PAGE)
     context = {
         'author': author,
         'page_obj': page_obj,
-        'following': following,
     }
-    return render(request, template, context)
+    return render_feed(request, template, context)
 
 
+@page_cache.shared_page('post:{post_id}')
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, id=post_id)
+    post = model_cache.get_object_or_404(Post, pk=post_id)
     comments = post.comments.all()
     context = {
         'post': post,
@@ -67,7 +110,44 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+def index_events(request):
+    return event_stream(request, ['posts'])
+
+
+def group_events(request, slug):
+    group = model_cache.get_object_or_404(Group, slug=slug)
+    return event_stream(request, [f'group:{group.pk}'])
+
+
+def post_events(request, post_id):
+    post = model_cache.get_object_or_404(Post, pk=post_id)
+    return event_stream(request, [f'post:{post.pk}'])
+
+
+@login_required
+def follow_events(request):
+    authors = follow_graph.followees(request.user.pk)
+    return event_stream(request, [f'author:{pk}' for pk in authors])
+
+
+def trending(request):
+    template = 'posts/trending.html'
+    context = {
+        'posts': rankings.trending_posts(),
+    }
+    return render(request, template, context)
+
+
+def group_top(request):
+    template = 'posts/group_top.html'
+    context = {
+        'groups': rankings.top_groups(),
+    }
+    return render(request, template, context)
+
+
 @login_required
+@ratelimit('10/m')
 def post_create(request):
     template = 'posts/create_post.html'
     form = PostForm(
@@ -88,8 +168,8 @@ def post_create(request):
 @login_required
 def post_edit(request, post_id):
     template = 'posts/create_post.html'
-    post = get_object_or_404(Post, id=post_id)
-    if request.user != post.author:
+    post = get_object_or_404(Post, pk=post_id)
+    if request.user.pk != post.author_id:
         return redirect('posts:post_detail', post_id=post_id)
     form = PostForm(
         request.POST or None,
@@ -108,10 +188,15 @@ def post_edit(request, post_id):
 
 
 @login_required
+@ratelimit('10/m')
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = model_cache.get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
-    if form.is_valid():
+    if form.is_valid() and settings.COMMENT_WRITE_BEHIND:
+        comment_buffer.append(
+            post.pk, request.user.pk, form.cleaned_data['text']
+        )
+    elif form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
@@ -123,39 +208,74 @@ def add_comment(request, post_id):
 def follow_index(request):
     template = 'posts/follow.html'
     user = request.user
-    post_list = Post.objects.filter(author__following__user=user)
-    page_obj = get_page(request, post_list, POSTS_PER_PAGE)
+    authors = follow_graph.followees(user.pk)
+    if len(authors) <= follow_graph.IN_BATCH:
+        post_list = Post.objects.filter(author_id__in=list(authors))
+        # Число постов ленты — сумма чисел по авторам, как в профилях.
+        count_by = (Post.objects.all(), 'author_id', authors)
+    else:
+        post_list = Post.objects.filter(author__following__user=user)
+        count_by = None
+    page_obj = get_page(
+        request, post_list, POSTS_PER_PAGE, count_by=count_by
+    )
     context = {
         'user': user,
         'page_obj': page_obj,
+        'recommendations': recommendations.recommended_authors(user),
     }
-    return render(request, template, context)
+    return render_feed(request, template, context)
 
 
 @login_required
+@ratelimit('30/m', methods=('GET', 'POST'))
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = model_cache.get_object_or_404(User, username=username)
     user = request.user
-    if user != author:
-        Follow.objects.get_or_create(
-            author=author,
-            user=user
-        )
+    if user != author and not follow_graph.is_following(user.pk, author.pk):
+        # Граф подписок правит сигнал post_save, только если строка
+        # действительно создана.
+        Follow.objects.get_or_create(author=author, user=user)
     return redirect('posts:profile', username=username)
 
 
+@login_required
+@ratelimit('10/m')
+def follow_bulk(request):
+    template = 'posts/follow_bulk.html'
+    form = BulkFollowForm(request.POST or None)
+    context = {
+        'form': form,
+    }
+    if form.is_valid():
+        bulk_action = (
+            follows.unfollow_many if form.cleaned_data['unfollow']
+            else follows.follow_many
+        )
+        changed, missing = bulk_action(
+            request.user, form.cleaned_data['usernames']
+        )
+        context.update({
+            'changed': changed,
+            'missing': missing,
+            'unfollow': form.cleaned_data['unfollow'],
+        })
+    return render(request, template, context)
+
+
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = model_cache.get_object_or_404(User, username=username)
     user = request.user
     Follow.objects.filter(user=user, author=author).delete()
     return redirect('posts:profile', username=username)
 
 
 @login_required
+@ratelimit('30/m', methods=('GET', 'POST'))
 def post_delete(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    if request.user != post.author:
+    post = get_object_or_404(Post, pk=post_id)
+    if request.user.pk != post.author_id:
         return redirect('posts:post_detail', post_id=post_id)
-    post.delete()
-    return redirect('posts:profile', username=post.author.username)
+    post.soft_delete()
+    return redirect('posts:profile', username=request.user.username)
@@ -0,0 +1,11 @@
+import os
+
+from django.conf import settings
+
+from core.asgi import AsgiHandler
+
+from .wsgi import application as wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = AsgiHandler(wsgi_application, max_workers=settings.ASGI_THREADS)
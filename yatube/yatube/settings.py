@@ -5,7 +5,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 SECRET_KEY = 'j8yc=79)pa($4&i(jc9yz*(h0#-m^v0&wj(&o6=0yk%#)#tjgn'
 
-DEBUG = True
+DEBUG = os.getenv('DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -32,6 +32,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CollapseWhitespaceMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -57,13 +58,56 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.navigation.navigation',
             ],
         },
     },
 ]
 
+# Вне разработки шаблоны читаются с диска и разбираются один раз
+# на процесс, а не на каждый запрос.
+if not DEBUG:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+    SILENCED_SYSTEM_CHECKS = ['debug_toolbar.W006']
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Отступы шаблонов вырезаются из HTML-ответов.
+COLLAPSE_WHITESPACE = True
+
+# Ленты постов отдаются потоком: <head> и шапка уходят клиенту
+# до рендеринга карточек. Такие ответы не попадают в кеш страниц.
+STREAMING_RENDER = os.getenv('STREAMING_RENDER', '0') == '1'
+
+# Страницы, которые вне разработки анонимы получают из памяти процесса
+# в обход Django (core.wsgi.EdgeCacheApplication), и время жизни копии.
+EDGE_CACHE_PAGES = ['about:author', 'about:tech']
+EDGE_CACHE_TTL = 300
+
+# Отложенная запись комментариев (posts.comment_buffer): комментарий
+# дописывается в файл на диске, а в базу попадает пачкой раз в
+# COMMENT_FLUSH_INTERVAL_MS миллисекунд или по COMMENT_FLUSH_SIZE штук.
+# При интервале None сбрасывает только команда flush_comments.
+COMMENT_WRITE_BEHIND = os.getenv('COMMENT_WRITE_BEHIND', '0') == '1'
+COMMENT_BUFFER_PATH = os.path.join(BASE_DIR, 'comment_buffer', 'comments.log')
+COMMENT_BUFFER_FSYNC = True
+COMMENT_FLUSH_INTERVAL_MS = 200
+COMMENT_FLUSH_SIZE = 100
+
+# Баннер «появились новые записи» на лентах и странице поста: страница
+# подписывается на поток posts.events (SSE, с long-poll для старых
+# браузеров). LIVE_UPDATES=0 отключает подписку.
+LIVE_UPDATES = os.getenv('LIVE_UPDATES', '1') == '1'
+
+# Размер пула потоков, в котором yatube.asgi выполняет view.
+ASGI_THREADS = 32
+
 
 DATABASES = {
     'default': {
@@ -104,6 +148,11 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+
+if not DEBUG:
+    STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
@@ -117,12 +166,45 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Уменьшенные копии картинок: /media/resize/<w>x<h>/<путь>, h = 0 —
+# только по ширине. Другие размеры отдают 404.
+RESIZE_SIZES = ['960x339', '960x0', '480x170', '480x0']
+RESIZE_CACHE_DIR = os.path.join(BASE_DIR, 'resize_cache')
+RESIZE_CACHE_MAX_SIZE = 512 * 1024 * 1024
+RESIZE_MAX_AGE = 24 * 60 * 60
+
+# Метаданные миниатюр sorl — в общем кеше с LRU в памяти процесса,
+# без таблицы thumbnail_kvstore.
+THUMBNAIL_KVSTORE = 'core.thumbnail_kvstore.KVStore'
+THUMBNAIL_LRU_SIZE = 10000
+THUMBNAIL_LRU_TIMEOUT = 300
+
+# db, cached_db или signed_cookies: cached_db читает сессию из кеша
+# и обращается к таблице django_session только при промахе.
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'cached_db')
+SESSION_ENGINE = f'django.contrib.sessions.backends.{SESSION_BACKEND}'
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# Модели для core.model_cache и их уникальные поля (pk кешируется всегда)
+MODEL_CACHE = {
+    'posts.Post': [],
+    'posts.Group': ['slug'],
+    'auth.User': ['username'],
+}
+
+# Поля, которые core.model_cache не кладёт в общий кеш
+MODEL_CACHE_DEFER = {
+    'auth.User': ['password'],
+}
+
+# Частоты для core.ratelimit по имени view, например {'add_comment': '5/m'}
+RATELIMITS = {}
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
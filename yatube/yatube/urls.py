@@ -3,12 +3,20 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import resize_image
+
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path(
+        f'{settings.MEDIA_URL.lstrip("/")}resize/'
+        '<int:width>x<int:height>/<path:path>',
+        resize_image,
+        name='resize_image',
+    ),
 ]
 
 handler404 = 'core.views.page_not_found'
@@ -1,7 +1,15 @@
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
+from core.wsgi import EdgeCacheApplication, StaticFilesApplication
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+if not settings.DEBUG:
+    application = StaticFilesApplication(
+        EdgeCacheApplication(application)
+    )